@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# topology options at each scale
+TOPOLOGIES = {
+  'Hyperx': {
+    '1k': 'widths=8,8 weights=1,1 concentration=16 chassis=8',
+    '16k': 'widths=8,8,16 weights=1,1,1 concentration=16 chassis=8',
+    '128k': 'widths=16,16,16 weights=1,1,1 concentration=32 chassis=8',
+    '1M': 'widths=32,32,32 weights=1,1,1 concentration=32 chassis=8'},
+  'Dragonfly': {
+    '1k': ('global_width=32 global_weight=1 local_width=8 local_weight=1 '
+           'concentration=4 chassis=4'),
+    '16k': ('global_width=128 global_weight=1 local_width=16 local_weight=1 '
+            'concentration=8 chassis=4'),
+    '128k': ('global_width=256 global_weight=1 local_width=32 local_weight=1 '
+             'concentration=16 chassis=8'),
+    '1M': ('global_width=1024 global_weight=1 local_width=64 local_weight=1 '
+           'concentration=16 chassis=8')},
+  'FatTree': {
+    '1k': ('leaves=128 down_ports=8 up_ports=8 leaves_per_rack=4 '
+           'directors_per_rack=1 director_radix=128 director_rack_inset=6'),
+    '16k': ('leaves=1024 down_ports=16 up_ports=16 leaves_per_rack=4 '
+            'directors_per_rack=1 director_radix=1024 '
+            'director_rack_inset=6'),
+    '128k': ('leaves=4096 down_ports=32 up_ports=32 leaves_per_rack=8 '
+             'directors_per_rack=1 director_radix=4096 '
+             'director_rack_inset=6'),
+    '1M': ('leaves=32768 down_ports=32 up_ports=32 leaves_per_rack=8 '
+           'directors_per_rack=1 director_radix=16384 '
+           'director_rack_inset=6')},
+  'Hyperx2DStripe': {
+    '1k': 'widths=8,8 weights=1,1 concentration=16 chassis=8',
+    '16k': 'widths=32,32 weights=1,1 concentration=16 chassis=8',
+    '128k': 'widths=64,64 weights=1,1 concentration=32 chassis=8',
+    '1M': 'widths=128,128 weights=1,1 concentration=64 chassis=8'}}
+SCALES = ['1k', '16k', '128k', '1M']
+FABRICS = ['KimDally', 'EDR', 'OPA1', 'Eth100', 'Eth40']
+LAYOUTS = ['Standard']
+
+def options(text):
+  """
+  Converts a space separated '<key>=<value>' string to a dict
+  """
+  return dict(pair.split('=') for pair in text.split())
+
+def run_config(config):
+  """
+  This runs one configuration and returns its timings, it is executed in a
+  fresh process so the peak RSS belongs to this configuration only
+  """
+  # imported here so the parent process stays small
+  import pipeline
+  import utils
+
+  result = dict(config)
+  timings = utils.Timings()
+  start = time.perf_counter()
+  try:
+    pipe = pipeline.Pipeline(config['topology'], options(config['topts']),
+                             [(config['fabric'], {})], config['layout'], {},
+                             timings=timings)
+    pipe.run()
+    with tempfile.TemporaryDirectory() as tmpdir:
+      fabric_model = pipe.fabric_models[0]
+      with pipe.stage('summary'):
+        fabric_model.summary(pipe.nodes, os.path.join(tmpdir, 'summary.json'))
+      with pipe.stage('cable_csv'):
+        fabric_model.cable_csv(os.path.join(tmpdir, 'cables.csv'))
+      with pipe.stage('tray_csv'):
+        pipe.layout_model.cable_tray_csv(os.path.join(tmpdir, 'trays.csv'))
+    result['status'] = 'ok'
+    result['nodes'] = pipe.nodes
+  except AssertionError as ex:
+    # the fabric or topology rejected the configuration
+    result['status'] = 'unsupported'
+    result['reason'] = str(ex)
+  except Exception as ex:
+    result['status'] = 'failed'
+    result['reason'] = '{}: {}'.format(type(ex).__name__, ex)
+  result['seconds'] = time.perf_counter() - start
+  result['peak rss (KiB)'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  result['timings'] = timings.report()['stages']
+  return result
+
+def run_isolated(config):
+  """
+  This runs one configuration with run_config() in a fresh process. When the
+  process dies, e.g., at a memory limit, the result is a failed row.
+  """
+  start = time.perf_counter()
+  try:
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context('spawn')) as executor:
+      return executor.submit(run_config, config).result()
+  except Exception as ex:
+    result = dict(config)
+    result['status'] = 'failed'
+    result['reason'] = '{}: {}'.format(type(ex).__name__, ex)
+    result['seconds'] = time.perf_counter() - start
+    result['peak rss (KiB)'] = None
+    result['timings'] = {}
+    return result
+
+def git_commit():
+  """
+  Returns the current git commit or None
+  """
+  try:
+    return subprocess.run(
+      ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+      cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def main(args):
+  # build the list of configurations
+  configs = []
+  for topology in args.topologies.split(','):
+    for scale in args.scales.split(','):
+      for fabric in args.fabrics.split(','):
+        for layout in args.layouts.split(','):
+          configs.append({
+            'name': '{}-{}-{}-{}'.format(topology, scale, fabric, layout),
+            'topology': topology, 'scale': scale,
+            'topts': TOPOLOGIES[topology][scale], 'fabric': fabric,
+            'layout': layout})
+
+  # run each configuration in its own process, a failed configuration doesn't
+  #  stop the others
+  results = []
+  with concurrent.futures.ThreadPoolExecutor(args.workers) as executor:
+    for result in executor.map(run_isolated, configs):
+      if args.verbose:
+        rss = result['peak rss (KiB)']
+        print('{:<40} {:<11} {:8.02f}s {:>14}'.format(
+          result['name'], result['status'], result['seconds'],
+          '-' if rss is None else '{:,} KiB'.format(rss)), file=sys.stderr)
+      results.append(result)
+
+  # write the results
+  data = {
+    'metadata': {
+      'commit': git_commit(),
+      'date': datetime.datetime.now().isoformat(),
+      'python': platform.python_version(),
+      'machine': platform.machine(),
+      'processor': platform.processor(),
+      'cpus': os.cpu_count(),
+      'workers': args.workers},
+    'results': results}
+  report = json.dumps(data, indent=2)
+  if args.output == '-':
+    print(report)
+  else:
+    with open(args.output, 'w') as fd:
+      print(report, file=fd)
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description='fabcalc benchmark suite')
+  ap.add_argument('--topologies', type=str, default=','.join(TOPOLOGIES),
+                  help='topology models to run, comma separated')
+  ap.add_argument('--scales', type=str, default=','.join(SCALES),
+                  help='scales to run, comma separated')
+  ap.add_argument('--fabrics', type=str, default=','.join(FABRICS),
+                  help='fabric models to run, comma separated')
+  ap.add_argument('--layouts', type=str, default=','.join(LAYOUTS),
+                  help='layout models to run, comma separated')
+  ap.add_argument('--workers', type=int, default=1,
+                  help=('number of configurations run concurrently, more '
+                        'than one skews the timings'))
+  ap.add_argument('--output', type=str, default='-',
+                  help='JSON file of the results')
+  ap.add_argument('-v', '--verbose', action='store_true',
+                  help='print progress')
+  args = ap.parse_args()
+  for topology in args.topologies.split(','):
+    if topology not in TOPOLOGIES:
+      ap.error('unknown topology: {}'.format(topology))
+  for scale in args.scales.split(','):
+    if scale not in SCALES:
+      ap.error('unknown scale: {}'.format(scale))
+  main(args)
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+from collections import OrderedDict
+import concurrent.futures
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import tempfile
+
+import fabric
+import layout
+import pipeline
+import topology
+import utils
+
+FABRICS = ['KimDally', 'EDR', 'OPA1', 'Eth100', 'Eth40']
+
+def random_hyperx(rng, name):
+  dims = rng.randint(1, 2 if name == 'Hyperx2DStripe' else 3)
+  widths = [rng.randint(2, 8) for _ in range(dims)]
+  weights = [rng.randint(1, 3) for _ in range(dims)]
+  if name == 'Hyperx':
+    chassis = rng.choice([c for c in range(1, 9) if widths[0] % c == 0])
+  else:
+    chassis = rng.randint(1, 8)
+  topts = {'widths': ','.join(map(str, widths)),
+           'weights': ','.join(map(str, weights)),
+           'concentration': str(rng.randint(1, 8)),
+           'chassis': str(chassis)}
+  if name == 'Hyperx2DStripe' and rng.random() < 0.5:
+    topts['rack_stripe'] = '1'
+  return topts
+
+def random_dragonfly(rng, name):
+  local_width = rng.randint(2, 8)
+  return {'global_width': str(rng.randint(2, 12)),
+          'global_weight': str(rng.randint(1, 2)),
+          'local_width': str(local_width),
+          'local_weight': str(rng.randint(1, 2)),
+          'concentration': str(rng.randint(1, 4)),
+          'chassis': str(rng.choice([c for c in range(1, 9)
+                                     if local_width % c == 0]))}
+
+def random_fattree(rng, name):
+  up_ports = rng.randint(1, 8)
+  leaves = rng.randint(4, 64)
+  leaves_per_rack = rng.choice([1, 2, 4, 8])
+  directors_per_rack = rng.randint(1, 4)
+  director_radix = rng.randint(max(1, leaves * up_ports // 16),
+                               leaves * up_ports)
+  topts = {'leaves': str(leaves),
+           'down_ports': str(rng.randint(1, 8)),
+           'up_ports': str(up_ports),
+           'leaves_per_rack': str(leaves_per_rack),
+           'directors_per_rack': str(directors_per_rack),
+           'director_radix': str(director_radix)}
+  if rng.random() < 0.5:
+    topts['director_rack_inset'] = str(rng.randint(1, 4))
+  else:
+    directors = math.ceil(leaves * up_ports / director_radix)
+    director_racks = math.ceil(directors / directors_per_rack)
+    total_racks = math.ceil(leaves / leaves_per_rack) + director_racks
+    topts['director_racks'] = ','.join(map(str, sorted(
+      rng.sample(range(total_racks), director_racks))))
+  return topts
+
+GENERATORS = OrderedDict([
+  ('Hyperx', random_hyperx),
+  ('Dragonfly', random_dragonfly),
+  ('FatTree', random_fattree),
+  ('Hyperx2DStripe', random_hyperx)])
+
+def random_config(rng, topologies):
+  """
+  Returns a random configuration, it might not be valid
+  """
+  name = rng.choice(topologies)
+  config = OrderedDict()
+  config['topology'] = name
+  config['topts'] = GENERATORS[name](rng, name)
+  config['fabric'] = rng.choice(FABRICS)
+  config['fopts'] = {'partial_cables': rng.choice(['0', '1'])}
+  config['lopts'] = {'racks_per_row': str(rng.randint(1, 8)),
+                     'racks_per_cdu': str(rng.randint(1, 5))}
+  return config
+
+def signature(topo_model, fabric_model, layout_model, stdout):
+  """
+  Returns everything a run produces in an exactly comparable form
+  """
+  sig = OrderedDict()
+  sig['routers'] = sorted((radix, count, r.tech, r.cost, r.power)
+                          for radix, (r, count)
+                          in fabric_model._routers.items())
+  sig['cables'] = sorted((length, count, c.tech, c.cost, c.power)
+                         for length, (c, count)
+                         in fabric_model._cables.items())
+  sig['row trays'], sig['col trays'] = layout_model.cable_trays()
+  with tempfile.TemporaryDirectory() as tmpdir:
+    filename = os.path.join(tmpdir, 'topo.txt')
+    try:
+      topo_model.info_file(filename)
+      with open(filename, 'r') as fd:
+        sig['topology info'] = fd.read()
+    except NotImplementedError:
+      sig['topology info'] = None
+  sig['stdout'] = stdout
+  return sig
+
+def reference(config):
+  """
+  This is the original per-cable loop of main.py
+  """
+  stdout = io.StringIO()
+  with contextlib.redirect_stdout(stdout):
+    topo_model = topology.factory(config['topology'], **config['topts'])
+    nodes, chassis, racks = topo_model.structure()
+    fabric_model = fabric.factory(config['fabric'], **config['fopts'])
+    layout_model = layout.factory('Standard', chassis, racks,
+                                  **config['lopts'])
+    for radix, count in topo_model.routers():
+      fabric_model.add_router(radix, count)
+    for source, destination, count in topo_model.cables():
+      length = layout_model.length(source, destination, count)
+      topo_model.notify_length(length, count)
+      fabric_model.add_cable(length, count)
+    fabric_model.set_attributes()
+  return [signature(topo_model, fabric_model, layout_model, stdout.getvalue())]
+
+def make_pipeline(config, copies=1, **kwargs):
+  return pipeline.Pipeline(config['topology'], config['topts'],
+                           [(config['fabric'], config['fopts'])] * copies,
+                           'Standard', config['lopts'], **kwargs)
+
+def run_pipeline(config, copies=1, **kwargs):
+  """
+  This runs the configuration through a Pipeline and returns the signature of
+  each fabric model
+  """
+  stdout = io.StringIO()
+  with contextlib.redirect_stdout(stdout):
+    pipe = make_pipeline(config, copies, **kwargs)
+    if pipe.progress is not None:
+      pipe._progress_chunk = 7  # exercise the chunk boundaries
+    pipe.run()
+  return [signature(pipe.topo_model, fabric_model, pipe.layout_model,
+                    stdout.getvalue())
+          for fabric_model in pipe.fabric_models]
+
+class Interrupt(Exception):
+  pass
+
+def run_checkpointed(config, shard_size=3, interrupt_after=2):
+  """
+  This interrupts a checkpointed run after a few shards, resumes it from the
+  checkpoint, and returns the signature of each fabric model
+  """
+  stdout = io.StringIO()
+  with tempfile.TemporaryDirectory() as tmpdir, \
+       contextlib.redirect_stdout(stdout):
+    checkpoint = os.path.join(tmpdir, 'run.ckpt')
+    pipe = make_pipeline(config, checkpoint=checkpoint, shard_size=shard_size)
+    write_checkpoint = pipe._write_checkpoint
+    written = []
+    def interrupting_write(*args):
+      write_checkpoint(*args)
+      written.append(args)
+      if len(written) == interrupt_after:
+        raise Interrupt()
+    pipe._write_checkpoint = interrupting_write
+    try:
+      pipe.run()
+    except Interrupt:
+      # the stdout of both runs is compared, like the output of a killed and
+      #  a resumed process
+      pipe = make_pipeline(config, checkpoint=checkpoint,
+                           shard_size=shard_size)
+      pipe.run()
+  return [signature(pipe.topo_model, fabric_model, pipe.layout_model,
+                    stdout.getvalue())
+          for fabric_model in pipe.fabric_models]
+
+def run_shards(config, shard_size=5):
+  """
+  This runs the configuration in shards merged into one pipeline and returns
+  the signature of each fabric model. Shards don't print the per section
+  output of the topology so stdout isn't compared.
+  """
+  with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+    pipe = make_pipeline(config, copies=2)
+    pipe.add_routers()
+    start = 0
+    exhausted = False
+    while not exhausted:
+      shard = make_pipeline(config, copies=2)
+      exhausted = shard.run_shard(start, start + shard_size)
+      pipe.merge(shard)
+      start += shard_size
+    for fabric_model in pipe.fabric_models:
+      fabric_model.set_attributes()
+  signatures = []
+  for fabric_model in pipe.fabric_models:
+    sig = signature(pipe.topo_model, fabric_model, pipe.layout_model, None)
+    del sig['stdout']
+    signatures.append(sig)
+  return signatures
+
+# the engines that must match the reference
+VARIANTS = OrderedDict([
+  ('pipeline', lambda config: run_pipeline(config)),
+  ('pipeline-multi', lambda config: run_pipeline(config, copies=3)),
+  ('pipeline-timed',
+   lambda config: run_pipeline(config, timings=utils.Timings())),
+  ('pipeline-progress',
+   lambda config: run_pipeline(config, progress=utils.Progress(
+     interval=float('inf'), fd=open(os.devnull, 'w')))),
+  ('pipeline-schedule',
+   lambda config: run_pipeline(config, schedule=os.devnull)),
+  ('pipeline-checkpoint', run_checkpointed),
+  ('pipeline-shards', run_shards)])
+
+def check(config, variants):
+  """
+  This compares the variants to the reference, a variant's signatures may
+  leave out what it doesn't reproduce
+
+  Returns:
+    None if the config is invalid, else a list of (variant, difference)
+  """
+  try:
+    expected = reference(config)[0]
+  except (AssertionError, ValueError, ZeroDivisionError):
+    return None
+  failures = []
+  for name in variants:
+    try:
+      results = VARIANTS[name](config)
+    except Exception as ex:
+      failures.append((name, 'raised {!r}'.format(ex)))
+      continue
+    for result in results:
+      differences = [key for key in result if result[key] != expected[key]]
+      if differences:
+        failures.append((name, 'differs in {}'.format(', '.join(differences))))
+        break
+  return failures
+
+def _numbers(value):
+  return [int(v) for v in value.split(',')]
+
+def shrink_candidates(config):
+  """
+  This generates smaller versions of a configuration
+  """
+  topts = config['topts']
+  keys = [key for key in topts if all(v.isdigit() for v in
+                                      topts[key].split(','))]
+
+  # remove a dimension from all equal length lists
+  lists = [key for key in keys if ',' in topts[key]]
+  if lists:
+    length = len(topts[lists[0]].split(','))
+    same = [key for key in lists if len(topts[key].split(',')) == length]
+    for idx in range(length):
+      candidate = dict(topts)
+      for key in same:
+        values = _numbers(topts[key])
+        del values[idx]
+        candidate[key] = ','.join(map(str, values))
+      yield candidate
+
+  # reduce each number
+  for key in keys:
+    values = _numbers(topts[key])
+    for idx, value in enumerate(values):
+      for smaller in sorted({1, value // 2, value - 1}):
+        if 0 <= smaller < value:
+          candidate = dict(topts)
+          reduced = list(values)
+          reduced[idx] = smaller
+          candidate[key] = ','.join(map(str, reduced))
+          yield candidate
+
+def shrink(config, variant):
+  """
+  This greedily shrinks a failing configuration while it still fails the same
+  variant
+  """
+  improved = True
+  while improved:
+    improved = False
+    for topts in shrink_candidates(config):
+      candidate = OrderedDict(config)
+      candidate['topts'] = topts
+      failures = check(candidate, [variant])
+      if failures:
+        config = candidate
+        improved = True
+        break
+  return config
+
+def test(args):
+  """
+  This checks one configuration and shrinks it on failure
+  """
+  config, variants = args
+  failures = check(config, variants)
+  if not failures:
+    return config, failures, None
+  return config, failures, shrink(config, failures[0][0])
+
+def command(config):
+  """
+  Returns the main.py command line of a configuration
+  """
+  def opts(flag, values):
+    return '{} {}'.format(flag, ' '.join('{}={}'.format(k, v)
+                                          for k, v in values.items()))
+  return './main.py {} {} {} Standard {} {}'.format(
+    config['topology'], opts('--topts', config['topts']), config['fabric'],
+    opts('--fopts', config['fopts']), opts('--lopts', config['lopts']))
+
+def main(args):
+  # generate valid configurations
+  rng = random.Random(args.seed)
+  topologies = args.topologies.split(',')
+  variants = args.variants.split(',')
+  configs = [random_config(rng, topologies) for _ in range(args.count)]
+
+  # check them in parallel
+  tested = 0
+  failed = 0
+  with concurrent.futures.ProcessPoolExecutor(args.workers) as executor:
+    for config, failures, minimal in executor.map(
+        test, [(config, variants) for config in configs]):
+      if failures is None:
+        continue  # invalid configuration
+      tested += 1
+      if args.verbose:
+        print('{:<6} {}'.format('FAIL' if failures else 'ok', command(config)),
+              file=sys.stderr)
+      if failures:
+        failed += 1
+        for name, difference in failures:
+          print('{}: {}'.format(name, difference))
+        print('  config  : {}'.format(command(config)))
+        print('  minimal : {}'.format(command(minimal)))
+  print('{} valid configurations, {} failed'.format(tested, failed))
+  return 1 if failed else 0
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(
+    description='differential test of the engines versus the reference loop')
+  ap.add_argument('--count', type=int, default=200,
+                  help='number of random configurations')
+  ap.add_argument('--seed', type=int, default=12345678,
+                  help='seed of the random number generator')
+  ap.add_argument('--topologies', type=str, default=','.join(GENERATORS),
+                  help='topology models to test, comma separated')
+  ap.add_argument('--variants', type=str, default=','.join(VARIANTS),
+                  help='engines to test, comma separated')
+  ap.add_argument('--workers', type=int, default=os.cpu_count(),
+                  help='number of parallel processes')
+  ap.add_argument('-v', '--verbose', action='store_true',
+                  help='print every configuration')
+  args = ap.parse_args()
+  for name in args.topologies.split(','):
+    if name not in GENERATORS:
+      ap.error('unknown topology: {}'.format(name))
+  for name in args.variants.split(','):
+    if name not in VARIANTS:
+      ap.error('unknown variant: {}'.format(name))
+  sys.exit(main(args))
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import collections
+import math
+import multiprocessing
+import multiprocessing.managers
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+import main as single
+import pipeline
+import results
+import sweep as sweeps
+
+class Broker(object):
+  """
+  This hands out tasks to workers and collects their results. A task is leased
+  to the worker that took it and is queued again when that worker stops
+  sending heartbeats, the first result of a task is kept.
+  """
+
+  def __init__(self, lease, on_lease=None):
+    """
+    Constructs a Broker object
+
+    Args:
+      lease (float) : seconds without a heartbeat before a worker is lost
+      on_lease (callable) : called with the task id and the task before a
+                            worker is given the task
+    """
+    self._lease = lease
+    self._on_lease = on_lease
+    self._lock = threading.Lock()
+    self._queue = collections.deque()  # task ids
+    self._tasks = {}  # task id->task, until finished
+    self._leases = {}  # task id->worker
+    self._heartbeats = {}  # worker->time
+    self._closed = False
+    self.results = queue.Queue()  # (task id, ok, value)
+    self.lost_workers = 0
+    self.requeued = 0
+
+  def add(self, task_id, task):
+    with self._lock:
+      self._tasks[task_id] = task
+      self._queue.append(task_id)
+
+  def discard(self, task_ids):
+    """
+    This removes tasks that haven't finished, their results are ignored
+    """
+    with self._lock:
+      for task_id in task_ids:
+        self._tasks.pop(task_id, None)
+        self._leases.pop(task_id, None)
+      self._queue = collections.deque(
+        task_id for task_id in self._queue if task_id in self._tasks)
+
+  def close(self):
+    """
+    This drops the queued tasks and tells the workers to stop
+    """
+    with self._lock:
+      self._closed = True
+      self._queue.clear()
+
+  def heartbeat(self, worker):
+    with self._lock:
+      self._heartbeats[worker] = time.monotonic()
+
+  def get_task(self, worker):
+    """
+    Returns ('task', task id, task), ('wait',), or ('stop',)
+    """
+    with self._lock:
+      self._heartbeats[worker] = time.monotonic()
+      reply = ('stop',) if self._closed else ('wait',)
+      while self._queue:
+        task_id = self._queue.popleft()
+        if task_id in self._tasks and task_id not in self._leases:
+          self._leases[task_id] = worker
+          reply = ('task', task_id, self._tasks[task_id])
+          break
+    if self._on_lease is not None and reply[0] == 'task':
+      self._on_lease(reply[1], reply[2])
+    return reply
+
+  def finish(self, worker, task_id, ok, value):
+    """
+    This takes the result of a task, results of finished tasks are ignored
+    """
+    with self._lock:
+      self._heartbeats[worker] = time.monotonic()
+      if task_id not in self._tasks:
+        return
+      del self._tasks[task_id]
+      self._leases.pop(task_id, None)
+    self.results.put((task_id, ok, value))
+
+  def expire(self):
+    """
+    This queues the tasks of lost workers again
+    """
+    now = time.monotonic()
+    with self._lock:
+      lost = set(worker for worker, beat in self._heartbeats.items()
+                 if now - beat > self._lease)
+      for worker in lost:
+        del self._heartbeats[worker]
+      self.lost_workers += len(lost)
+      for task_id, worker in list(self._leases.items()):
+        if worker in lost:
+          del self._leases[task_id]
+          self._queue.appendleft(task_id)
+          self.requeued += 1
+
+class BrokerManager(multiprocessing.managers.BaseManager):
+  pass
+
+def address(text):
+  host, _, port = text.rpartition(':')
+  return (host or '127.0.0.1', int(port))
+
+def run_task(task):
+  """
+  This runs a task in a worker
+
+  Returns:
+    the result of the sweep point or (exhausted, pipeline) of the cable shard
+  """
+  if task[0] == 'point':
+    _, request, records = task
+    return pipeline.evaluate(pipeline.normalize(request), records=records)
+  _, args, start, stop = task
+  pipe = pipeline.Pipeline(*args)
+  exhausted = pipe.run_shard(start, stop)
+  return exhausted, pipe
+
+def worker(coordinator, authkey, lease):
+  """
+  This runs tasks of the coordinator until it tells the worker to stop
+  """
+  BrokerManager.register('broker')
+  manager = BrokerManager(address=coordinator, authkey=authkey)
+  manager.connect()
+  broker = manager.broker()
+  name = '{}:{}'.format(socket.gethostname(), os.getpid())
+  pipeline.warm()
+
+  # heartbeats are sent while tasks run
+  stop = threading.Event()
+  def beat():
+    while not stop.wait(lease / 4):
+      try:
+        broker.heartbeat(name)
+      except (OSError, EOFError):
+        return
+  threading.Thread(target=beat, daemon=True).start()
+
+  try:
+    while True:
+      reply = broker.get_task(name)
+      if reply[0] == 'stop':
+        break
+      if reply[0] == 'wait':
+        time.sleep(0.1)
+        continue
+      _, task_id, task = reply
+      try:
+        value = run_task(task)
+        ok = True
+      except Exception as ex:
+        value = '{}: {}'.format(type(ex).__name__, ex)
+        ok = False
+      broker.finish(name, task_id, ok, value)
+  except (OSError, EOFError):
+    pass  # the coordinator is gone
+  finally:
+    stop.set()
+
+class Coordinator(object):
+  """
+  This serves a Broker to workers on any host and optionally starts local
+  workers
+  """
+
+  def __init__(self, args, on_lease=None):
+    self.broker = Broker(args.lease, on_lease)
+    self._lease = args.lease
+    self._expired = time.monotonic()
+    BrokerManager.register('broker', callable=lambda: self.broker)
+    manager = BrokerManager(address=address(args.address),
+                            authkey=args.authkey.encode('utf-8'))
+    self._server = manager.get_server()
+    self.address = self._server.address
+    threading.Thread(target=self._server.serve_forever, daemon=True).start()
+    print('coordinator on {}:{}'.format(*self.address), file=sys.stderr,
+          flush=True)
+    context = multiprocessing.get_context('spawn')
+    self._workers = [
+      context.Process(target=worker, args=(
+        self.address, args.authkey.encode('utf-8'), args.lease))
+      for _ in range(args.local_workers)]
+    for process in self._workers:
+      process.start()
+
+  def result(self):
+    """
+    This waits for the next result while queueing the tasks of lost workers
+    again
+
+    Returns:
+      (task id, ok, value)
+    """
+    while True:
+      if time.monotonic() - self._expired > self._lease / 4:
+        self.broker.expire()
+        self._expired = time.monotonic()
+      try:
+        return self.broker.results.get(timeout=self._lease / 4)
+      except queue.Empty:
+        pass
+
+  def close(self):
+    self.broker.close()
+    for process in self._workers:
+      process.join()
+
+def sweep(args):
+  """
+  This distributes the points of a sweep, the journal makes it resumable
+  """
+  points = sweeps.load(args.spec)
+  store = None if args.store is None else results.ResultStore(args.store)
+  try:
+    with results.Journal(args.journal) as journal:
+      recorder = sweeps.Recorder(journal, store)
+      pending = sweeps.pending(points, journal, args.retry_failed)
+      # points are journaled as started when a worker takes them
+      coordinator = Coordinator(
+        args, on_lease=lambda key, task: journal.start(key, points[key]))
+      try:
+        for key in pending:
+          coordinator.broker.add(key, ('point', points[key],
+                                       store is not None))
+        for _ in pending:
+          key, ok, value = coordinator.result()
+          if ok:
+            recorder.finish(key, value)
+          else:
+            recorder.fail(key, value)
+          if args.verbose:
+            print('{} {}'.format(key[:12], 'finished' if ok else 'failed'),
+                  file=sys.stderr)
+      finally:
+        recorder.flush()
+        coordinator.close()
+      if args.verbose:
+        print('{} finished, {} failed, {} lost workers, {} tasks requeued'
+              .format(len([key for key in points if key in journal.finished]),
+                      len([key for key in points if key in journal.failed]),
+                      coordinator.broker.lost_workers,
+                      coordinator.broker.requeued), file=sys.stderr)
+  finally:
+    if store is not None:
+      store.close()
+
+def shards(args):
+  """
+  This distributes shards of the cables of one configuration and merges them
+  """
+  topts = dict([] if not args.topts else args.topts)
+  fabric_names = args.fabric.split(',')
+  fopts = [[]] if not args.fopts else args.fopts
+  if len(fopts) == 1:
+    fopts = fopts * len(fabric_names)
+  if len(fopts) != len(fabric_names):
+    raise ValueError('--fopts must be given once or once per fabric model')
+  fabrics = [(name, dict(opts)) for name, opts in zip(fabric_names, fopts)]
+  lopts = dict([] if not args.lopts else args.lopts)
+  pipeline_args = (args.topology, topts, fabrics, args.layout, lopts)
+  pipe = pipeline.Pipeline(*pipeline_args)
+  pipe.add_routers()
+
+  # the expected cables bound the number of generated tuples
+  expected = pipe.topo_model.expected_cables()
+  shard_size = args.shard_size
+  if shard_size is None:
+    workers = args.workers or args.local_workers or os.cpu_count()
+    shard_size = max(1, math.ceil(
+      expected / (workers * args.shards_per_worker)))
+  count = max(1, math.ceil(expected / shard_size))
+  coordinator = Coordinator(args)
+  try:
+    for shard in range(count):
+      coordinator.broker.add(shard, (
+        'shard', pipeline_args, shard * shard_size, (shard + 1) * shard_size))
+    outstanding = set(range(count))
+    finished = {}  # shard->pipeline, waiting for the preceding shards
+    merged = 0
+    while outstanding:
+      shard, ok, value = coordinator.result()
+      if shard not in outstanding:
+        continue  # discarded
+      outstanding.remove(shard)
+      if not ok:
+        raise RuntimeError('shard {} failed: {}'.format(shard, value))
+      exhausted, finished[shard] = value
+      if exhausted:
+        # the shards past the last tuple are empty
+        empty = [other for other in outstanding if other > shard]
+        coordinator.broker.discard(empty)
+        outstanding.difference_update(empty)
+      # shards are merged in order
+      while merged in finished:
+        pipe.merge(finished.pop(merged))
+        merged += 1
+      if args.verbose:
+        print('shard {} finished, {} merged, {} remaining'.format(
+          shard, merged, len(outstanding)), file=sys.stderr)
+  finally:
+    coordinator.close()
+  for fabric_model in pipe.fabric_models:
+    fabric_model.set_attributes()
+
+  # generate outputs
+  multiple = len(pipe.fabric_models) > 1
+  numeric = args.summary_format == 'numeric'
+  metadata = pipe.metadata() if numeric else None
+  for label, fabric_model in zip(pipe.fabric_labels, pipe.fabric_models):
+    if multiple and args.summary == '-':
+      print('{}:'.format(label))
+    fabric_model.summary(
+      pipe.nodes, single.fabric_filename(args.summary, label, multiple),
+      numeric=numeric, metadata=metadata)
+  if args.tray_csv is not None:
+    pipe.layout_model.cable_tray_csv(args.tray_csv)
+  if args.topo_info is not None:
+    pipe.topo_model.info_file(args.topo_info)
+
+def main(args):
+  if args.command == 'worker':
+    worker_args = (address(args.address), args.authkey.encode('utf-8'),
+                   args.lease)
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=worker, args=worker_args)
+                 for _ in range(args.processes - 1)]
+    for process in processes:
+      process.start()
+    worker(*worker_args)
+    for process in processes:
+      process.join()
+  elif args.command == 'sweep':
+    sweep(args)
+  else:
+    shards(args)
+
+if __name__ == '__main__':
+  # ensures key/value pair format and converts to tuple
+  def check_option(pair):
+    if len(pair.split('=')) != 2 or not all(pair.split('=')):
+      raise argparse.ArgumentTypeError('invalid key/pair: {}'.format(pair))
+    return tuple(pair.split('='))
+
+  ap = argparse.ArgumentParser(
+    description='distributes fabcalc evaluations to workers on many hosts')
+  sub = ap.add_subparsers(dest='command', required=True)
+  worker_ap = sub.add_parser('worker', help='run tasks of a coordinator')
+  worker_ap.add_argument('--processes', type=int, default=os.cpu_count(),
+                         help='number of worker processes on this host')
+  sweep_ap = sub.add_parser('sweep', help='distribute the points of a sweep')
+  sweep_ap.add_argument('spec', type=str,
+                        help='JSON sweep specification, or a list of them')
+  sweep_ap.add_argument('journal', type=str,
+                        help='append-only journal of the sweep')
+  sweep_ap.add_argument('--retry_failed', action='store_true',
+                        help='run the points that failed before again')
+  sweep_ap.add_argument('--store', type=str,
+                        help='SQLite result store the results are also added '
+                             'to')
+  shards_ap = sub.add_parser(
+    'shards', help='distribute shards of the cables of one configuration',
+    description=('distributes shards of the cables of one configuration. The '
+                 'topology seeks to the start of each shard, so all shards '
+                 'cost about the same. The results are merged in shard '
+                 'order.'))
+  shards_ap.add_argument('topology', type=str,
+                         help='the topology model to use')
+  shards_ap.add_argument('fabric', type=str,
+                         help='the fabric model(s) to use, comma separated')
+  shards_ap.add_argument('layout', type=str,
+                         help='the layout model to use')
+  shards_ap.add_argument('--topts', nargs='*', type=check_option,
+                         help='<key>=<value> pair to configure the topology')
+  shards_ap.add_argument('--fopts', nargs='*', type=check_option,
+                         action='append',
+                         help=('<key>=<value> pair to configure the fabric '
+                               'model, given once for all or once per fabric '
+                               'model'))
+  shards_ap.add_argument('--lopts', nargs='*', type=check_option,
+                         help='<key>=<value> pair to configure the layout')
+  shards_ap.add_argument('--shard_size', type=int,
+                         help=('number of cable tuples per shard (default '
+                               'splits the cables among the workers)'))
+  shards_ap.add_argument('--workers', type=int,
+                         help=('number of worker processes expected to '
+                               'connect, it sizes the shards (default is '
+                               '--local_workers or the CPUs of this host)'))
+  shards_ap.add_argument('--shards_per_worker', type=int, default=4,
+                         help='shards per worker for load balancing')
+  shards_ap.add_argument('--summary', type=str, default='-',
+                         help='cost and power summary file')
+  shards_ap.add_argument('--summary_format', type=str, default='human',
+                         choices=['human', 'numeric'],
+                         help='human readable strings or raw numbers')
+  shards_ap.add_argument('--tray_csv', type=str,
+                         help='CSV file of cable tray usage')
+  shards_ap.add_argument('--topo_info', type=str,
+                         help='Topology information file')
+  for sub_ap in [worker_ap, sweep_ap, shards_ap]:
+    sub_ap.add_argument('--address', type=str, default='127.0.0.1:8238',
+                        help=('host:port of the coordinator, port 0 picks a '
+                              'free port, use 0.0.0.0 to listen on all '
+                              'interfaces'))
+    sub_ap.add_argument('--authkey', type=str,
+                        default=os.environ.get('FABCALC_AUTHKEY'),
+                        help=('shared secret, required, FABCALC_AUTHKEY by '
+                              'default'))
+    sub_ap.add_argument('--lease', type=float, default=30,
+                        help='seconds without a heartbeat before a worker is '
+                             'lost and its tasks are queued again')
+  for sub_ap in [sweep_ap, shards_ap]:
+    sub_ap.add_argument('--local_workers', type=int, default=0,
+                        help='number of workers started on this host')
+    sub_ap.add_argument('-v', '--verbose', action='store_true',
+                        help='print progress to stderr')
+  args = ap.parse_args()
+  if not args.authkey:
+    ap.error('an authkey is required, give --authkey or set FABCALC_AUTHKEY')
+  main(args)
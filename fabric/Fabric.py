@@ -30,10 +30,8 @@
 """
 
 from collections import OrderedDict
-import gridstats
 import json
 import math
-import numpy
 import sys
 
 import utils
@@ -64,6 +62,18 @@ class Fabric(object):
     self._cable_granularity = utils.meters(
       kwargs.get('cable_granularity', '0.5m'))
 
+    # implementations set this when router radix is limited
+    self.max_radix = None
+
+    # priced cables by minimum length
+    self._priced_cables = {}
+
+  def __getstate__(self):
+    # priced cables are rebuilt as needed
+    state = self.__dict__.copy()
+    state['_priced_cables'] = {}
+    return state
+
   def add_router(self, minimum_radix, count=1):
     """
     Adds routers to the fabric
@@ -96,6 +106,44 @@ class Fabric(object):
       self._cables[cable.actual_length] = [cable, 0]
     self._cables[cable.actual_length][1] += count
 
+  def merge(self, other):
+    """
+    Adds the routers and cables of another fabric of the same model, e.g., one
+    that was given a different shard of the cables
+    """
+    for ours, theirs in [(self._routers, other._routers),
+                         (self._cables, other._cables)]:
+      for key, (item, count) in theirs.items():
+        if key in ours:
+          ours[key][1] += count
+        else:
+          ours[key] = [item, count]
+
+  def priced_router(self, minimum_radix):
+    """
+    Returns a router with its attributes set without adding it to the fabric
+    """
+    router = self._make_router(minimum_radix)
+    self._set_router_attributes(router, 1)
+    return router
+
+  def priced_cable(self, minimum_length):
+    """
+    Returns a cable with its attributes set without adding it to the fabric
+    """
+    cable = self._priced_cables.get(minimum_length)
+    if utils.stats.enabled:
+      utils.stats.increment('fabric.priced_cable.{}'.format(
+        'misses' if cable is None else 'hits'))
+    if cable is None:
+      # apply cable granularity
+      granular_length = (math.ceil(minimum_length / self._cable_granularity) *
+                         self._cable_granularity)
+      cable = self._make_cable(granular_length)
+      self._set_cable_attributes(cable, 1)
+      self._priced_cables[minimum_length] = cable
+    return cable
+
   def set_attributes(self):
     """
     This is called after all routers and cables have added to the model.
@@ -105,9 +153,32 @@ class Fabric(object):
     for _, ci in self._cables.items():
       self._set_cable_attributes(ci[0], ci[1])
 
-  def summary(self, nodes, filename):
+  def cable_catalog(self):
+    """
+    Returns the list of (length, tech, cost, power) cable options of this fabric
+    or None if this fabric doesn't use a catalog of cables
+    """
+    return getattr(self, '_options', None)
+
+  def cable_histogram(self):
+    """
+    Returns the list of (actual length, count) of the cables in this fabric
+    sorted by length
     """
-    Writes a summary JSON file
+    return [(length, self._cables[length][1])
+            for length in sorted(self._cables)]
+
+  def router_histogram(self):
+    """
+    Returns the list of (radix, count) of the routers in this fabric sorted by
+    radix
+    """
+    return [(radix, self._routers[radix][1])
+            for radix in sorted(self._routers)]
+
+  def totals(self, nodes):
+    """
+    Returns a dict of the numeric router, cable, and total values
     """
     # determine total router values
     router_count = 0
@@ -129,23 +200,91 @@ class Fabric(object):
 
     # totals and relatives
     total_cost = router_cost + cable_cost
-    relative_cost = total_cost / nodes
     total_power = router_power + cable_power
-    relative_power = total_power / nodes
 
     # create dict of information
     data = OrderedDict()
-    data['nodes'] = '{0:,}'.format(nodes)
-    data['router count'] = '{0:,}'.format(router_count)
-    data['router cost'] = '${0:,.00f}'.format(router_cost)
-    data['router power'] = '{0:,.00f} Watts'.format(router_power)
-    data['cable count'] = '{0:,}'.format(cable_count)
-    data['cable cost'] = '${0:,.00f}'.format(cable_cost)
-    data['cable power'] = '{0:,.00f} Watts'.format(cable_power)
-    data['total cost'] = '${0:,.00f}'.format(total_cost)
-    data['relative cost'] = '${0:,.02f}/node'.format(relative_cost)
-    data['total power'] = '{0:,.00f} Watts'.format(total_power)
-    data['relative power'] = '{0:,.02f} Watts/node'.format(relative_power)
+    data['nodes'] = nodes
+    data['router count'] = router_count
+    data['router cost'] = router_cost
+    data['router power'] = router_power
+    data['cable count'] = cable_count
+    data['cable cost'] = cable_cost
+    data['cable power'] = cable_power
+    data['total cost'] = total_cost
+    data['relative cost'] = total_cost / nodes
+    data['total power'] = total_power
+    data['relative power'] = total_power / nodes
+    return data
+
+  def tech_totals(self):
+    """
+    Returns dicts of the numeric router and cable values of each technology
+
+    Returns:
+      tuple (dict, dict) : tech->[count, cost, power] of the routers,
+                           tech->[count, cost, power, length] of the cables
+    """
+    routers = OrderedDict()
+    for radix in sorted(self._routers):
+      router, count = self._routers[radix]
+      values = routers.setdefault(router.tech, [0, 0, 0])
+      values[0] += count
+      values[1] += router.cost * count
+      values[2] += router.power * count
+    cables = OrderedDict()
+    for length in sorted(self._cables):
+      cable, count = self._cables[length]
+      values = cables.setdefault(cable.tech, [0, 0, 0, 0])
+      values[0] += count
+      values[1] += cable.cost * count
+      values[2] += cable.power * count
+      values[3] += length * count
+    return routers, cables
+
+  def numeric_summary(self, nodes, metadata=None):
+    """
+    Returns a dict of the summary with raw numbers and the units in the names
+    """
+    totals = self.totals(nodes)
+    routers, cables = self.tech_totals()
+
+    data = OrderedDict()
+    data['schema'] = 'fabcalc-summary-1'
+    data['nodes'] = totals['nodes']
+    data['router_count'] = totals['router count']
+    data['router_cost_usd'] = totals['router cost']
+    data['router_power_w'] = totals['router power']
+    data['cable_count'] = totals['cable count']
+    data['cable_cost_usd'] = totals['cable cost']
+    data['cable_power_w'] = totals['cable power']
+    data['cable_length_m'] = sum(values[3] for values in cables.values())
+    data['total_cost_usd'] = totals['total cost']
+    data['relative_cost_usd_per_node'] = totals['relative cost']
+    data['total_power_w'] = totals['total power']
+    data['relative_power_w_per_node'] = totals['relative power']
+    data['routers_by_tech'] = OrderedDict()
+    for tech, (count, cost, power) in routers.items():
+      data['routers_by_tech'][str(tech)] = OrderedDict([
+        ('count', count), ('cost_usd', cost), ('power_w', power)])
+    data['cables_by_tech'] = OrderedDict()
+    for tech, (count, cost, power, length) in cables.items():
+      data['cables_by_tech'][str(tech)] = OrderedDict([
+        ('count', count), ('cost_usd', cost), ('power_w', power),
+        ('length_m', length)])
+    if metadata is not None:
+      data['metadata'] = metadata
+    return data
+
+  def summary(self, nodes, filename, numeric=False, metadata=None):
+    """
+    Writes a summary JSON file, formatted for people unless 'numeric' is set
+    in which case numeric_summary() with the metadata is written
+    """
+    if numeric:
+      data = self.numeric_summary(nodes, metadata)
+    else:
+      data = self._formatted_summary(nodes)
 
     # write information
     if filename == '-':
@@ -155,43 +294,89 @@ class Fabric(object):
       with open(filename, 'w') as fd:
         json.dump(data, fd, indent=4)
 
-  def cable_bargraph(self, plt, filename, xmax, plot_cost, plot_power):
+  def _formatted_summary(self, nodes):
     """
-    Writes a bargraph of cable information
+    Returns a dict of the summary formatted for people
     """
+    totals = self.totals(nodes)
+
+    # create dict of information
+    data = OrderedDict()
+    data['nodes'] = '{0:,}'.format(totals['nodes'])
+    data['router count'] = '{0:,}'.format(totals['router count'])
+    data['router cost'] = '${0:,.00f}'.format(totals['router cost'])
+    data['router power'] = '{0:,.00f} Watts'.format(totals['router power'])
+    data['cable count'] = '{0:,}'.format(totals['cable count'])
+    data['cable cost'] = '${0:,.00f}'.format(totals['cable cost'])
+    data['cable power'] = '{0:,.00f} Watts'.format(totals['cable power'])
+    data['total cost'] = '${0:,.00f}'.format(totals['total cost'])
+    data['relative cost'] = '${0:,.02f}/node'.format(totals['relative cost'])
+    data['total power'] = '{0:,.00f} Watts'.format(totals['total power'])
+    data['relative power'] = '{0:,.02f} Watts/node'.format(
+      totals['relative power'])
+    return data
+
+  def cable_bargraph(self, plt, filename, xmax, plot_cost, plot_power,
+                     max_bars=160):
+    """
+    Writes a bargraph of cable information. When there are more than
+    'max_bars' lengths they are binned into 'max_bars' equal width bins so the
+    figure size and render time stay bounded.
+    """
+    import numpy  # only needed for plotting
 
     # extract cable elements
-    num_cable_lengths = len(self._cables)
-    cable_lengths = sorted(self._cables)
-    cable_counts = [self._cables[len][1]
-                    for len in sorted(self._cables)]
-    cable_costs = [self._cables[len][1] * self._cables[len][0].cost
-                   for len in sorted(self._cables)]
-    cable_powers = [self._cables[len][1] * self._cables[len][0].power
-                    for len in sorted(self._cables)]
-
-    # create empty cable locations
+    cable_lengths = numpy.array(sorted(self._cables), dtype=numpy.float64)
+    cable_counts = numpy.array([self._cables[lng][1]
+                                for lng in cable_lengths], dtype=numpy.float64)
+    cable_costs = cable_counts * numpy.array(
+      [self._cables[lng][0].cost for lng in cable_lengths], dtype=numpy.float64)
+    cable_powers = cable_counts * numpy.array(
+      [self._cables[lng][0].power for lng in cable_lengths],
+      dtype=numpy.float64)
+
+    # create empty cable locations at every granularity step up to xmax
     if xmax is not None:
-      if xmax < max(cable_lengths):
+      if xmax < cable_lengths[-1]:
         raise ValueError(('bargraph xmax is less than the maximum cable length '
-                          'of {}m').format(max(cable_lengths)))
+                          'of {}m').format(cable_lengths[-1]))
       clen = self._cable_granularity
-      idx = 0
-      # xmax = max(cable_lengths)
-      while clen <= xmax:
-        if idx == len(cable_lengths) or clen != cable_lengths[idx]:
-          cable_lengths.insert(idx, clen)
-          cable_counts.insert(idx, 0)
-          cable_costs.insert(idx, 0)
-          cable_powers.insert(idx, 0)
-        clen += self._cable_granularity
-        idx += 1
-      num_cable_lengths = len(cable_lengths)
-
-    ind = numpy.arange(num_cable_lengths)
+      steps = numpy.arange(1, math.floor(xmax / clen + 1e-9) + 1) * clen
+      # skip steps that match an existing length
+      pos = numpy.searchsorted(cable_lengths, steps)
+      below = cable_lengths[numpy.maximum(pos - 1, 0)]
+      above = cable_lengths[numpy.minimum(pos, len(cable_lengths) - 1)]
+      tolerance = clen * 1e-6
+      matched = ((numpy.abs(below - steps) <= tolerance) |
+                 (numpy.abs(above - steps) <= tolerance))
+      steps = steps[~matched]
+      order = numpy.argsort(numpy.concatenate((cable_lengths, steps)),
+                            kind='stable')
+      zeros = numpy.zeros(len(steps))
+      cable_lengths = numpy.concatenate((cable_lengths, steps))[order]
+      cable_counts = numpy.concatenate((cable_counts, zeros))[order]
+      cable_costs = numpy.concatenate((cable_costs, zeros))[order]
+      cable_powers = numpy.concatenate((cable_powers, zeros))[order]
+
+    # bin the lengths when there are too many bars
+    if len(cable_lengths) > max_bars:
+      top = cable_lengths[-1] if xmax is None else xmax
+      edges = numpy.linspace(0, top, max_bars + 1)
+      bins = numpy.clip(numpy.searchsorted(edges, cable_lengths) - 1, 0,
+                        max_bars - 1)
+      cable_counts = numpy.bincount(bins, cable_counts, max_bars)
+      cable_costs = numpy.bincount(bins, cable_costs, max_bars)
+      cable_powers = numpy.bincount(bins, cable_powers, max_bars)
+      labels = ['{0:.02f}-{1:.02f}m'.format(low, high)
+                for low, high in zip(edges[:-1], edges[1:])]
+    else:
+      labels = ['{0:.02f}m'.format(l) for l in cable_lengths]
+    num_bars = len(labels)
+
+    ind = numpy.arange(num_bars)
     width = 0.75
 
-    fig_width = max(5, num_cable_lengths * 0.25)
+    fig_width = max(5, num_bars * 0.25)
     fig = plt.figure(figsize=(fig_width, 10))
 
     cable_plot = 1
@@ -240,8 +425,7 @@ class Fabric(object):
     for ax in axes:
       ax.set_xlabel('Length (m)')
       ax.set_xticks(ind)
-      ax.set_xticklabels(['{0:.02f}m'.format(l) for l in cable_lengths],
-                         rotation='vertical')
+      ax.set_xticklabels(labels, rotation='vertical')
       ax.set_xlim(0 - width, max(ind) + width)
       ax.yaxis.grid(True)
       ax.set_axisbelow(True)
@@ -250,6 +434,7 @@ class Fabric(object):
     fig.suptitle('Cables', fontsize=20)
     fig.subplots_adjust(top=0.94)
     fig.savefig(filename)
+    plt.close(fig)
 
   def router_csv(self, filename):
     """
@@ -266,6 +451,7 @@ class Fabric(object):
 
 
     # create a gridstats object to hold the data
+    import gridstats  # only needed for CSV output
     grid = gridstats.GridStats()
     fields = ['Count', 'Cost ($)', 'Power (W)']
     grid.create('Radix', router_radices, fields)
@@ -294,6 +480,7 @@ class Fabric(object):
                     for lng in sorted(self._cables)]
 
     # create a gridstats object to hold the data
+    import gridstats  # only needed for CSV output
     grid = gridstats.GridStats()
     fields = ['Count', 'Cost ($)', 'Power (W)']
     grid.create('Length(m)', cable_lengths, fields)
@@ -308,6 +495,33 @@ class Fabric(object):
     # write the file
     grid.write(filename)
 
+  def columnar(self, directory):
+    """
+    This writes the cable and router tables as memory-mappable .npy columns
+    """
+    import numpy  # only needed for columnar output
+    lengths = sorted(self._cables)
+    cables = [self._cables[lng] for lng in lengths]
+    radices = sorted(self._routers)
+    routers = [self._routers[rdx] for rdx in radices]
+    utils.write_columns(directory, OrderedDict([
+      ('cable_length', numpy.array(lengths, dtype=numpy.float64)),
+      ('cable_count', numpy.array([cnt for _, cnt in cables],
+                                  dtype=numpy.int64)),
+      ('cable_cost', numpy.array([cnt * cbl.cost for cbl, cnt in cables],
+                                 dtype=numpy.float64)),
+      ('cable_power', numpy.array([cnt * cbl.power for cbl, cnt in cables],
+                                  dtype=numpy.float64)),
+      ('cable_tech', numpy.array([str(cbl.tech) for cbl, _ in cables],
+                                 dtype=numpy.str_)),
+      ('router_radix', numpy.array(radices, dtype=numpy.int64)),
+      ('router_count', numpy.array([cnt for _, cnt in routers],
+                                   dtype=numpy.int64)),
+      ('router_cost', numpy.array([cnt * rtr.cost for rtr, cnt in routers],
+                                  dtype=numpy.float64)),
+      ('router_power', numpy.array([cnt * rtr.power for rtr, cnt in routers],
+                                   dtype=numpy.float64))]))
+
   def _make_router(self, minimum_radix):
     """
     Makes a router
@@ -0,0 +1,190 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import csv
+import numpy
+import sys
+
+class PriceMatrix(object):
+  """
+  This evaluates the cost of a fabric under many price scenarios at once. The
+  fabric's cable and router counts are reduced to a count vector and all
+  scenarios are evaluated as a single matrix product against it.
+
+  A price scenario file is a CSV file with one scenario per row. The columns
+  are named as follows:
+    scenario       : the name of the scenario (optional)
+    cable:<length> : the price of the catalog cable of the given length
+    router:<radix> : the price of the router of the given radix
+    power          : the price per Watt of total power (default 0)
+  Any price not given by a scenario is the fabric's own price.
+  """
+
+  def __init__(self, fabric_model, nodes):
+    """
+    Constructs a PriceMatrix object
+
+    Args:
+      fabric_model (Fabric) : a fabric model with attributes already set
+      nodes (int) : the number of nodes in the system
+    """
+    self.nodes = nodes
+    self.columns = []
+    counts = []
+    defaults = []
+
+    # cables are counted per catalog option, cables without a catalog option
+    #  have a fixed cost
+    self._fixed_cost = 0
+    catalog = fabric_model.cable_catalog()
+    sku_counts = [0] * (0 if catalog is None else len(catalog))
+    for length in sorted(fabric_model._cables):
+      cable, count = fabric_model._cables[length]
+      sku = None
+      if catalog is not None:
+        for idx, option in enumerate(catalog):
+          if option[0] >= cable.actual_length:
+            sku = idx
+            break
+      if sku is None:
+        self._fixed_cost += cable.cost * count
+      else:
+        sku_counts[sku] += count
+    if catalog is not None:
+      for option, count in zip(catalog, sku_counts):
+        self.columns.append('cable:{0:g}'.format(option[0]))
+        counts.append(count)
+        defaults.append(option[2])
+    cable_columns = len(self.columns)
+
+    # routers are counted per radix
+    for radix in sorted(fabric_model._routers):
+      router, count = fabric_model._routers[radix]
+      self.columns.append('router:{0}'.format(radix))
+      counts.append(count)
+      defaults.append(router.cost)
+    router_columns = len(self.columns) - cable_columns
+
+    # power is charged by the Watt
+    total_power = fabric_model.totals(nodes)['total power']
+    self.columns.append('power')
+    counts.append(total_power)
+    defaults.append(0)
+
+    self.counts = numpy.array(counts, dtype=numpy.float64)
+    self.defaults = numpy.array(defaults, dtype=numpy.float64)
+
+    # the columns x categories matrix that maps prices to category costs
+    #  categories are cable, router, and power
+    categories = ([0] * cable_columns + [1] * router_columns + [2])
+    self._weights = numpy.zeros((len(self.columns), 3))
+    self._weights[numpy.arange(len(self.columns)), categories] = self.counts
+
+  def _column_index(self, name):
+    """
+    This finds the column of a scenario file header
+    """
+    kind, _, value = name.partition(':')
+    for idx, column in enumerate(self.columns):
+      ckind, _, cvalue = column.partition(':')
+      if kind == ckind and (cvalue == value or
+                            (cvalue and value and
+                             float(cvalue) == float(value))):
+        return idx
+    raise ValueError('unknown price scenario column: {}'.format(name))
+
+  def load(self, filename):
+    """
+    This loads a price scenario CSV file
+
+    Returns:
+      tuple (list, numpy.ndarray) : scenario names, scenarios x columns prices
+    """
+    with open(filename, 'r', newline='') as fd:
+      reader = csv.reader(fd)
+      header = [name.strip() for name in next(reader)]
+      rows = [row for row in reader if row]
+
+    # determine where each scenario column goes
+    name_col = header.index('scenario') if 'scenario' in header else None
+    price_cols = [(idx, self._column_index(name))
+                  for idx, name in enumerate(header) if idx != name_col]
+
+    # fill the price matrix starting from the default prices
+    matrix = numpy.tile(self.defaults, (len(rows), 1))
+    if price_cols:
+      src = [idx for idx, _ in price_cols]
+      dst = [idx for _, idx in price_cols]
+      values = numpy.array([[float(row[idx]) for idx in src] for row in rows],
+                           dtype=numpy.float64).reshape(len(rows), len(src))
+      matrix[:, dst] = values
+    if name_col is None:
+      names = [str(idx) for idx in range(len(rows))]
+    else:
+      names = [row[name_col] for row in rows]
+    return names, matrix
+
+  def evaluate(self, matrix):
+    """
+    This computes the costs of all scenarios
+
+    Args:
+      matrix (numpy.ndarray) : scenarios x columns prices
+
+    Returns:
+      numpy.ndarray : scenarios x 4 array of cable, router, power, and total
+                      costs
+    """
+    costs = numpy.empty((matrix.shape[0], 4))
+    costs[:, :3] = matrix @ self._weights
+    costs[:, 0] += self._fixed_cost
+    costs[:, 3] = costs[:, :3].sum(axis=1)
+    return costs
+
+  def scenario_csv(self, scenarios, filename):
+    """
+    This evaluates a price scenario file and writes the costs to a CSV file
+    """
+    names, matrix = self.load(scenarios)
+    costs = self.evaluate(matrix)
+
+    fd = sys.stdout if filename == '-' else open(filename, 'w', newline='')
+    try:
+      writer = csv.writer(fd)
+      writer.writerow(['Scenario', 'Cable Cost ($)', 'Router Cost ($)',
+                       'Power Cost ($)', 'Total Cost ($)',
+                       'Relative Cost ($/node)'])
+      for name, row in zip(names, costs):
+        writer.writerow([name] + ['{0:.02f}'.format(value) for value in row] +
+                        ['{0:.02f}'.format(row[3] / self.nodes)])
+    finally:
+      if fd is not sys.stdout:
+        fd.close()
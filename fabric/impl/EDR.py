@@ -46,6 +46,9 @@ class EDR(fabric.Fabric):
       else:
         assert False, 'unknown option key: {}'.format(key)
 
+    # largest router radix, 648 port routers are director chassis
+    self.max_radix = 36
+
     # data from:
     # https://store.mellanox.com/search.php?search_query=edr+cable&x=0&y=0
     self._options = [
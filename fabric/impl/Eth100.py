@@ -46,6 +46,9 @@ class Eth100(fabric.Fabric):
       else:
         assert False, 'unknown option key: {}'.format(key)
 
+    # largest router radix
+    self.max_radix = 64
+
     # electrical
     # http://www.fs.com/products/47096.html (Dell)
     # optical
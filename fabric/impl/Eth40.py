@@ -46,6 +46,9 @@ class Eth40(fabric.Fabric):
       else:
         assert False, 'unknown option key: {}'.format(key)
 
+    # largest router radix
+    self.max_radix = 32
+
     # data from: FiberStore.com
     self._options = [
       (0.5,   'pcc', 36,   0),
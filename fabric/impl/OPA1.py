@@ -46,6 +46,9 @@ class OPA1(fabric.Fabric):
       else:
         assert False, 'unknown option key: {}'.format(key)
 
+    # largest router radix
+    self.max_radix = 48
+
     # data from:
     # https://ark.intel.com/products/family/92006/Intel-Omni-Path-Cable-Products
     self._options = [
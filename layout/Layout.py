@@ -30,7 +30,8 @@
 """
 
 import math
-import numpy
+
+import utils
 
 class Layout(object):
   """
@@ -67,8 +68,14 @@ class Layout(object):
     # create an array to hold number of cables between racks
     #  these are counters for cable trays
     self._actual_racks_per_row = min(self.racks_per_row, self.total_racks)
-    self._row_cables = numpy.zeros((self.rows, self._actual_racks_per_row - 1))
-    self._col_cables = numpy.zeros((self._actual_racks_per_row, self.rows - 1))
+    self._row_cables = [[0.0] * (self._actual_racks_per_row - 1)
+                        for _ in range(self.rows)]
+    self._col_cables = [[0.0] * (self.rows - 1)
+                        for _ in range(self._actual_racks_per_row)]
+
+    # the cable tray route of the last length() call, layouts doing cable tray
+    #  accounting set this to (row, start, end, col, start, end) or None
+    self.last_route = None
 
   def length(self, source, destination, count):
     """
@@ -81,6 +88,50 @@ class Layout(object):
     """
     raise NotImplementedError('subclasses must implement this')
 
+  def start_shard(self):
+    """
+    This is called before the layout is given a shard of the cables that might
+    not start with the first cable. Layouts whose accounting depends on the
+    preceding cables override this to account for every possible preceding
+    state, merge() then picks the right one.
+    """
+    pass
+
+  def merge(self, other):
+    """
+    This adds the cable tray counters of another layout of the same system,
+    e.g., one that was given the next shard of the cables. Shards are merged in
+    the order of their cables.
+    """
+    self._add_trays(other._row_cables, other._col_cables)
+
+  def _add_trays(self, row_cables, col_cables):
+    for ours, theirs in [(self._row_cables, row_cables),
+                         (self._col_cables, col_cables)]:
+      for our_trays, their_trays in zip(ours, theirs):
+        for idx, value in enumerate(their_trays):
+          our_trays[idx] += value
+
+  def distance(self, source, destination):
+    """
+    This returns a length in meters from the source to the destination without
+    doing any cable tray accounting
+
+    Args:
+      source (Coordinate) : the source coordinate of the cable
+      destination (Coordinate) : the destination coordinate of the cable
+    """
+    raise NotImplementedError('subclasses must implement this')
+
+  def minimum_lengths(self):
+    """
+    This returns lower bounds of cable lengths within a rack and between racks
+
+    Returns:
+      tuple (float, float) : intra-rack minimum, inter-rack minimum
+    """
+    raise NotImplementedError('subclasses must implement this')
+
   def row_cable_strand(self, row, start, end, count):
     """
     This adds a cable strand down a row for cable tray accounting
@@ -94,7 +145,7 @@ class Layout(object):
     assert end >= start, 'end must be >= start'
     if end > start:
       for loc in range(start, end):
-        self._row_cables[row, loc] += count
+        self._row_cables[row][loc] += count
 
   def col_cable_strand(self, col, start, end, count):
     """
@@ -109,7 +160,28 @@ class Layout(object):
     assert end >= start, 'end must be >= start'
     if end > start:
       for loc in range(start, end):
-        self._col_cables[col, loc] += count
+        self._col_cables[col][loc] += count
+
+  def cable_trays(self):
+    """
+    Returns copies of the cable tray counters
+
+    Returns:
+      tuple (list, list) : rows x racks_per_row-1 cables down each row,
+                           racks_per_row x rows-1 cables between rows
+    """
+    return ([list(row) for row in self._row_cables],
+            [list(col) for col in self._col_cables])
+
+  def columnar(self, directory):
+    """
+    This writes the cable tray counters as memory-mappable .npy arrays
+    """
+    import numpy  # only needed for columnar output
+    row_cables, col_cables = self.cable_trays()
+    utils.write_columns(directory, {
+      'tray_row': numpy.array(row_cables, dtype=numpy.float64),
+      'tray_col': numpy.array(col_cables, dtype=numpy.float64)})
 
   def cable_tray_csv(self, filename):
     """
@@ -129,7 +201,7 @@ class Layout(object):
         # print the row-to-row
         if row < self.rows - 1:
           for col in range(self._actual_racks_per_row):
-            value = self._col_cables[col, row]
+            value = self._col_cables[col][row]
             last = col == self._actual_racks_per_row - 1
             fd.write('{}{}'.format(value, '' if last else ',-,'))
           fd.write('\n')
@@ -33,30 +33,42 @@ from .Layout import *
 from .Coordinate import *
 
 import os
-import sys
 import importlib
 
 def generate():
-  # dynamically find and import modules
+  # models are found and imported lazily
   this_dir = os.path.dirname(__file__)
   impl_dir = os.path.join(this_dir, 'impl')
-  models = {}
-  if os.path.isdir(impl_dir):
-    for filename in os.listdir(impl_dir):
-      if filename.endswith('.py'):
-        model = filename[:-3]
-        module = os.path.basename(this_dir) + '.impl.' + model
-        module = importlib.import_module(module)
-        constructor = getattr(module, model)
-        models[filename[:-3]] = constructor
+  package = os.path.basename(this_dir) + '.impl.'
+  index = []
+  constructors = {}
+
+  # create a function that lists the available models, the directory is only
+  #  read the first time
+  def models():
+    if not index and os.path.isdir(impl_dir):
+      index.extend(sorted(filename[:-3] for filename in os.listdir(impl_dir)
+                          if filename.endswith('.py')))
+    return list(index)
+
+  # create a function that imports a model the first time it is used
+  def constructor(model):
+    if model not in constructors:
+      if (not model.isidentifier() or
+          not os.path.isfile(os.path.join(impl_dir, model + '.py'))):
+        return None
+      module = importlib.import_module(package + model)
+      constructors[model] = getattr(module, model)
+    return constructors[model]
 
   # create and return a factory function
   def factory(model, chassis, total_racks, **kwargs):
-    if model in models:
-      return models[model](chassis, total_racks, **kwargs)
-    raise ValueError('Layout model \'{}\' not loaded'.format(model))
-  return factory
+    model_constructor = constructor(model)
+    if model_constructor is not None:
+      return model_constructor(chassis, total_racks, **kwargs)
+    raise ValueError('Layout model \'{}\' not found'.format(model))
+  return factory, models
 
-# set the fabric factory
-setattr(sys.modules[__name__], 'factory', generate())
-delattr(sys.modules[__name__], 'generate')
+# set the factory and model listing functions
+factory, models = generate()
+del generate
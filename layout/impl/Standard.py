@@ -101,57 +101,139 @@ class Standard(layout.Layout):
     # state for cable placement
     self._row_first = True
 
-  def length(self, source, destination, count):
-    same_rack = source.rack == destination.rack
-    if same_rack:
-      delta = abs(source.chassis - destination.chassis)
-      return delta * self._rack_unit_distance
+    # cable tray counters of a shard had it started with column-then-row
+    #  placement, see start_shard()
+    self._alternate = None
 
-    else:
-      # compute distance in and out of the racks
-      out_distance = (source.chassis * self._rack_unit_distance +
-                      self._cable_tray_gap)
-      in_distance = (source.chassis * self._rack_unit_distance +
-                     self._cable_tray_gap)
+    # table of rack to rack distances, bounded to limit memory use
+    self._rack_distances = {}
+    self._rack_distances_limit = 1 << 22
 
-      # determine row and col of rack
-      src_col, src_row = self._rack_loc(source.rack)
-      dst_col, dst_row = self._rack_loc(destination.rack)
-      src_row, dst_row = sorted((src_row, dst_row))
-      src_col, dst_col = sorted((src_col, dst_col))
+  def __getstate__(self):
+    # the table of rack to rack distances is rebuilt as needed
+    state = self.__dict__.copy()
+    state['_rack_distances'] = {}
+    return state
 
-      # compute rack to rack distance within a row
-      cdus = 0
-      for cdu_loc in self._cdu_locs:
-        if cdu_loc >= src_col and dst_col > cdu_loc:
-          cdus += 1
-      row_delta = (dst_col - src_col) + (cdus * self._cdu_width)
-      row_distance = row_delta * self._rack_width
-
-      # compute row to row distance
-      col_delta = abs(src_row - dst_row)
-      hot_unit_distance = self._hot_aisle_width
-      cold_unit_distance = 2 * self._rack_depth + self._cold_aisle_width
-      col_distance = (((col_delta + 1) // 2) * hot_unit_distance +
-                      (col_delta // 2) * cold_unit_distance)
+  def length(self, source, destination, count):
+    distance = self.distance(source, destination)
 
+    if source.rack != destination.rack:
       # do accounting for the cable trays
       #  this algorithm uses row-then-col placement
       src_col, src_row = self._rack_loc(source.rack)
       dst_col, dst_row = self._rack_loc(destination.rack)
       if self._row_first:  #self._random.random() < 0.5:
         row, col = src_row, dst_col
+        other_row, other_col = dst_row, src_col
       else:
         row, col = dst_row, src_col
+        other_row, other_col = src_row, dst_col
       self._row_first = not self._row_first
       src_row, dst_row = sorted((src_row, dst_row))
       src_col, dst_col = sorted((src_col, dst_col))
       self.row_cable_strand(row, src_col, dst_col, count)
       self.col_cable_strand(col, src_row, dst_row, count)
+      if self._alternate is not None:
+        row_cables, col_cables = self._alternate
+        for loc in range(src_col, dst_col):
+          row_cables[other_row][loc] += count
+        for loc in range(src_row, dst_row):
+          col_cables[other_col][loc] += count
+      self.last_route = (row, src_col, dst_col, col, src_row, dst_row)
+    else:
+      self.last_route = None
+
+    # return the total distance
+    return distance
+
+  def start_shard(self):
+    # the placement alternates between row-then-col and col-then-row so the
+    #  trays are also counted as if the shard started with col-then-row
+    assert self._row_first, 'start_shard() must be called before length()'
+    self._alternate = self.cable_trays()
+
+  def merge(self, other):
+    if other._alternate is None:
+      super(Standard, self).merge(other)
+      return
+    if self._row_first:
+      self._add_trays(other._row_cables, other._col_cables)
+    else:
+      self._add_trays(*other._alternate)
+    # the shard started with row-then-col, an odd number of inter-rack cables
+    #  flips the placement of the following shards
+    if not other._row_first:
+      self._row_first = not self._row_first
+
+  def distance(self, source, destination):
+    same_rack = source.rack == destination.rack
+    if same_rack:
+      delta = abs(source.chassis - destination.chassis)
+      return delta * self._rack_unit_distance
+
+    else:
+      # compute distance in and out of the racks
+      out_distance = (source.chassis * self._rack_unit_distance +
+                      self._cable_tray_gap)
+      in_distance = (source.chassis * self._rack_unit_distance +
+                     self._cable_tray_gap)
+
+      # determine rack to rack distances
+      row_distance, col_distance = self.rack_distance(source.rack,
+                                                      destination.rack)
 
       # return the total distance
       return out_distance + row_distance + col_distance + in_distance
 
+  def rack_distance(self, src_rack, dst_rack):
+    """
+    This returns the distances between two racks along the rows and across the
+    rows. Rack pairs are kept in a table as they are computed.
+
+    Returns:
+      tuple (float, float) : row distance, col distance
+    """
+    key = (src_rack, dst_rack)
+    distances = self._rack_distances.get(key)
+    if distances is not None:
+      if utils.stats.enabled:
+        utils.stats.increment('layout.Standard.rack_distance.hits')
+      return distances
+    if utils.stats.enabled:
+      utils.stats.increment('layout.Standard.rack_distance.misses')
+
+    # determine row and col of rack
+    src_col, src_row = self._rack_loc(src_rack)
+    dst_col, dst_row = self._rack_loc(dst_rack)
+    src_row, dst_row = sorted((src_row, dst_row))
+    src_col, dst_col = sorted((src_col, dst_col))
+
+    # compute rack to rack distance within a row
+    cdus = 0
+    for cdu_loc in self._cdu_locs:
+      if cdu_loc >= src_col and dst_col > cdu_loc:
+        cdus += 1
+    row_delta = (dst_col - src_col) + (cdus * self._cdu_width)
+    row_distance = row_delta * self._rack_width
+
+    # compute row to row distance
+    col_delta = abs(src_row - dst_row)
+    hot_unit_distance = self._hot_aisle_width
+    cold_unit_distance = 2 * self._rack_depth + self._cold_aisle_width
+    col_distance = (((col_delta + 1) // 2) * hot_unit_distance +
+                    (col_delta // 2) * cold_unit_distance)
+
+    distances = (row_distance, col_distance)
+    if len(self._rack_distances) < self._rack_distances_limit:
+      self._rack_distances[key] = distances
+    return distances
+
+  def minimum_lengths(self):
+    intra_rack = self._rack_unit_distance
+    inter_rack = (2 * self._cable_tray_gap +
+                  min(self._rack_width, self._hot_aisle_width))
+    return intra_rack, inter_rack
 
   def _rack_loc(self, rack):
     """
@@ -33,57 +33,140 @@
 
 import argparse
 import os
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+import sys
 
 import fabric
-import layout
-import topology
+import pipeline
 import utils
 
+def fabric_filename(filename, label, multiple):
+  """
+  This makes a per fabric filename when multiple fabric models are used
+  """
+  if not multiple or filename == '-':
+    return filename
+  base, ext = os.path.splitext(filename)
+  return '{}_{}{}'.format(base, label, ext)
+
 def main(args):
   # convert the argparse options to kwargs style dicts
   topo_opts = dict([] if not args.topts else args.topts)
-  fabric_opts = dict([] if not args.fopts else args.fopts)
   layout_opts = dict([] if not args.lopts else args.lopts)
+  fabric_names = args.fabric.split(',')
+  fopts = [[]] if not args.fopts else args.fopts
+  if len(fopts) == 1:
+    fopts = fopts * len(fabric_names)
+  if len(fopts) != len(fabric_names):
+    raise ValueError('--fopts must be given once or once per fabric model')
+  fabrics = [(name, dict(opts)) for name, opts in zip(fabric_names, fopts)]
   if args.verbose:
     print('Topo Options   : {}'.format(topo_opts))
-    print('Fabric Options : {}'.format(fabric_opts))
+    for name, fabric_opts in fabrics:
+      print('Fabric Options : {} {}'.format(name, fabric_opts))
     print('Layout Options : {}'.format(layout_opts))
 
   # construct the models
-  topo_model = topology.factory(args.topology, **topo_opts)
-  nodes, chassis, racks = topo_model.structure()
-  fabric_model = fabric.factory(args.fabric, **fabric_opts)
-  layout_model = layout.factory(args.layout, chassis, racks, **layout_opts)
-
-  # generate routers and cables
-  for radix, count in topo_model.routers():
-    fabric_model.add_router(radix, count)
-  for source, destination, count in topo_model.cables():
-    length = layout_model.length(source, destination, count)
-    topo_model.notify_length(length, count)
-    fabric_model.add_cable(length, count)
+  if args.stats is not None:
+    utils.stats.enable()
+  profiler = None if args.profile is None else utils.Profiler()
+  if profiler is not None:
+    profiler.phase('pipeline')
+  timings = None if args.timings is None else utils.Timings()
+  memory = utils.MemoryProfile() if args.memory_profile else None
+  progress = utils.Progress() if args.progress else None
+  pipe = pipeline.Pipeline(args.topology, topo_opts, fabrics, args.layout,
+                           layout_opts, timings=timings, memory=memory,
+                           progress=progress, schedule=args.cable_schedule,
+                           checkpoint=args.checkpoint,
+                           shard_size=args.shard_size)
 
-  # set router and cable attributes
-  fabric_model.set_attributes()
+  # generate routers and cables, then set their attributes
+  pipe.run()
 
   # generate outputs
+  if profiler is not None:
+    profiler.phase('outputs')
   if args.summary is None:
     args.summary = '-'
-  fabric_model.summary(nodes, args.summary)
-  if args.bargraph is not None:
-    fabric_model.cable_bargraph(plt, args.bargraph, args.bargraph_xmax,
-                                args.bargraph_cost, args.bargraph_power)
-  if args.router_csv is not None:
-    fabric_model.router_csv(args.router_csv)
-  if args.cable_csv is not None:
-    fabric_model.cable_csv(args.cable_csv)
+  multiple = len(pipe.fabric_models) > 1
+
+  numeric = args.summary_format == 'numeric'
+  metadata = pipe.metadata() if numeric else None
+
+  # the summaries are written first so the caller can proceed
+  for label, fabric_model in zip(pipe.fabric_labels, pipe.fabric_models):
+    if multiple and args.summary == '-':
+      print('{}:'.format(label))
+    with pipe.stage('summary'):
+      fabric_model.summary(pipe.nodes,
+                           fabric_filename(args.summary, label, multiple),
+                           numeric=numeric, metadata=metadata)
+  sys.stdout.flush()
+
+  # all other outputs are written concurrently, except when tracing memory or
+  #  profiling which need them in this thread
+  workers = 0 if memory is not None or profiler is not None else \
+    args.output_workers
+  writer = pipeline.OutputWriter(workers, stage=pipe.stage)
+  for label, fabric_model in zip(pipe.fabric_labels, pipe.fabric_models):
+    if args.bargraph is not None:
+      writer.plot('bargraph', pipeline.render_bargraph, fabric_model,
+                  fabric_filename(args.bargraph, label, multiple),
+                  args.bargraph_xmax, args.bargraph_cost, args.bargraph_power,
+                  args.bargraph_bars)
+    if args.router_csv is not None:
+      filename = fabric_filename(args.router_csv, label, multiple)
+      writer.write('router_csv', fabric_model.router_csv, filename,
+                   stdout=filename == '-')
+    if args.cable_csv is not None:
+      filename = fabric_filename(args.cable_csv, label, multiple)
+      writer.write('cable_csv', fabric_model.cable_csv, filename,
+                   stdout=filename == '-')
+    if args.price_scenarios is not None:
+      if args.scenario_csv is None:
+        args.scenario_csv = '-'
+      filename = fabric_filename(args.scenario_csv, label, multiple)
+      prices = fabric.PriceMatrix(fabric_model, pipe.nodes)
+      writer.write('scenario_csv', prices.scenario_csv, args.price_scenarios,
+                   filename, stdout=filename == '-')
+    if args.columnar is not None:
+      directory = args.columnar
+      if multiple:
+        directory = os.path.join(directory, label)
+      writer.write('columnar', fabric_model.columnar, directory)
+  if multiple:
+    filename = '-' if args.comparison is None else args.comparison
+    writer.write('comparison', pipe.comparison_csv, filename,
+                 stdout=filename == '-')
+  if args.store is not None:
+    import results
+    with pipe.stage('store'):
+      with results.ResultStore(args.store) as store:
+        store.add_pipeline(pipe)
   if args.tray_csv is not None:
-    layout_model.cable_tray_csv(args.tray_csv)
+    writer.write('tray_csv', pipe.layout_model.cable_tray_csv, args.tray_csv)
   if args.topo_info is not None:
-    topo_model.info_file(args.topo_info)
+    writer.write('topo_info', pipe.topo_model.info_file, args.topo_info)
+  if args.columnar is not None:
+    writer.write('columnar', pipe.layout_model.columnar, args.columnar)
+    writer.write('columnar', pipe.topo_model.columnar, args.columnar)
+  writer.close(wait_plots=not args.async_plots)
+
+  if profiler is not None:
+    profiler.stop()
+    profiler.write(args.profile)
+    profiler.report()
+  if timings is not None:
+    # plots still rendering are reported as pending
+    timings.write(args.timings, pending=writer.pending_plots())
+  if args.stats is not None:
+    utils.stats.dump(args.stats)
+  if memory is not None:
+    # written next to the summary
+    if args.summary == '-':
+      memory.write('memory.json')
+    else:
+      memory.write('{}_memory.json'.format(os.path.splitext(args.summary)[0]))
 
 if __name__ == '__main__':
   # ensures key/value pair format and converts to tuple
@@ -101,19 +184,26 @@ if __name__ == '__main__':
   ap.add_argument('--topts', nargs='*', type=check_option,
                   help='<key>=<value> pair to configure the topology model')
   ap.add_argument('fabric', type=str,
-                  help='the fabric model to use')
-  ap.add_argument('--fopts', nargs='*', type=check_option,
-                  help='<key>=<value> pair to configure the fabric model')
+                  help='the fabric model(s) to use, comma separated')
+  ap.add_argument('--fopts', nargs='*', type=check_option, action='append',
+                  help=('<key>=<value> pair to configure the fabric model, '
+                        'given once for all or once per fabric model'))
   ap.add_argument('layout', type=str,
                   help='the layout model to use')
   ap.add_argument('--lopts', nargs='*', type=check_option,
                   help='<key>=<value> pair to configure the layout model')
   ap.add_argument('--summary', type=str,
                   help='cost and power summary file')
+  ap.add_argument('--summary_format', type=str, default='human',
+                  choices=['human', 'numeric'],
+                  help=('human readable strings or raw numbers with units in '
+                        'the names, per technology totals, and run metadata'))
   ap.add_argument('--bargraph', type=str,
                   help='bargraph of cable information')
   ap.add_argument('--bargraph_xmax', type=float,
                   help='maximum value of x-axis on bargraph')
+  ap.add_argument('--bargraph_bars', type=int, default=160,
+                  help='maximum number of bars, more lengths are binned')
   ap.add_argument('--bargraph_cost', type=utils.str_to_bool, default=True,
                   help='plot cost in bargraph')
   ap.add_argument('--bargraph_power', type=utils.str_to_bool, default=True,
@@ -122,10 +212,45 @@ if __name__ == '__main__':
                   help='CSV file of router information')
   ap.add_argument('--cable_csv', type=str,
                   help='CSV file of cable information')
+  ap.add_argument('--cable_schedule', type=str,
+                  help=('CSV file of every cable with its endpoints, ports, '
+                        'SKU, and route, gzip compressed if it ends in .gz'))
   ap.add_argument('--tray_csv', type=str,
                   help='CSV file of cable tray usage')
   ap.add_argument('--topo_info', type=str,
                   help='Topology information file')
+  ap.add_argument('--price_scenarios', type=str,
+                  help='CSV file of cable and router price scenarios')
+  ap.add_argument('--scenario_csv', type=str,
+                  help='CSV file of the costs of each price scenario')
+  ap.add_argument('--comparison', type=str,
+                  help='CSV file comparing multiple fabric models')
+  ap.add_argument('--columnar', type=str,
+                  help=('directory of .npy arrays of the cable, router, tray, '
+                        'and topology tables'))
+  ap.add_argument('--store', type=str,
+                  help='SQLite database the results are added to')
+  ap.add_argument('--output_workers', type=int, default=4,
+                  help='number of threads writing outputs, 0 is sequential')
+  ap.add_argument('--async_plots', action='store_true',
+                  help='return before plots finish, they finish before exit')
+  ap.add_argument('--timings', type=str,
+                  help='JSON file of per stage timings')
+  ap.add_argument('--profile', type=str,
+                  help=('cProfile stats file, a report by module is printed '
+                        'to stderr'))
+  ap.add_argument('--memory_profile', action='store_true',
+                  help=('trace memory per stage and write it as JSON next to '
+                        'the summary'))
+  ap.add_argument('--stats', type=str,
+                  help='JSON file of hot path counters')
+  ap.add_argument('--progress', action='store_true',
+                  help='print cable generation progress to stderr')
+  ap.add_argument('--checkpoint', type=str,
+                  help=('file the models are checkpointed to after each shard '
+                        'of cables, a rerun resumes from it'))
+  ap.add_argument('--shard_size', type=int, default=1 << 20,
+                  help='number of cable tuples per checkpoint shard')
   ap.add_argument('-v', '--verbose', action='store_true',
                   help='print extra information')
 
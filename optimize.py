@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import fabric
+import optimizer
+import pipeline
+import utils
+
+def check_option(pair):
+  """
+  Ensures key/value pair format and converts to tuple
+  """
+  if (len(pair.split('=')) != 2 or
+      len(pair.split('=')[0]) == 0 or
+      len(pair.split('=')[1]) == 0):
+    raise argparse.ArgumentTypeError('invalid key/pair: {}'.format(pair))
+  else:
+    return tuple(pair.split('='))
+
+def hyperx(args):
+  fabric_opts = dict([] if not args.fopts else args.fopts)
+  layout_opts = dict([] if not args.lopts else args.lopts)
+  opt = optimizer.HyperxShape(
+    args.nodes, args.fabric, fabric_opts, args.layout, layout_opts,
+    max_radix=args.max_radix, max_dimensions=args.max_dimensions,
+    max_weight=args.max_weight, chassis=utils.str_to_int_list(args.chassis))
+  results = opt.search(workers=args.workers)
+  if args.verbose:
+    print('{} feasible shapes, {} fully evaluated'.format(
+      opt.enumerated, opt.evaluated), file=sys.stderr)
+  if not results:
+    print('no feasible HyperX shape', file=sys.stderr)
+    return 1
+
+  # write all evaluated shapes
+  if args.csv is not None:
+    with open(args.csv, 'w', newline='') as fd:
+      writer = csv.writer(fd)
+      writer.writerow(['Widths', 'Weights', 'Concentration', 'Chassis',
+                       'Nodes', 'Routers', 'Radix', 'Lower Bound ($)',
+                       'Total Cost ($)', 'Relative Cost ($/node)'])
+      for c in results:
+        writer.writerow([
+          ','.join(map(str, c.widths)), ','.join(map(str, c.weights)),
+          c.concentration, c.chassis, c.nodes, c.routers, c.radix,
+          '{0:.00f}'.format(c.lower_bound),
+          '{0:.00f}'.format(c.totals['total cost']),
+          '{0:.02f}'.format(c.totals['relative cost'])])
+
+  # print the best shape in main.py option format
+  best = results[0]
+  print('{} : ${:,.00f} (${:,.02f}/node)'.format(
+    best, best.totals['total cost'], best.totals['relative cost']))
+  return 0
+
+def directors(args):
+  topo_opts = dict([] if not args.topts else args.topts)
+  fabric_opts = dict([] if not args.fopts else args.fopts)
+  layout_opts = dict([] if not args.lopts else args.lopts)
+  fabric_model = fabric.factory(args.fabric, **fabric_opts)
+  opt = optimizer.DirectorPlacement(topo_opts, fabric_model, args.layout,
+                                    layout_opts)
+  director_racks = opt.search(iterations=args.iterations)
+  if args.verbose:
+    print('{} moves, {} evaluations'.format(opt.moves, opt.evaluations),
+          file=sys.stderr)
+  print('cable cost: ${:,.00f} -> ${:,.00f}'.format(opt.initial_cost,
+                                                    opt.cost))
+
+  # generate the outputs of the best placement
+  topo_opts['director_racks'] = ','.join(map(str, director_racks))
+  topo_opts.pop('director_rack_inset', None)
+  print('director_racks={}'.format(topo_opts['director_racks']))
+  pipe = pipeline.Pipeline('FatTree', topo_opts, [(args.fabric, fabric_opts)],
+                           args.layout, layout_opts)
+  pipe.run()
+  fabric_model = pipe.fabric_models[0]
+  if args.summary is not None:
+    fabric_model.summary(pipe.nodes, args.summary)
+  if args.cable_csv is not None:
+    fabric_model.cable_csv(args.cable_csv)
+  if args.tray_csv is not None:
+    pipe.layout_model.cable_tray_csv(args.tray_csv)
+  if args.topo_info is not None:
+    pipe.topo_model.info_file(args.topo_info)
+  return 0
+
+def placement(args):
+  topo_opts = dict([] if not args.topts else args.topts)
+  fabric_opts = dict([] if not args.fopts else args.fopts)
+  layout_opts = dict([] if not args.lopts else args.lopts)
+  fabric_model = fabric.factory(args.fabric, **fabric_opts)
+  opt = optimizer.RouterPlacement(args.topology, topo_opts, fabric_model,
+                                  args.layout, layout_opts, seed=args.seed)
+  opt.anneal(steps=args.steps)
+  if args.verbose:
+    print('{} moves, {} accepted'.format(opt.moves, opt.accepted),
+          file=sys.stderr)
+  print('cable cost: ${:,.00f} -> ${:,.00f}'.format(opt.initial_cost,
+                                                    opt.cost))
+  opt.write(args.output)
+  print('placement={}'.format(args.output))
+  return 0
+
+def skus(args):
+  topo_opts = dict([] if not args.topts else args.topts)
+  fabric_opts = dict([] if not args.fopts else args.fopts)
+  layout_opts = dict([] if not args.lopts else args.lopts)
+  fabric_model = fabric.factory(args.fabric, **fabric_opts)
+  lengths = optimizer.SkuConsolidation.required_lengths(
+    args.topology, topo_opts, args.layout, layout_opts)
+  opt = optimizer.SkuConsolidation(fabric_model, lengths,
+                                   max_skus=args.max_skus)
+  results = opt.solve()
+  if args.verbose:
+    print('{} distinct cable lengths'.format(opt.distinct_lengths),
+          file=sys.stderr)
+
+  # write cost versus the number of SKUs
+  if args.csv is not None:
+    with open(args.csv, 'w', newline='') as fd:
+      writer = csv.writer(fd)
+      writer.writerow(['SKUs', 'Cable Cost ($)', 'Lengths (m)'])
+      for c in results:
+        writer.writerow([c.skus, '{0:.00f}'.format(c.cost),
+                         ','.join(map(str, c.lengths))])
+  for c in results:
+    print('{:>3} : ${:,.00f} [{}]'.format(
+      c.skus, c.cost, ', '.join('{}m'.format(l) for l in c.lengths)))
+  return 0
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description='fabric design optimizers')
+  sp = ap.add_subparsers(dest='optimizer')
+  sp.required = True
+
+  # HyperX shape optimizer
+  hx = sp.add_parser('hyperx', help='cheapest HyperX shape for a node count')
+  hx.add_argument('fabric', type=str,
+                  help='the fabric model to use')
+  hx.add_argument('--fopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the fabric model')
+  hx.add_argument('layout', type=str,
+                  help='the layout model to use')
+  hx.add_argument('--lopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the layout model')
+  hx.add_argument('--nodes', type=int, required=True,
+                  help='minimum number of nodes')
+  hx.add_argument('--max_radix', type=int,
+                  help='router radix limit (default is the fabric\'s)')
+  hx.add_argument('--max_dimensions', type=int, default=3,
+                  help='maximum number of dimensions')
+  hx.add_argument('--max_weight', type=int, default=2,
+                  help='maximum weight of each dimension')
+  hx.add_argument('--chassis', type=str, default='1,2,4,8,16',
+                  help='chassis per rack values to consider')
+  hx.add_argument('--workers', type=int, default=os.cpu_count(),
+                  help='number of evaluation processes')
+  hx.add_argument('--csv', type=str,
+                  help='CSV file of all evaluated shapes')
+  hx.add_argument('-v', '--verbose', action='store_true',
+                  help='print extra information')
+  hx.set_defaults(func=hyperx)
+
+  # FatTree director placement optimizer
+  dr = sp.add_parser('directors', help='FatTree director rack placement')
+  dr.add_argument('fabric', type=str,
+                  help='the fabric model to use')
+  dr.add_argument('--topts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the FatTree model')
+  dr.add_argument('--fopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the fabric model')
+  dr.add_argument('layout', type=str,
+                  help='the layout model to use')
+  dr.add_argument('--lopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the layout model')
+  dr.add_argument('--iterations', type=int, default=1000,
+                  help='maximum number of director rack moves')
+  dr.add_argument('--summary', type=str,
+                  help='cost and power summary file of the best placement')
+  dr.add_argument('--cable_csv', type=str,
+                  help='CSV file of cable information of the best placement')
+  dr.add_argument('--tray_csv', type=str,
+                  help='CSV file of cable tray usage of the best placement')
+  dr.add_argument('--topo_info', type=str,
+                  help='Topology information file of the best placement')
+  dr.add_argument('-v', '--verbose', action='store_true',
+                  help='print extra information')
+  dr.set_defaults(func=directors)
+
+  # router placement optimizer
+  pl = sp.add_parser('placement', help='router to rack placement')
+  pl.add_argument('topology', type=str,
+                  help='the topology model to use')
+  pl.add_argument('--topts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the topology model')
+  pl.add_argument('fabric', type=str,
+                  help='the fabric model to use')
+  pl.add_argument('--fopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the fabric model')
+  pl.add_argument('layout', type=str,
+                  help='the layout model to use')
+  pl.add_argument('--lopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the layout model')
+  pl.add_argument('--steps', type=int, default=100000,
+                  help='number of annealing moves')
+  pl.add_argument('--seed', type=int, default=12345678,
+                  help='seed of the random number generator')
+  pl.add_argument('--output', type=str, required=True,
+                  help='CSV file of the best placement (topology option '
+                  '\'placement\')')
+  pl.add_argument('-v', '--verbose', action='store_true',
+                  help='print extra information')
+  pl.set_defaults(func=placement)
+
+  # cable SKU consolidation optimizer
+  sk = sp.add_parser('skus', help='cable SKU consolidation')
+  sk.add_argument('topology', type=str,
+                  help='the topology model to use')
+  sk.add_argument('--topts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the topology model')
+  sk.add_argument('fabric', type=str,
+                  help='the fabric model to use')
+  sk.add_argument('--fopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the fabric model')
+  sk.add_argument('layout', type=str,
+                  help='the layout model to use')
+  sk.add_argument('--lopts', nargs='*', type=check_option,
+                  help='<key>=<value> pair to configure the layout model')
+  sk.add_argument('--max_skus', type=int,
+                  help=('largest number of SKUs to consider (default is every '
+                        'number of SKUs)'))
+  sk.add_argument('--csv', type=str,
+                  help='CSV file of cable cost versus number of SKUs')
+  sk.add_argument('-v', '--verbose', action='store_true',
+                  help='print extra information')
+  sk.set_defaults(func=skus)
+
+  args = ap.parse_args()
+  sys.exit(args.func(args))
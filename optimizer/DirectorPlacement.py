@@ -0,0 +1,319 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import bisect
+
+import layout
+import topology
+
+class DirectorPlacement(object):
+  """
+  This searches the rack positions of FatTree directors for the lowest cable
+  cost. The cables between each leaf rack and director rack are gathered once
+  from the FatTree model. When a director rack moves, only the cables touching
+  that director rack and the leaf racks whose contents change are re-priced, so
+  the length histogram and cost are updated incrementally.
+  """
+
+  def __init__(self, topo_opts, fabric_model, layout_name, layout_opts):
+    """
+    Constructs a DirectorPlacement object
+
+    Args:
+      topo_opts (dict) : options of the FatTree topology model
+      fabric_model (Fabric) : the fabric model used to price cables
+      layout_name (str) : the layout model to use
+      layout_opts (dict) : options of the layout model
+    """
+    self._fabric_model = fabric_model
+    topo_model = topology.factory('FatTree', **topo_opts)
+    _, chassis, racks = topo_model.structure()
+    self._layout_model = layout.factory(layout_name, chassis, racks,
+                                        **layout_opts)
+    self.total_racks = racks
+
+    # the rack of each director rack and the racks holding leaves
+    self.director_racks = topo_model.director_racks()
+    director_index = {rack: j for j, rack in enumerate(self.director_racks)}
+    self._leaf_racks = [rack for rack in range(racks)
+                        if rack not in director_index]
+    leaf_index = {rack: k for k, rack in enumerate(self._leaf_racks)}
+
+    # gather the cables between each leaf rack and director rack
+    #  key: (leaf rack index, director rack index)
+    #  value: {(leaf chassis, director chassis): count}
+    gathered = {}
+    for source, destination, count in topo_model.cables():
+      key = (leaf_index[source.rack], director_index[destination.rack])
+      chassis_pair = (source.chassis, destination.chassis)
+      cables = gathered.setdefault(key, {})
+      cables[chassis_pair] = cables.get(chassis_pair, 0) + count
+
+    # intern the cable patterns, leaf racks with the same patterns are
+    #  interchangeable
+    pattern_ids = {}
+    self._patterns = []  # pattern id -> ((leaf chassis, dir chassis, count))
+    self._rack_patterns = []  # leaf rack index -> (pattern id per dir rack)
+    row_ids = {}
+    self._rows = []  # leaf rack index -> row id
+    for k in range(len(self._leaf_racks)):
+      row = []
+      for j in range(len(self.director_racks)):
+        pattern = tuple(sorted((src, dst, count) for (src, dst), count in
+                               gathered.get((k, j), {}).items()))
+        if pattern not in pattern_ids:
+          pattern_ids[pattern] = len(self._patterns)
+          self._patterns.append(pattern)
+        row.append(pattern_ids[pattern])
+      row = tuple(row)
+      self._rack_patterns.append(row)
+      self._rows.append(row_ids.setdefault(row, len(row_ids)))
+
+    # leaf rack indices whose row differs from the next leaf rack's row
+    self._row_changes = [k for k in range(len(self._rows) - 1)
+                         if self._rows[k] != self._rows[k + 1]]
+
+    # director racks with the same patterns share cost sums
+    column_ids = {}
+    self._columns = []  # director rack index -> column id
+    for j in range(len(self.director_racks)):
+      column = tuple(row[j] for row in self._rack_patterns)
+      self._columns.append(column_ids.setdefault(column, len(column_ids)))
+
+    # the cost of each director rack column at every rack given the current
+    #  leaf racks, computed once per move
+    self._column_costs = None
+
+    # priced cables between racks
+    #  key: (leaf rack, director rack, pattern id)
+    #  value: (cost, ((actual length, count), ...))
+    self._priced = {}
+
+    # compute the initial cost and length histogram
+    self.cost = 0
+    self.histogram = {}
+    for k, leaf_rack in enumerate(self._leaf_racks):
+      for j, director_rack in enumerate(self.director_racks):
+        self._account(leaf_rack, director_rack, self._rack_patterns[k][j], 1)
+    self.initial_cost = self.cost
+
+    # statistics
+    self.moves = 0
+    self.evaluations = 0
+
+  def _price(self, leaf_rack, director_rack, pattern):
+    """
+    This prices the cables of a pattern between a leaf rack and a director rack
+    """
+    key = (leaf_rack, director_rack, pattern)
+    priced = self._priced.get(key)
+    if priced is None:
+      cost = 0
+      lengths = {}
+      for src_chassis, dst_chassis, count in self._patterns[pattern]:
+        length = self._layout_model.distance(
+          layout.Coordinate(src_chassis, leaf_rack),
+          layout.Coordinate(dst_chassis, director_rack))
+        cable = self._fabric_model.priced_cable(length)
+        cost += cable.cost * count
+        lengths[cable.actual_length] = (
+          lengths.get(cable.actual_length, 0) + count)
+      priced = (cost, tuple(lengths.items()))
+      self._priced[key] = priced
+    return priced
+
+  def _account(self, leaf_rack, director_rack, pattern, sign):
+    """
+    This adds (sign=1) or removes (sign=-1) priced cables to the cost and
+    length histogram
+    """
+    cost, lengths = self._price(leaf_rack, director_rack, pattern)
+    self.cost += sign * cost
+    for length, count in lengths:
+      self.histogram[length] = self.histogram.get(length, 0) + sign * count
+      if self.histogram[length] == 0:
+        del self.histogram[length]
+
+  def _changes(self, j, rack):
+    """
+    This determines the cables removed and added when director rack 'j' moves
+    to leaf rack 'rack'
+
+    Returns:
+      tuple (list, list, list) : removed and added (leaf rack, director rack,
+                                 pattern) tuples, and the new leaf racks
+    """
+    old_rack = self.director_racks[j]
+    old_leaves = self._leaf_racks
+    new_leaves = list(old_leaves)
+    del new_leaves[bisect.bisect_left(new_leaves, rack)]
+    bisect.insort(new_leaves, old_rack)
+    removed = []
+    added = []
+
+    # all cables of the moving director rack
+    for k, leaf_rack in enumerate(old_leaves):
+      removed.append((leaf_rack, old_rack, self._rack_patterns[k][j]))
+    for k, leaf_rack in enumerate(new_leaves):
+      added.append((leaf_rack, rack, self._rack_patterns[k][j]))
+
+    # leaf racks between the old and new positions shift by one leaf rack, only
+    #  racks whose contents change are re-priced
+    low, high = sorted((old_rack, rack))
+    old_start = bisect.bisect_left(old_leaves, low)
+    old_end = bisect.bisect_right(old_leaves, high)
+    new_start = bisect.bisect_left(new_leaves, low)
+    new_end = bisect.bisect_right(new_leaves, high)
+    old_rows = {old_leaves[k]: k for k in range(old_start, old_end)}
+    new_rows = {new_leaves[k]: k for k in range(new_start, new_end)}
+    for leaf_rack in set(old_rows) | set(new_rows):
+      old_k = old_rows.get(leaf_rack)
+      new_k = new_rows.get(leaf_rack)
+      if (old_k is not None and new_k is not None and
+          self._rows[old_k] == self._rows[new_k]):
+        continue
+      for other, director_rack in enumerate(self.director_racks):
+        if other == j:
+          continue
+        if old_k is not None:
+          removed.append((leaf_rack, director_rack,
+                          self._rack_patterns[old_k][other]))
+        if new_k is not None:
+          added.append((leaf_rack, director_rack,
+                        self._rack_patterns[new_k][other]))
+    return removed, added, new_leaves
+
+  def _shifted(self, j, rack):
+    """
+    This is a generator of (leaf rack, old index, new index) tuples of the leaf
+    racks whose contents change when director rack 'j' moves to leaf rack
+    'rack'. An index is None when the rack doesn't hold leaves.
+    """
+    old_rack = self.director_racks[j]
+    leaves = self._leaf_racks
+    rack_k = bisect.bisect_left(leaves, rack)
+    yield rack, rack_k, None
+    if old_rack < rack:
+      # racks between shift up by one leaf rack
+      first = bisect.bisect_right(leaves, old_rack)
+      yield old_rack, None, first
+      last = rack_k
+      shift = 1
+      lo = bisect.bisect_left(self._row_changes, first)
+      hi = bisect.bisect_left(self._row_changes, last)
+      changes = self._row_changes[lo:hi]
+    else:
+      # racks between shift down by one leaf rack
+      first = rack_k + 1
+      last = bisect.bisect_left(leaves, old_rack)
+      yield old_rack, None, last - 1
+      shift = -1
+      lo = bisect.bisect_left(self._row_changes, first - 1)
+      hi = bisect.bisect_left(self._row_changes, last - 1)
+      changes = [k + 1 for k in self._row_changes[lo:hi]]
+    for k in changes:
+      yield leaves[k], k, k + shift
+
+  def delta(self, j, rack):
+    """
+    This returns the change in cable cost if director rack 'j' moves to leaf
+    rack 'rack'
+    """
+    self.evaluations += 1
+    if self._column_costs is None:
+      self._column_costs = {}
+    column = self._columns[j]
+    costs = self._column_costs.get(column)
+    if costs is None:
+      # the cost of this director rack column placed at every rack
+      costs = [sum(self._price(leaf_rack, director_rack,
+                               self._rack_patterns[k][j])[0]
+                   for k, leaf_rack in enumerate(self._leaf_racks))
+               for director_rack in range(self.total_racks)]
+      self._column_costs[column] = costs
+
+    # move the director rack with the current leaf racks
+    delta = costs[rack] - costs[self.director_racks[j]]
+
+    # correct for the leaf racks that change
+    for leaf_rack, old_k, new_k in self._shifted(j, rack):
+      if old_k is not None and new_k is not None and \
+         self._rows[old_k] == self._rows[new_k]:
+        continue
+      for other, director_rack in enumerate(self.director_racks):
+        if other == j:
+          director_rack = rack
+        if old_k is not None:
+          delta -= self._price(leaf_rack, director_rack,
+                               self._rack_patterns[old_k][other])[0]
+        if new_k is not None:
+          delta += self._price(leaf_rack, director_rack,
+                               self._rack_patterns[new_k][other])[0]
+    return delta
+
+  def move(self, j, rack):
+    """
+    This moves director rack 'j' to leaf rack 'rack'
+    """
+    removed, added, new_leaves = self._changes(j, rack)
+    for cables in removed:
+      self._account(*cables, -1)
+    for cables in added:
+      self._account(*cables, 1)
+    self.director_racks[j] = rack
+    self._leaf_racks = new_leaves
+    self._column_costs = None
+    self.moves += 1
+
+  def search(self, iterations=1000):
+    """
+    This repeatedly makes the director rack move that most reduces the cable
+    cost until no move improves it
+
+    Args:
+      iterations (int) : the maximum number of moves
+
+    Returns:
+      list : the rack of each director rack
+    """
+    for _ in range(iterations):
+      best_delta = -1e-9
+      best_move = None
+      for j in range(len(self.director_racks)):
+        for rack in self._leaf_racks:
+          delta = self.delta(j, rack)
+          if delta < best_delta:
+            best_delta = delta
+            best_move = (j, rack)
+      if best_move is None:
+        break
+      self.move(*best_move)
+    return list(self.director_racks)
@@ -0,0 +1,245 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import concurrent.futures
+import functools
+import itertools
+import math
+import operator
+
+import fabric
+import layout
+import pipeline
+
+def evaluate_hyperx(shape, fabric_name, fabric_opts, layout_name, layout_opts):
+  """
+  This fully evaluates a HyperX shape and returns the fabric totals
+  """
+  pipe = pipeline.Pipeline('Hyperx', shape.topo_opts(),
+                           [(fabric_name, fabric_opts)],
+                           layout_name, layout_opts)
+  pipe.run()
+  return pipe.fabric_models[0].totals(pipe.nodes)
+
+class HyperxCandidate(object):
+  """
+  A HyperX shape being considered by the optimizer
+  """
+
+  def __init__(self, widths, weights, concentration, chassis):
+    self.widths = widths
+    self.weights = weights
+    self.concentration = concentration
+    self.chassis = chassis
+    self.routers = functools.reduce(operator.mul, widths)
+    self.nodes = self.routers * concentration
+    self.radix = concentration + sum((width - 1) * weight
+                                     for width, weight in zip(widths, weights))
+    self.lower_bound = None
+    self.totals = None
+
+  def topo_opts(self):
+    """
+    Returns the Hyperx topology options of this shape
+    """
+    return {
+      'widths': ','.join(str(width) for width in self.widths),
+      'weights': ','.join(str(weight) for weight in self.weights),
+      'concentration': str(self.concentration),
+      'chassis': str(self.chassis)}
+
+  def __str__(self):
+    return ' '.join('{}={}'.format(key, value)
+                    for key, value in self.topo_opts().items())
+
+class HyperxShape(object):
+  """
+  This is a branch-and-bound optimizer that finds the cheapest HyperX reaching a
+  target number of nodes. Feasible shapes are enumerated and given a lower bound
+  on router and cable cost, then shapes are fully evaluated in order of their
+  lower bound until no remaining shape can beat the best found.
+  """
+
+  def __init__(self, nodes, fabric_name, fabric_opts, layout_name, layout_opts,
+               max_radix=None, max_dimensions=3, max_weight=2,
+               chassis=(1, 2, 4, 8, 16)):
+    """
+    Constructs a HyperxShape object
+
+    Args:
+      nodes (int) : the minimum number of nodes
+      fabric_name (str) : the fabric model to use
+      fabric_opts (dict) : options of the fabric model
+      layout_name (str) : the layout model to use
+      layout_opts (dict) : options of the layout model
+      max_radix (int) : the router radix limit, defaults to the fabric's
+      max_dimensions (int) : the maximum number of dimensions (1-3)
+      max_weight (int) : the maximum weight of any dimension
+      chassis (list) : chassis per rack values to consider
+    """
+    self.nodes = nodes
+    self._fabric_name = fabric_name
+    self._fabric_opts = fabric_opts
+    self._layout_name = layout_name
+    self._layout_opts = layout_opts
+    self._fabric_model = fabric.factory(fabric_name, **fabric_opts)
+    self.max_radix = (self._fabric_model.max_radix if max_radix is None
+                      else max_radix)
+    if self.max_radix is None:
+      raise ValueError('fabric {} has no radix limit, a maximum radix must be '
+                       'given'.format(fabric_name))
+    assert 1 <= max_dimensions <= 3, 'HyperX supports 1 to 3 dimensions'
+    self._max_dimensions = max_dimensions
+    self._max_weight = max_weight
+    self._chassis = sorted(chassis)
+
+    # cable length lower bounds per chassis per rack
+    self._minimum_lengths = {}
+
+    # statistics
+    self.enumerated = 0
+    self.evaluated = 0
+
+  def candidates(self):
+    """
+    This is a generator that generates all feasible HyperX shapes
+    """
+    for dims in range(1, self._max_dimensions + 1):
+      for widths in self._widths(dims, 1, 0):
+        routers = functools.reduce(operator.mul, widths)
+        concentration = math.ceil(self.nodes / routers)
+        ports = self.max_radix - concentration
+        for weights in itertools.product(range(1, self._max_weight + 1),
+                                         repeat=dims):
+          if sum((w - 1) * k for w, k in zip(widths, weights)) > ports:
+            continue
+          for chassis in self._chassis:
+            if widths[0] % chassis == 0:
+              yield HyperxCandidate(list(widths), list(weights), concentration,
+                                    chassis)
+
+  def _widths(self, dims, routers, ports):
+    """
+    This is a generator of width tuples whose routers don't exceed the number of
+    nodes and whose minimum ports fit in the radix
+    """
+    if dims == 0:
+      yield ()
+      return
+    for width in itertools.count(2):
+      # each remaining dimension uses at least one port
+      if ports + (width - 1) + (dims - 1) + 1 > self.max_radix:
+        break
+      if routers * width * (2 ** (dims - 1)) > self.nodes:
+        break
+      for rest in self._widths(dims - 1, routers * width, ports + width - 1):
+        yield (width,) + rest
+
+  def lower_bound(self, candidate):
+    """
+    This computes a lower bound on the total cost of a HyperX shape using the
+    exact router cost and the cheapest possible cable of each dimension
+    """
+    if candidate.chassis not in self._minimum_lengths:
+      layout_model = layout.factory(self._layout_name, candidate.chassis, 2,
+                                    **self._layout_opts)
+      self._minimum_lengths[candidate.chassis] = layout_model.minimum_lengths()
+    intra_rack, inter_rack = self._minimum_lengths[candidate.chassis]
+
+    router = self._fabric_model.priced_router(candidate.radix)
+    cost = router.cost * candidate.routers
+    for dim, (width, weight) in enumerate(zip(candidate.widths,
+                                              candidate.weights)):
+      cables = candidate.routers * (width - 1) * weight // 2
+      if dim == 0 and candidate.chassis > 1:
+        length = intra_rack
+      else:
+        length = inter_rack
+      cost += cables * self._fabric_model.priced_cable(length).cost
+    return cost
+
+  def search(self, workers=1):
+    """
+    This searches for the cheapest HyperX shape
+
+    Args:
+      workers (int) : the number of processes used for full evaluations
+
+    Returns:
+      list : the fully evaluated candidates, cheapest first
+    """
+    # bound all candidates
+    candidates = []
+    for candidate in self.candidates():
+      try:
+        candidate.lower_bound = self.lower_bound(candidate)
+      except AssertionError:
+        continue  # the fabric can't build this shape
+      candidates.append(candidate)
+    self.enumerated = len(candidates)
+    candidates.sort(key=lambda c: (c.lower_bound, c.routers))
+
+    # evaluate in lower bound order until the bound exceeds the best total
+    evaluated = []
+    best = math.inf
+    pending = {}
+    evaluate = functools.partial(evaluate_hyperx,
+                                 fabric_name=self._fabric_name,
+                                 fabric_opts=self._fabric_opts,
+                                 layout_name=self._layout_name,
+                                 layout_opts=self._layout_opts)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+      remaining = iter(candidates)
+      exhausted = False
+      while True:
+        # keep all workers busy with promising candidates
+        while not exhausted and len(pending) < workers:
+          candidate = next(remaining, None)
+          if candidate is None or candidate.lower_bound >= best:
+            exhausted = True
+            break
+          pending[pool.submit(evaluate, candidate)] = candidate
+        if not pending:
+          break
+
+        # collect finished evaluations
+        done, _ = concurrent.futures.wait(
+          pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+          candidate = pending.pop(future)
+          candidate.totals = future.result()
+          evaluated.append(candidate)
+          best = min(best, candidate.totals['total cost'])
+    self.evaluated = len(evaluated)
+
+    evaluated.sort(key=lambda c: (c.totals['total cost'],
+                                  c.totals['relative cost']))
+    return evaluated
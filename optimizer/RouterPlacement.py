@@ -0,0 +1,256 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import contextlib
+import math
+import os
+import random
+
+import layout
+import topology
+
+class RouterPlacement(object):
+  """
+  This is a simulated annealing engine that places routers into the chassis
+  slots of the racks to minimize the total cable cost. The placement is a
+  permutation of routers over slots and each move swaps the contents of two
+  slots. A move only re-prices the cables of the two routers involved, so it
+  costs O(router degree).
+  """
+
+  def __init__(self, topology_name, topo_opts, fabric_model, layout_name,
+               layout_opts, seed=12345678):
+    """
+    Constructs a RouterPlacement object
+
+    Args:
+      topology_name (str) : the topology model to use
+      topo_opts (dict) : options of the topology model
+      fabric_model (Fabric) : the fabric model used to price cables
+      layout_name (str) : the layout model to use
+      layout_opts (dict) : options of the layout model
+      seed (int) : seed of the random number generator
+    """
+    self._fabric_model = fabric_model
+    topo_model = topology.factory(topology_name, **topo_opts)
+    _, self._chassis, racks = topo_model.structure()
+    self._layout_model = layout.factory(layout_name, self._chassis, racks,
+                                        **layout_opts)
+    self._random = random.Random()
+    self._random.seed(seed)
+
+    # the coordinate of each slot
+    slots = self._chassis * racks
+    self._coordinates = [layout.Coordinate(slot % self._chassis,
+                                           slot // self._chassis)
+                         for slot in range(slots)]
+
+    # the slot of each router and the router of each slot (-1 when empty)
+    self.position = []
+    self._occupant = [-1] * slots
+    for router, chassis, rack in topo_model.locations():
+      assert router == len(self.position), 'routers must be in order'
+      slot = rack * self._chassis + chassis
+      self.position.append(slot)
+      self._occupant[slot] = router
+
+    # gather the cables between routers into edges
+    edge_index = {}
+    self._edges = []  # [source router, destination router, count]
+    self._adjacency = [[] for _ in self.position]  # router -> edge indices
+    with open(os.devnull, 'w') as devnull, \
+         contextlib.redirect_stdout(devnull):
+      for source, destination, count in topo_model.cables():
+        src = self._occupant[source.rack * self._chassis + source.chassis]
+        dst = self._occupant[destination.rack * self._chassis +
+                             destination.chassis]
+        key = (src, dst)
+        if key in edge_index:
+          self._edges[edge_index[key]][2] += count
+        else:
+          edge_index[key] = len(self._edges)
+          self._adjacency[src].append(len(self._edges))
+          if dst != src:
+            self._adjacency[dst].append(len(self._edges))
+          self._edges.append([src, dst, count])
+
+    # price of a single cable between two slots, bounded to limit memory use
+    self._prices = {}
+    self._prices_limit = 1 << 22
+
+    # the cost of every edge
+    self._edge_costs = [self._price(self.position[src], self.position[dst]) *
+                        count for src, dst, count in self._edges]
+    self.cost = sum(self._edge_costs)
+    self.initial_cost = self.cost
+
+    # statistics
+    self.moves = 0
+    self.accepted = 0
+
+  def _price(self, src_slot, dst_slot):
+    """
+    This returns the price of a cable between two slots
+    """
+    key = (src_slot, dst_slot)
+    price = self._prices.get(key)
+    if price is None:
+      length = self._layout_model.distance(self._coordinates[src_slot],
+                                           self._coordinates[dst_slot])
+      price = self._fabric_model.priced_cable(length).cost
+      if len(self._prices) < self._prices_limit:
+        self._prices[key] = price
+    return price
+
+  def delta(self, slot_a, slot_b):
+    """
+    This computes the change in cost of swapping the contents of two slots
+
+    Returns:
+      tuple (float, list) : the change in cost, (edge, new cost) of each
+                            affected edge
+    """
+    router_a = self._occupant[slot_a]
+    router_b = self._occupant[slot_b]
+    position = self.position
+    delta = 0
+    changes = []
+    for router in (router_a, router_b):
+      if router < 0:
+        continue
+      for edge in self._adjacency[router]:
+        src, dst, count = self._edges[edge]
+        if router == router_b and (src == router_a or dst == router_a):
+          continue  # already handled with router_a
+        src_slot = (slot_b if src == router_a else
+                    slot_a if src == router_b else position[src])
+        dst_slot = (slot_b if dst == router_a else
+                    slot_a if dst == router_b else position[dst])
+        cost = self._price(src_slot, dst_slot) * count
+        delta += cost - self._edge_costs[edge]
+        changes.append((edge, cost))
+    return delta, changes
+
+  def swap(self, slot_a, slot_b, changes):
+    """
+    This swaps the contents of two slots given the changes from delta()
+    """
+    router_a = self._occupant[slot_a]
+    router_b = self._occupant[slot_b]
+    for edge, cost in changes:
+      self.cost += cost - self._edge_costs[edge]
+      self._edge_costs[edge] = cost
+    self._occupant[slot_a] = router_b
+    self._occupant[slot_b] = router_a
+    if router_a >= 0:
+      self.position[router_a] = slot_b
+    if router_b >= 0:
+      self.position[router_b] = slot_a
+
+  def _random_move(self):
+    """
+    This picks a random router and a random other slot
+    """
+    slot_a = self.position[self._random.randrange(len(self.position))]
+    slot_b = self._random.randrange(len(self._occupant) - 1)
+    if slot_b >= slot_a:
+      slot_b += 1
+    return slot_a, slot_b
+
+  def anneal(self, steps=100000, initial_acceptance=0.8, final_ratio=1e-4):
+    """
+    This runs simulated annealing with a geometric cooling schedule
+
+    Args:
+      steps (int) : the number of moves to try
+      initial_acceptance (float) : the initial probability of accepting an
+                                   average cost increasing move
+      final_ratio (float) : final temperature relative to the initial
+
+    Returns:
+      list : (chassis, rack) of each router in the best placement found
+    """
+    if len(self._occupant) < 2 or steps <= 0:
+      return self.placement()
+
+    # derive the initial temperature from a sample of uphill moves
+    uphill = []
+    for _ in range(min(1000, steps)):
+      delta, _ = self.delta(*self._random_move())
+      if delta > 0:
+        uphill.append(delta)
+    if not uphill:
+      return self.placement()
+    temperature = -(sum(uphill) / len(uphill)) / math.log(initial_acceptance)
+    cooling = final_ratio ** (1 / steps)
+
+    best_cost = self.cost
+    best_position = list(self.position)
+    epoch = max(1, steps // 1000)
+    for step in range(steps):
+      slot_a, slot_b = self._random_move()
+      delta, changes = self.delta(slot_a, slot_b)
+      self.moves += 1
+      if delta <= 0 or self._random.random() < math.exp(-delta / temperature):
+        self.swap(slot_a, slot_b, changes)
+        self.accepted += 1
+      temperature *= cooling
+
+      # remember the best placement once per epoch
+      if (step % epoch == epoch - 1 or step == steps - 1) and \
+         self.cost < best_cost:
+        best_cost = self.cost
+        best_position = list(self.position)
+
+    # restore the best placement
+    if best_position != self.position:
+      self._occupant = [-1] * len(self._occupant)
+      for router, slot in enumerate(best_position):
+        self._occupant[slot] = router
+      self.position = best_position
+      self._edge_costs = [
+        self._price(self.position[src], self.position[dst]) * count
+        for src, dst, count in self._edges]
+      self.cost = sum(self._edge_costs)
+    return self.placement()
+
+  def placement(self):
+    """
+    Returns the (chassis, rack) of each router
+    """
+    return [(slot % self._chassis, slot // self._chassis)
+            for slot in self.position]
+
+  def write(self, filename):
+    """
+    This writes the placement as a file for the topology 'placement' option
+    """
+    topology.Topology.write_placement(filename, self.placement())
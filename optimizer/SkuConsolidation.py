@@ -0,0 +1,198 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import array
+import contextlib
+import os
+
+import layout
+import topology
+
+class SkuCandidate(object):
+  """
+  This holds one row of the SKU consolidation result
+  """
+
+  def __init__(self, skus, lengths, cost):
+    self.skus = skus
+    self.lengths = lengths
+    self.cost = cost
+
+  def __str__(self):
+    return 'skus={} cost={:.00f} lengths={}'.format(
+      self.skus, self.cost, ','.join(map(str, self.lengths)))
+
+class SkuConsolidation(object):
+  """
+  This selects the k cable SKUs that minimize the total cable cost of a fabric.
+  Every cable uses the shortest stocked SKU that is at least its required
+  length. Over the sorted required lengths the SKUs partition the histogram
+  into contiguous groups, each priced at its longest length, which is solved
+  by dynamic programming. Since prices are nondecreasing in length, each DP
+  layer is solved in linear time with the monotone convex hull trick.
+  """
+
+  def __init__(self, fabric_model, lengths, max_skus=None):
+    """
+    Constructs a SkuConsolidation object
+
+    Args:
+      fabric_model (Fabric) : the fabric model used to price cables
+      lengths (list) : (required length, count) of the cables with distinct
+                       lengths, see required_lengths()
+      max_skus (int) : the largest number of SKUs to consider (default is
+                       every number of SKUs)
+    """
+    assert len(lengths) > 0, 'there are no cables'
+
+    histogram = sorted(lengths)
+
+    # the SKU stocked for each length and its price, priced cables apply the
+    # cable granularity. a longer SKU can always stand in for a shorter one so
+    # the cheapest of the longer SKUs is used
+    skus = []
+    for length, _ in histogram:
+      cable = fabric_model.priced_cable(length)
+      skus.append((cable.cost, cable.actual_length))
+    for idx in range(len(skus) - 2, -1, -1):
+      skus[idx] = min(skus[idx], skus[idx + 1])
+
+    # only the last length of each equal price run can be a group end. at
+    # these lengths the SKU is the one stocked for the length
+    self._lengths = []  # stocked SKU length
+    self._prices = []
+    self._prefix = [0]  # cumulative cable count
+    count = 0
+    for idx, (length, cnt) in enumerate(histogram):
+      count += cnt
+      if idx == len(histogram) - 1 or skus[idx][0] != skus[idx + 1][0]:
+        self._lengths.append(skus[idx][1])
+        self._prices.append(skus[idx][0])
+        self._prefix.append(count)
+
+    self.distinct_lengths = len(histogram)
+    if max_skus is None:
+      max_skus = len(self._lengths)
+    assert max_skus > 0, 'at least one SKU is required'
+    self.max_skus = min(max_skus, len(self._lengths))
+
+  @staticmethod
+  def required_lengths(topology_name, topo_opts, layout_name, layout_opts):
+    """
+    Returns the (required length, count) of the cables of a topology and
+    layout sorted by length
+    """
+    topo_model = topology.factory(topology_name, **topo_opts)
+    _, chassis, racks = topo_model.structure()
+    layout_model = layout.factory(layout_name, chassis, racks, **layout_opts)
+    counts = {}
+    with open(os.devnull, 'w') as devnull, \
+         contextlib.redirect_stdout(devnull):
+      for source, destination, count in topo_model.cables():
+        length = layout_model.distance(source, destination)
+        counts[length] = counts.get(length, 0) + count
+    return sorted(counts.items())
+
+  def _layer(self, previous):
+    """
+    This computes one DP layer using the monotone convex hull trick
+
+    Args:
+      previous (list) : cost of covering the first h lengths with one less SKU
+
+    Returns:
+      tuple (list, array) : costs of this layer, chosen previous group ends
+    """
+    n = len(self._lengths)
+    prefix = self._prefix
+    prices = self._prices
+    inf = float('inf')
+    current = [inf] * (n + 1)
+    choice = array.array('l', [-1]) * (n + 1)
+
+    # lines y = previous[h] - prefix[h] * x with strictly decreasing slopes,
+    # queried at nondecreasing x = price
+    hull = []
+    head = 0
+    for i in range(1, n + 1):
+      # add the line of group end h = i - 1
+      h = i - 1
+      if previous[h] != inf:
+        slope = -prefix[h]
+        intercept = previous[h]
+        while len(hull) - head >= 2:
+          s1, b1, _ = hull[-2]
+          s2, b2, _ = hull[-1]
+          # the last line is useless if the new line overtakes the second to
+          # last line no later than the last line does
+          if (intercept - b1) * (s1 - s2) <= (b2 - b1) * (s1 - slope):
+            hull.pop()
+          else:
+            break
+        hull.append((slope, intercept, h))
+      if len(hull) == head:
+        continue
+
+      # query the lower envelope
+      x = prices[i - 1]
+      while (len(hull) - head >= 2 and
+             hull[head + 1][0] * x + hull[head + 1][1] <=
+             hull[head][0] * x + hull[head][1]):
+        head += 1
+      slope, intercept, h = hull[head]
+      current[i] = slope * x + intercept + prefix[i] * x
+      choice[i] = h
+    return current, choice
+
+  def solve(self):
+    """
+    This computes the best SKU selection for every number of SKUs
+
+    Returns:
+      list : SkuCandidate for 1 through max_skus SKUs
+    """
+    n = len(self._lengths)
+    previous = [0.0] + [float('inf')] * n
+    choices = []
+    results = []
+    for k in range(1, self.max_skus + 1):
+      previous, choice = self._layer(previous)
+      choices.append(choice)
+
+      # backtrack the group ends
+      lengths = []
+      i = n
+      for layer in range(k - 1, -1, -1):
+        lengths.append(self._lengths[i - 1])
+        i = choices[layer][i]
+      assert i == 0
+      results.append(SkuCandidate(k, list(reversed(lengths)), previous[n]))
+    return results
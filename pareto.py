@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sys
+
+import utils
+
+# objective name, maximize
+OBJECTIVES = [
+  ('relative cost', False),
+  ('relative power', False),
+  ('nodes', True),
+  ('max cable length', False)]
+
+# the keys of the objectives in numeric summaries
+NUMERIC_SCHEMA = 'fabcalc-summary-1'
+NUMERIC_KEYS = {
+  'relative cost': 'relative_cost_usd_per_node',
+  'relative power': 'relative_power_w_per_node',
+  'nodes': 'nodes'}
+
+def number(value):
+  """
+  This converts a summary value (e.g., '$1,234.00/node') to a float
+  """
+  if isinstance(value, (int, float)):
+    return float(value)
+  match = re.search(r'-?[\d,]*\.?\d+', value)
+  if match is None:
+    raise ValueError('no number in summary value: {}'.format(value))
+  return float(match.group(0).replace(',', ''))
+
+def max_cable_length(directory):
+  """
+  This reads the maximum cable length from a topology information file
+  """
+  with open(os.path.join(directory, 'topo.txt'), 'r') as fd:
+    for line in fd:
+      if line.startswith('all:'):
+        return number(line.split('max=')[1])
+  raise ValueError('no cable lengths in {}/topo.txt'.format(directory))
+
+def results(directory):
+  """
+  This is a generator that generates (fabric, objectives) tuples for each
+  summary file in a sweep output directory, human and numeric summaries are
+  both read
+  """
+  max_length = max_cable_length(directory)
+  for filename in sorted(glob.glob(os.path.join(directory, 'summary*.json'))):
+    with open(filename, 'r') as fd:
+      summary = json.load(fd)
+    label = os.path.splitext(os.path.basename(filename))[0][len('summary_'):]
+    numeric = summary.get('schema') == NUMERIC_SCHEMA
+    values = []
+    for name, _ in OBJECTIVES:
+      if name == 'max cable length':
+        values.append(max_length)
+      elif numeric:
+        values.append(float(summary[NUMERIC_KEYS[name]]))
+      else:
+        values.append(number(summary[name]))
+    yield label, values
+
+def directories(args):
+  """
+  This is a generator of sweep output directories, '-' reads them from stdin as
+  they arrive
+  """
+  for directory in args.directories:
+    if directory == '-':
+      for line in sys.stdin:
+        line = line.strip()
+        if line:
+          yield line
+    else:
+      yield directory
+
+def main(args):
+  front = utils.ParetoFront([maximize for _, maximize in OBJECTIVES])
+  for directory in directories(args):
+    try:
+      for label, values in results(directory):
+        front.add(values, (directory, label))
+    except (OSError, ValueError, KeyError) as ex:
+      print('skipping {}: {}'.format(directory, ex), file=sys.stderr)
+
+  # write the frontier
+  fd = sys.stdout if args.csv == '-' else open(args.csv, 'w', newline='')
+  try:
+    writer = csv.writer(fd)
+    writer.writerow(['Directory', 'Fabric'] +
+                    [name.title() for name, _ in OBJECTIVES])
+    for values, (directory, label) in front.front():
+      writer.writerow([directory, label] +
+                      ['{0:.02f}'.format(value) for value in values])
+  finally:
+    if fd is not sys.stdout:
+      fd.close()
+  if args.verbose:
+    print('{} of {} points are on the frontier'.format(
+      len(front.front()), front.count), file=sys.stderr)
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(
+    description='Pareto frontier of sweep output directories')
+  ap.add_argument('directories', nargs='+', type=str,
+                  help='sweep output directories, \'-\' reads them from stdin')
+  ap.add_argument('--csv', type=str, default='-',
+                  help='CSV file of the frontier')
+  ap.add_argument('-v', '--verbose', action='store_true',
+                  help='print extra information')
+
+  args = ap.parse_args()
+  main(args)
@@ -0,0 +1,141 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import csv
+import gzip
+
+class CableSchedule(object):
+  """
+  This streams the cable schedule, one row per physical cable, to a CSV file
+  that is gzip compressed when the filename ends with '.gz'. Rows are written
+  in chunks so memory use doesn't grow with the number of cables.
+
+  Routers are identified by their slot, i.e., rack * chassis + chassis, and
+  their network ports are numbered in the order cables are generated. The route
+  lists the cable tray segments used, e.g., 'R2:0-5 C5:1-2' runs down row 2
+  from rack 0 to rack 5 then across from row 1 to row 2 at rack 5.
+  """
+
+  # rows buffered between writes
+  _chunk = 8192
+
+  def __init__(self, filename, chassis, total_racks, fabric_models,
+               fabric_labels):
+    """
+    Constructs a CableSchedule object
+
+    Args:
+      filename (str) : the file to be written
+      chassis (int) : number of chassis per rack
+      total_racks (int) : total number of racks
+      fabric_models (list) : the fabric models giving each cable's SKU
+      fabric_labels (list) : the labels of the fabric models
+    """
+    self.cables = 0
+    self._chassis = chassis
+    self._ports = [0] * (chassis * total_racks)  # slot->next port
+    self._fabric_models = fabric_models
+    self._skus = {}  # length->SKUs
+    self._rows = []
+    if filename.endswith('.gz'):
+      self._fd = gzip.open(filename, 'wt', newline='', compresslevel=6)
+    else:
+      self._fd = open(filename, 'w', newline='')
+    self._writer = csv.writer(self._fd)
+    if len(fabric_models) == 1:
+      skus = ['SKU']
+    else:
+      skus = ['SKU ({})'.format(label) for label in fabric_labels]
+    self._writer.writerow(
+      ['Cable', 'Source Router', 'Source Port', 'Source Rack',
+       'Source Chassis', 'Destination Router', 'Destination Port',
+       'Destination Rack', 'Destination Chassis', 'Length(m)'] + skus +
+      ['Route'])
+
+  def add(self, source, destination, count, length, route):
+    """
+    This adds 'count' cables between the source and destination
+
+    Args:
+      source (Coordinate) : the source coordinate of the cables
+      destination (Coordinate) : the destination coordinate of the cables
+      count (int) : the count of cables
+      length (float) : the length of the cables given by the layout
+      route (tuple) : the layout's last_route of the cables
+    """
+    skus = self._skus.get(length)
+    if skus is None:
+      skus = [self._sku(fabric_model.priced_cable(length))
+              for fabric_model in self._fabric_models]
+      self._skus[length] = skus
+    if route is None:
+      route_text = ''
+    else:
+      row, row_start, row_end, col, col_start, col_end = route
+      segments = []
+      if row_end > row_start:
+        segments.append('R{}:{}-{}'.format(row, row_start, row_end))
+      if col_end > col_start:
+        segments.append('C{}:{}-{}'.format(col, col_start, col_end))
+      route_text = ' '.join(segments)
+    length_text = '{0:.02f}'.format(length)
+
+    src = source.rack * self._chassis + source.chassis
+    dst = destination.rack * self._chassis + destination.chassis
+    for _ in range(count):
+      src_port = self._ports[src]
+      self._ports[src] += 1
+      dst_port = self._ports[dst]
+      self._ports[dst] += 1
+      self._rows.append(
+        [self.cables, src, src_port, source.rack, source.chassis,
+         dst, dst_port, destination.rack, destination.chassis,
+         length_text] + skus + [route_text])
+      self.cables += 1
+    if len(self._rows) >= self._chunk:
+      self._flush()
+
+  def close(self):
+    """
+    This writes the remaining rows and closes the file
+    """
+    self._flush()
+    self._fd.close()
+
+  def _flush(self):
+    self._writer.writerows(self._rows)
+    self._rows.clear()
+
+  @staticmethod
+  def _sku(cable):
+    if cable.tech is None:
+      return '{:g}m'.format(cable.actual_length)
+    return '{}-{:g}m'.format(cable.tech, cable.actual_length)
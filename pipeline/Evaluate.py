@@ -0,0 +1,110 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import contextlib
+import importlib
+import os
+
+from .Pipeline import Pipeline
+
+def normalize(request):
+  """
+  Converts an evaluation request, a dict with 'topology', 'topts', 'fabric',
+  'fopts', 'layout', and 'lopts' keys, to the arguments of a Pipeline. The
+  'fabric' is a list or is comma separated and 'fopts' is given once or once
+  per fabric model.
+
+  Returns:
+    tuple : topology, topology options, fabrics, layout, layout options
+  """
+  def strings(options):
+    if not isinstance(options, dict):
+      raise ValueError('options must be objects')
+    return {str(key): str(value) for key, value in options.items()}
+
+  if not isinstance(request.get('topology'), str):
+    raise ValueError('"topology" must be given')
+  if not isinstance(request.get('fabric'), (str, list)):
+    raise ValueError('"fabric" must be given')
+  fabric_names = request['fabric']
+  if isinstance(fabric_names, str):
+    fabric_names = fabric_names.split(',')
+  fopts = request.get('fopts', {})
+  if isinstance(fopts, dict):
+    fopts = [fopts] * len(fabric_names)
+  if len(fopts) != len(fabric_names):
+    raise ValueError('"fopts" must be given once or once per fabric model')
+  fabrics = [(str(name), strings(opts))
+             for name, opts in zip(fabric_names, fopts)]
+  return (request['topology'], strings(request.get('topts', {})), fabrics,
+          str(request.get('layout', 'Standard')),
+          strings(request.get('lopts', {})))
+
+def warm():
+  """
+  This imports all models so evaluations don't pay for it, it is used as the
+  initializer of worker processes
+  """
+  import fabric
+  import layout
+  import topology
+  for package in [fabric, layout, topology]:
+    for model in package.models():
+      importlib.import_module('{}.impl.{}'.format(package.__name__, model))
+
+def evaluate(args, checkpoint=None, shard_size=1 << 20, records=False):
+  """
+  This runs the normalized arguments of a Pipeline, it is meant to be run in
+  worker processes
+
+  Args:
+    args (tuple) : the result of normalize()
+    checkpoint (str) : the checkpoint file of the run (optional)
+    shard_size (int) : number of cable tuples per checkpoint shard
+    records (bool) : also return the results.ResultStore rows of the run
+
+  Returns:
+    dict : the numeric summary of each fabric model and the run metadata, and
+           the rows under 'records' when requested
+  """
+  with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+    pipe = Pipeline(*args, checkpoint=checkpoint, shard_size=shard_size)
+    pipe.run()
+  result = OrderedDict()
+  result['summaries'] = OrderedDict(
+    (label, fabric_model.numeric_summary(pipe.nodes))
+    for label, fabric_model in zip(pipe.fabric_labels, pipe.fabric_models))
+  result['metadata'] = pipe.metadata()
+  if records:
+    import results
+    result['records'] = results.ResultStore.records(pipe)
+  return result
@@ -0,0 +1,162 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import atexit
+import contextlib
+import os
+
+def render_bargraph(fabric_model, filename, xmax, plot_cost, plot_power,
+                    max_bars):
+  """
+  This renders the cable bargraph of a fabric model, it is run in a separate
+  process so matplotlib is only imported there
+  """
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+  fabric_model.cable_bargraph(plt, filename, xmax, plot_cost, plot_power,
+                             max_bars)
+  plt.close('all')
+
+class OutputWriter(object):
+  """
+  This writes output files concurrently. Writers run on a thread pool and plots
+  are rendered in a separate process, both are started when first needed. With
+  zero workers everything is written immediately in the calling thread.
+  """
+
+  def __init__(self, workers=4, stage=None):
+    """
+    Constructs an OutputWriter object
+
+    Args:
+      workers (int) : number of writer threads and at most as many plot
+                      processes as CPUs, 0 writes synchronously
+      stage (func) : returns a context manager for a named stage (optional)
+    """
+    self._stage = stage if stage is not None else (
+      lambda name: contextlib.nullcontext())
+    self._writes = []
+    self._plots = []  # (name, future)
+    self._workers = workers
+    self._threads = None
+    self._processes = None
+
+  def _thread_pool(self):
+    if self._threads is None:
+      import concurrent.futures
+      self._threads = concurrent.futures.ThreadPoolExecutor(self._workers)
+    return self._threads
+
+  def write(self, name, function, *args, stdout=False):
+    """
+    This runs a writer function
+
+    Args:
+      name (str) : the stage name of the output
+      function (func) : the function that writes the output
+      args (list) : arguments of the function
+      stdout (bool) : the output goes to stdout so it is written immediately to
+                      keep the order of stdout
+    """
+    if stdout or self._workers == 0:
+      with self._stage(name):
+        function(*args)
+    else:
+      self._writes.append(self._thread_pool().submit(self._run, name,
+                                                     function, args))
+
+  def plot(self, name, function, *args):
+    """
+    This runs a plotting function in a separate process, the function and its
+    arguments must be picklable
+    """
+    if self._workers == 0:
+      with self._stage(name):
+        function(*args)
+      return
+    if self._processes is None:
+      import concurrent.futures
+      import multiprocessing
+      self._processes = concurrent.futures.ProcessPoolExecutor(
+        min(self._workers, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context('spawn'))
+    # submitted here so all plots are queued before a possible shutdown
+    process = self._processes.submit(function, *args)
+    self._plots.append((name, self._thread_pool().submit(
+      self._run_process, name, process)))
+
+  def _run(self, name, function, args):
+    with self._stage(name):
+      function(*args)
+
+  def _run_process(self, name, process):
+    with self._stage(name):
+      process.result()
+
+  @staticmethod
+  def _wait(futures):
+    """
+    This waits for futures and raises the first exception
+    """
+    for future in futures:
+      future.result()
+
+  def pending_plots(self):
+    """
+    Returns the stage names of the plots that haven't finished
+    """
+    names = []
+    for name, future in self._plots:
+      if not future.done() and name not in names:
+        names.append(name)
+    return names
+
+  def close(self, wait_plots=True):
+    """
+    This waits for all writers. When 'wait_plots' is False this returns before
+    plots finish, see pending_plots(), they are then waited for before the
+    interpreter exits.
+    """
+    self._wait(self._writes)
+    if wait_plots or not self._plots:
+      self._finish()
+    else:
+      atexit.register(self._finish)
+
+  def _finish(self):
+    try:
+      self._wait(future for _, future in self._plots)
+    finally:
+      if self._threads is not None:
+        self._threads.shutdown()
+      if self._processes is not None:
+        self._processes.shutdown()
@@ -0,0 +1,528 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import fabric
+import layout
+import topology
+
+class Pipeline(object):
+  """
+  This connects a topology model, a layout model, and one or more fabric models.
+  The topology and layout are only generated once and every cable length is fed
+  to all of the fabric models.
+  """
+
+  def __init__(self, topology_name, topo_opts, fabrics, layout_name,
+               layout_opts, timings=None, memory=None, progress=None,
+               schedule=None, checkpoint=None, shard_size=1 << 20):
+    """
+    Constructs a Pipeline object
+
+    Args:
+      topology_name (str) : the topology model to use
+      topo_opts (dict) : options of the topology model
+      fabrics (list) : (model, options) tuples of the fabric models to use
+      layout_name (str) : the layout model to use
+      layout_opts (dict) : options of the layout model
+      timings (Timings) : collects stage timings when given
+      memory (MemoryProfile) : collects stage memory usage when given
+      progress (Progress) : reports cable generation progress when given
+      schedule (str) : the cable schedule file to be streamed when given
+      checkpoint (str) : the file the models are checkpointed to after each
+                         shard of cables, the run resumes from it if it exists
+      shard_size (int) : number of cable tuples per checkpoint shard
+    """
+    assert len(fabrics) > 0, 'at least one fabric model must be given'
+    self.timings = timings
+    self.memory = memory
+    self.progress = progress
+    self.run_seconds = None
+    self.checkpoint = checkpoint
+    self.shard_size = shard_size
+    if checkpoint is not None:
+      if timings is not None or schedule is not None:
+        raise ValueError('checkpoints can\'t be used with timings or a cable '
+                         'schedule')
+      assert shard_size > 0, 'the shard size must be positive'
+
+    # the configuration, used to identify results
+    self.config = self.make_config(topology_name, topo_opts, fabrics,
+                                   layout_name, layout_opts)
+
+    # construct the models
+    with self.stage('topology construction'):
+      self.topo_model = topology.factory(topology_name, **topo_opts)
+      self.nodes, chassis, racks = self.topo_model.structure()
+    with self.stage('fabric construction', calls=len(fabrics)):
+      self.fabric_models = [fabric.factory(name, **opts)
+                            for name, opts in fabrics]
+    with self.stage('layout construction'):
+      self.layout_model = layout.factory(layout_name, chassis, racks,
+                                         **layout_opts)
+
+    # create unique labels for the fabric models
+    names = [name for name, _ in fabrics]
+    self.fabric_labels = []
+    for idx, name in enumerate(names):
+      if names.count(name) > 1:
+        name = '{}_{}'.format(name, names[:idx].count(name) + 1)
+      self.fabric_labels.append(name)
+
+    # the cable schedule is written while cables are generated
+    self.schedule = None
+    if schedule is not None:
+      from .CableSchedule import CableSchedule
+      self.schedule = CableSchedule(schedule, chassis, racks,
+                                    self.fabric_models, self.fabric_labels)
+
+  @staticmethod
+  def make_config(topology_name, topo_opts, fabrics, layout_name, layout_opts):
+    """
+    Returns a dict of the configuration given to the constructor
+    """
+    config = OrderedDict()
+    config['topology'] = topology_name
+    config['topology_options'] = dict(topo_opts)
+    config['fabrics'] = [OrderedDict([('model', name), ('options', dict(opts))])
+                         for name, opts in fabrics]
+    config['layout'] = layout_name
+    config['layout_options'] = dict(layout_opts)
+    return config
+
+  @staticmethod
+  def hash_config(config):
+    """
+    Returns a SHA-256 hex digest identifying a configuration from make_config()
+    """
+    import hashlib
+    text = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+  def stage(self, name, calls=1, cables=0):
+    """
+    Returns a context manager timing and memory tracing a stage, it does
+    nothing without timings or a memory profile
+    """
+    if self.timings is None and self.memory is None:
+      return contextlib.nullcontext()
+    stack = contextlib.ExitStack()
+    if self.memory is not None:
+      stack.enter_context(self.memory.stage(name))
+    if self.timings is not None:
+      stack.enter_context(self.timings.stage(name, calls, cables))
+    return stack
+
+  def _memory_stage(self, name):
+    """
+    Returns a context manager memory tracing a stage
+    """
+    if self.memory is None:
+      return contextlib.nullcontext()
+    return self.memory.stage(name)
+
+  def run(self):
+    """
+    This generates all routers and cables then sets their attributes
+    """
+    start = time.perf_counter()
+    if self.timings is not None:
+      self._run_timed()
+    elif self.checkpoint is not None:
+      self._run_checkpointed()
+    else:
+      self._run()
+    self.run_seconds = time.perf_counter() - start
+
+  def _run(self):
+    """
+    This is run() without timings
+    """
+    # generate routers and cables
+    with self._memory_stage('routers'):
+      self.add_routers()
+    with self._memory_stage('cables'):
+      if self.progress is not None:
+        self._run_progress()
+      elif self.schedule is not None:
+        self._run_schedule()
+      else:
+        for source, destination, count in self.topo_model.cables():
+          length = self.layout_model.length(source, destination, count)
+          self.topo_model.notify_length(length, count)
+          for fabric_model in self.fabric_models:
+            fabric_model.add_cable(length, count)
+      if self.schedule is not None:
+        self.schedule.close()
+
+    # set router and cable attributes
+    with self._memory_stage('set_attributes()'):
+      for fabric_model in self.fabric_models:
+        fabric_model.set_attributes()
+
+  def add_routers(self):
+    """
+    This adds the routers of the topology to the fabric models
+    """
+    for radix, count in self.topo_model.routers():
+      for fabric_model in self.fabric_models:
+        fabric_model.add_router(radix, count)
+
+  def run_shard(self, start, stop):
+    """
+    This adds the cables of the tuples [start, stop) generated by the topology
+    to the models, the topology seeks to the start. Routers aren't added and
+    attributes aren't set, the pipelines of all shards are combined in order
+    with merge(). The per section prints of topologies are suppressed as they
+    only cover the shard.
+
+    Returns:
+      bool : True if the topology generated no more than 'stop' tuples
+    """
+    self.layout_model.start_shard()
+    with open(os.devnull, 'w') as devnull, \
+         contextlib.redirect_stdout(devnull):
+      generator = iter(self.topo_model.cables(start))
+      for source, destination, count in itertools.islice(generator,
+                                                         stop - start):
+        length = self.layout_model.length(source, destination, count)
+        self.topo_model.notify_length(length, count)
+        for fabric_model in self.fabric_models:
+          fabric_model.add_cable(length, count)
+      return next(generator, None) is None
+
+  def merge(self, other):
+    """
+    This adds the cables of another pipeline of the same configuration, e.g.,
+    one that ran the next shard. Shards are merged in the order of their
+    cables.
+    """
+    assert self.config_hash() == other.config_hash(), \
+      'only pipelines of the same configuration can be merged'
+    self.topo_model.merge(other.topo_model)
+    self.layout_model.merge(other.layout_model)
+    for fabric_model, other_model in zip(self.fabric_models,
+                                         other.fabric_models):
+      fabric_model.merge(other_model)
+
+  def _run_schedule(self):
+    """
+    This generates all cables adding each to the cable schedule
+    """
+    for source, destination, count in self.topo_model.cables():
+      length = self.layout_model.length(source, destination, count)
+      self.schedule.add(source, destination, count, length,
+                        self.layout_model.last_route)
+      self.topo_model.notify_length(length, count)
+      for fabric_model in self.fabric_models:
+        fabric_model.add_cable(length, count)
+
+  def _run_checkpointed(self):
+    """
+    This is run() processing the cables in shards and checkpointing the models
+    after each shard. Resuming seeks the topology over the cables of the
+    finished shards.
+    """
+    import pickle
+    state = None
+    if os.path.exists(self.checkpoint):
+      with open(self.checkpoint, 'rb') as fd:
+        state = pickle.load(fd)
+      if state['config_hash'] != self.config_hash():
+        raise ValueError('checkpoint {} is of a different configuration'
+                         .format(self.checkpoint))
+
+    # generate routers, they are part of the checkpoint
+    if state is None:
+      with self._memory_stage('routers'):
+        self.add_routers()
+
+    with self._memory_stage('cables'):
+      # the generator is always advanced to the next tuple before a checkpoint
+      # is written, this runs the end of a section and the end of the
+      # generator before the models are saved
+      consumed = 0
+      cables = 0
+      pending = None
+      if state is None:
+        generator = iter(self.topo_model.cables())
+        pending = next(generator, None)
+      else:
+        if not state['exhausted']:
+          # the topology seeks to the next tuple, the side effects of the
+          # sections it seeks over are replaced by the checkpoint
+          with open(os.devnull, 'w') as devnull, \
+               contextlib.redirect_stdout(devnull):
+            generator = iter(self.topo_model.cables(state['consumed']))
+            pending = next(generator, None)
+          assert pending is not None, \
+            'the topology generated fewer tuples than the checkpoint'
+        self.topo_model.__dict__.update(state['topology'].__dict__)
+        self.layout_model.__dict__.update(state['layout'].__dict__)
+        for fabric_model, saved in zip(self.fabric_models, state['fabrics']):
+          fabric_model.__dict__.update(saved.__dict__)
+        consumed = state['consumed']
+        cables = state['cables']
+      if self.progress is not None:
+        self.progress.start(self.topo_model.expected_cables())
+      while pending is not None:
+        shard = 0
+        for source, destination, count in itertools.chain(
+            [pending], itertools.islice(generator, self.shard_size - 1)):
+          length = self.layout_model.length(source, destination, count)
+          self.topo_model.notify_length(length, count)
+          for fabric_model in self.fabric_models:
+            fabric_model.add_cable(length, count)
+          cables += count
+          shard += 1
+        consumed += shard
+        pending = next(generator, None)
+        self._write_checkpoint(consumed, cables, pending is None)
+        if self.progress is not None:
+          self.progress.update(cables)
+      if self.progress is not None:
+        self.progress.finish(cables)
+
+    # set router and cable attributes
+    with self._memory_stage('set_attributes()'):
+      for fabric_model in self.fabric_models:
+        fabric_model.set_attributes()
+    if os.path.exists(self.checkpoint):
+      os.remove(self.checkpoint)
+
+  def _write_checkpoint(self, consumed, cables, exhausted):
+    """
+    This atomically replaces the checkpoint with the current models
+    """
+    state = {
+      'config_hash': self.config_hash(),
+      'consumed': consumed,
+      'cables': cables,
+      'exhausted': exhausted,
+      'topology': self.topo_model,
+      'layout': self.layout_model,
+      'fabrics': self.fabric_models}
+    import pickle
+    temporary = self.checkpoint + '.tmp'
+    with open(temporary, 'wb') as fd:
+      pickle.dump(state, fd, protocol=pickle.HIGHEST_PROTOCOL)
+      fd.flush()
+      os.fsync(fd.fileno())
+    os.replace(temporary, self.checkpoint)
+
+  # cables between progress checks
+  _progress_chunk = 4096
+
+  def _run_progress(self):
+    """
+    This generates all cables reporting progress between chunks of cables
+    """
+    self.progress.start(self.topo_model.expected_cables())
+    cables = 0
+    generator = iter(self.topo_model.cables())
+    done = False
+    while not done:
+      done = True
+      for source, destination, count in itertools.islice(
+          generator, self._progress_chunk):
+        done = False
+        length = self.layout_model.length(source, destination, count)
+        if self.schedule is not None:
+          self.schedule.add(source, destination, count, length,
+                            self.layout_model.last_route)
+        self.topo_model.notify_length(length, count)
+        for fabric_model in self.fabric_models:
+          fabric_model.add_cable(length, count)
+        cables += count
+      self.progress.update(cables)
+    self.progress.finish(cables)
+
+  def _run_timed(self):
+    """
+    This is run() with every stage timed. It is kept separate so the untimed
+    loop carries no instrumentation overhead.
+    """
+    with self._memory_stage('routers'):
+      self._time_routers()
+    with self._memory_stage('cables'):
+      self._time_cables()
+    if self.schedule is not None:
+      with self.stage('schedule close'):
+        self.schedule.close()
+
+    # set router and cable attributes
+    with self.stage('set_attributes()', calls=len(self.fabric_models)):
+      for fabric_model in self.fabric_models:
+        fabric_model.set_attributes()
+
+  def _time_routers(self):
+    """
+    This generates all routers with the generator and fabric models timed
+    """
+    clock = time.perf_counter
+    routers = 0
+    router_time = 0.0
+    add_router_time = 0.0
+    generator = iter(self.topo_model.routers())
+    while True:
+      start = clock()
+      try:
+        radix, count = next(generator)
+      except StopIteration:
+        router_time += clock() - start
+        break
+      generated = clock()
+      for fabric_model in self.fabric_models:
+        fabric_model.add_router(radix, count)
+      router_time += generated - start
+      add_router_time += clock() - generated
+      routers += 1
+    self.timings.add('routers()', router_time, routers)
+    self.timings.add('add_router()', add_router_time,
+                     routers * len(self.fabric_models))
+
+  def _time_cables(self):
+    """
+    This generates all cables with the generator, layout model, and fabric
+    models timed
+    """
+    clock = time.perf_counter
+    if self.progress is not None:
+      self.progress.start(self.topo_model.expected_cables())
+    calls = 0
+    cables = 0
+    cable_time = 0.0
+    length_time = 0.0
+    notify_time = 0.0
+    add_cable_time = 0.0
+    schedule_time = 0.0
+    generator = iter(self.topo_model.cables())
+    while True:
+      start = clock()
+      try:
+        source, destination, count = next(generator)
+      except StopIteration:
+        cable_time += clock() - start
+        break
+      generated = clock()
+      length = self.layout_model.length(source, destination, count)
+      measured = clock()
+      scheduled = measured
+      if self.schedule is not None:
+        self.schedule.add(source, destination, count, length,
+                          self.layout_model.last_route)
+        scheduled = clock()
+      self.topo_model.notify_length(length, count)
+      notified = clock()
+      for fabric_model in self.fabric_models:
+        fabric_model.add_cable(length, count)
+      cable_time += generated - start
+      length_time += measured - generated
+      schedule_time += scheduled - measured
+      notify_time += notified - scheduled
+      add_cable_time += clock() - notified
+      calls += 1
+      cables += count
+      if self.progress is not None and calls % self._progress_chunk == 0:
+        self.progress.update(cables)
+    if self.progress is not None:
+      self.progress.finish(cables)
+    self.timings.add('cables()', cable_time, calls, cables)
+    self.timings.add('length()', length_time, calls, cables)
+    self.timings.add('notify_length()', notify_time, calls, cables)
+    if self.schedule is not None:
+      self.timings.add('schedule add()', schedule_time, calls, cables)
+    self.timings.add('add_cable()', add_cable_time,
+                     calls * len(self.fabric_models),
+                     cables * len(self.fabric_models))
+
+  def config_hash(self):
+    """
+    Returns a SHA-256 hex digest identifying the configuration
+    """
+    return self.hash_config(self.config)
+
+  def metadata(self):
+    """
+    Returns a dict describing the run: the configuration, its hash, the cable
+    counts of each topology class, and the timings
+    """
+    data = OrderedDict()
+    data['config'] = self.config
+    data['config_hash'] = self.config_hash()
+    cables = OrderedDict()
+    cables['expected'] = self.topo_model.expected_cables()
+    try:
+      cables['by_class'] = OrderedDict(
+        (name, count) for name, count, _, _, _ in
+        self.topo_model.length_stats())
+    except NotImplementedError:
+      pass
+    data['cables'] = cables
+    timings = OrderedDict()
+    timings['run_seconds'] = self.run_seconds
+    if self.timings is not None:
+      timings['stages'] = OrderedDict(
+        (name, stage['seconds'])
+        for name, stage in self.timings.report()['stages'].items())
+    data['timings'] = timings
+    return data
+
+  def comparison_csv(self, filename):
+    """
+    This generates a CSV file comparing the totals of all fabric models
+    """
+    # gather the totals of each fabric model
+    totals = OrderedDict()
+    for label, fabric_model in zip(self.fabric_labels, self.fabric_models):
+      totals[label] = fabric_model.totals(self.nodes)
+    fields = list(next(iter(totals.values())))
+
+    # write the file
+    fd = sys.stdout if filename == '-' else open(filename, 'w', newline='')
+    try:
+      writer = csv.writer(fd)
+      writer.writerow(['Fabric'] + fields)
+      for label, data in totals.items():
+        writer.writerow([label] + ['{0:.02f}'.format(data[field])
+                                   if isinstance(data[field], float)
+                                   else data[field] for field in fields])
+    finally:
+      if fd is not sys.stdout:
+        fd.close()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+import results
+
+# columns printed by default
+COLUMNS = ['topology', 'fabric', 'nodes', 'total_cost_usd',
+           'relative_cost_usd_per_node', 'relative_power_w_per_node',
+           'max_required_m', 'max_cable_m', 'config_hash']
+
+def main(args):
+  with results.ResultStore(args.database) as store:
+    if args.list_columns:
+      print('\n'.join(store.columns()))
+      return
+    for columns in args.index or []:
+      store.index(columns.split(','))
+    columns = COLUMNS if args.columns is None else args.columns.split(',')
+    start = time.perf_counter()
+    rows = store.query(args.where, columns=columns, order=args.order,
+                       limit=args.limit)
+    seconds = time.perf_counter() - start
+
+  # write the rows
+  if args.format == 'json':
+    for row in rows:
+      print(json.dumps(dict(zip(columns, row))))
+  else:
+    writer = csv.writer(sys.stdout)
+    writer.writerow(columns)
+    for row in rows:
+      writer.writerow(row)
+  if args.verbose:
+    print('{} rows in {:.03f} ms'.format(len(rows), seconds * 1e3),
+          file=sys.stderr)
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description='queries a fabcalc result store')
+  ap.add_argument('database', type=str,
+                  help='the SQLite database written by main.py --store')
+  ap.add_argument('where', type=str, nargs='?',
+                  help=('SQL condition, e.g., "topology = \'Hyperx\' AND '
+                        'relative_cost_usd_per_node < 200 AND '
+                        'max_required_m < 30"'))
+  ap.add_argument('--columns', type=str,
+                  help='columns to print, comma separated')
+  ap.add_argument('--order', type=str,
+                  help='SQL ORDER BY clause, e.g., "total_cost_usd DESC"')
+  ap.add_argument('--limit', type=int,
+                  help='maximum number of rows')
+  ap.add_argument('--format', type=str, default='csv', choices=['csv', 'json'],
+                  help='output format')
+  ap.add_argument('--index', type=str, action='append',
+                  help=('columns to index before querying, comma separated, '
+                        'e.g., topts_widths, it is kept for later queries'))
+  ap.add_argument('--list_columns', action='store_true',
+                  help='print the available columns')
+  ap.add_argument('-v', '--verbose', action='store_true',
+                  help='print the query time to stderr')
+  args = ap.parse_args()
+  main(args)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import statistics
+import sys
+
+import bench
+
+# configurations from tests.py
+CONFIGS = {
+  'hx3d_16k': ('Hyperx',
+               'widths=4,16,16 weights=4,1,1 concentration=16 chassis=4'),
+  'dfly_16k': ('Dragonfly',
+               'global_width=128 global_weight=1 local_width=16 '
+               'local_weight=1 concentration=8 chassis=4'),
+  'ftree_16k': ('FatTree',
+                'leaves=1024 down_ports=16 up_ports=16 leaves_per_rack=4 '
+                'directors_per_rack=1 director_radix=1024 '
+                'director_rack_inset=6')}
+
+def mad(samples):
+  """
+  Returns the median absolute deviation scaled to estimate a standard deviation
+  """
+  median = statistics.median(samples)
+  return 1.4826 * statistics.median([abs(s - median) for s in samples])
+
+def measure(names, fabric, layout, repeat, verbose):
+  """
+  This runs each configuration 'repeat' times and returns the per stage
+  statistics. Repeats are interleaved across configurations so slow drift of
+  the machine affects all configurations alike.
+  """
+  configs = []
+  for _ in range(repeat):
+    for name in names:
+      topology, topts = CONFIGS[name]
+      configs.append({'name': name, 'topology': topology, 'topts': topts,
+                      'fabric': fabric, 'layout': layout})
+
+  # gather the samples
+  samples = {name: {'stages': {}, 'peak rss (KiB)': []} for name in names}
+  context = multiprocessing.get_context('spawn')
+  with concurrent.futures.ProcessPoolExecutor(
+      max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+    for result in executor.map(bench.run_config, configs):
+      if result['status'] != 'ok':
+        raise ValueError('{} failed: {}'.format(result['name'],
+                                                result['reason']))
+      if verbose:
+        print('{:<12} {:8.02f}s'.format(result['name'], result['seconds']),
+              file=sys.stderr)
+      sample = samples[result['name']]
+      sample['peak rss (KiB)'].append(result['peak rss (KiB)'])
+      stages = dict(result['timings'])
+      stages['total'] = {'seconds': result['seconds']}
+      for stage, data in stages.items():
+        sample['stages'].setdefault(stage, []).append(data['seconds'])
+
+  # reduce the samples to statistics
+  stats = {}
+  for name, sample in samples.items():
+    rss = sample['peak rss (KiB)']
+    stats[name] = {
+      'peak rss (KiB)': {'median': statistics.median(rss), 'mad': mad(rss),
+                         'samples': rss},
+      'stages': {stage: {'median': statistics.median(seconds),
+                         'mad': mad(seconds),
+                         'samples': seconds}
+                 for stage, seconds in sample['stages'].items()}}
+  return stats
+
+def record(args):
+  names = args.configs.split(',')
+  data = {
+    'metadata': {'commit': bench.git_commit(), 'fabric': args.fabric,
+                 'layout': args.layout, 'repeat': args.repeat},
+    'configs': measure(names, args.fabric, args.layout, args.repeat,
+                       args.verbose)}
+  with open(args.baseline, 'w') as fd:
+    print(json.dumps(data, indent=2), file=fd)
+  return 0
+
+def check(args):
+  with open(args.baseline, 'r') as fd:
+    baseline = json.load(fd)
+  fabric = baseline['metadata']['fabric']
+  layout = baseline['metadata']['layout']
+  names = [name for name in baseline['configs'] if name in CONFIGS]
+  current = measure(names, fabric, layout, args.repeat, args.verbose)
+
+  # compare every stage, a stage regresses when its median grows by more than
+  #  the threshold and the growth also stands out from the run-to-run noise
+  regressions = 0
+  print('{:<12} {:<24} {:>10} {:>10} {:>8}  {}'.format(
+    'config', 'stage', 'baseline', 'current', 'change', 'status'))
+  for name in names:
+    base = baseline['configs'][name]
+    cur = current[name]
+    for stage, bstats in base['stages'].items():
+      cstats = cur['stages'].get(stage)
+      if cstats is None:
+        continue
+      bmed = bstats['median']
+      cmed = cstats['median']
+      noise = args.noise * max(bstats['mad'], cstats['mad'])
+      change = (cmed - bmed) / bmed if bmed > 0 else 0.0
+      regressed = (cmed - bmed > max(args.threshold * bmed, noise) and
+                   cmed - bmed > args.min_seconds)
+      regressions += regressed
+      print('{:<12} {:<24} {:>9.04f}s {:>9.04f}s {:>+7.01%}  {}'.format(
+        name, stage, bmed, cmed, change, 'REGRESSION' if regressed else 'ok'))
+
+    # compare peak memory like the stages, the floor keeps the interpreter's
+    #  share of small configurations from deciding
+    bstats = base['peak rss (KiB)']
+    cstats = cur['peak rss (KiB)']
+    brss = bstats['median']
+    crss = cstats['median']
+    noise = args.noise * max(bstats['mad'], cstats['mad'])
+    change = (crss - brss) / brss if brss > 0 else 0.0
+    regressed = (crss - brss > max(args.memory_threshold * brss, noise) and
+                 crss - brss > args.min_kib)
+    regressions += regressed
+    print('{:<12} {:<24} {:>8,.0f}K {:>8,.0f}K {:>+7.01%}  {}'.format(
+      name, 'peak rss', brss, crss, change,
+      'REGRESSION' if regressed else 'ok'))
+
+  if regressions > 0:
+    print('{} regression(s)'.format(regressions), file=sys.stderr)
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description='benchmark regression gate')
+  sp = ap.add_subparsers(dest='command')
+  sp.required = True
+
+  # record a baseline
+  rc = sp.add_parser('record', help='record a baseline')
+  rc.add_argument('baseline', type=str,
+                  help='JSON file of the baseline')
+  rc.add_argument('--configs', type=str, default=','.join(CONFIGS),
+                  help='configurations to run, comma separated')
+  rc.add_argument('--fabric', type=str, default='KimDally',
+                  help='the fabric model to use')
+  rc.add_argument('--layout', type=str, default='Standard',
+                  help='the layout model to use')
+  rc.set_defaults(func=record)
+
+  # check against a baseline
+  ck = sp.add_parser('check', help='check for regressions against a baseline')
+  ck.add_argument('baseline', type=str,
+                  help='JSON file of the baseline')
+  ck.add_argument('--threshold', type=float, default=0.10,
+                  help='allowed relative growth of a stage\'s median time')
+  ck.add_argument('--memory_threshold', type=float, default=0.10,
+                  help='allowed relative growth of peak memory')
+  ck.add_argument('--noise', type=float, default=3.0,
+                  help='growth must also exceed this many deviations')
+  ck.add_argument('--min_seconds', type=float, default=0.005,
+                  help='growth must also exceed this many seconds')
+  ck.add_argument('--min_kib', type=float, default=8192,
+                  help='peak memory growth must also exceed this many KiB')
+  ck.set_defaults(func=check)
+
+  for p in (rc, ck):
+    p.add_argument('--repeat', type=int, default=5,
+                   help='number of runs of each configuration')
+    p.add_argument('-v', '--verbose', action='store_true',
+                   help='print progress')
+
+  args = ap.parse_args()
+  for name in getattr(args, 'configs', ','.join(CONFIGS)).split(','):
+    if name not in CONFIGS:
+      ap.error('unknown configuration: {}'.format(name))
+  sys.exit(args.func(args))
@@ -0,0 +1,121 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+
+class Journal(object):
+  """
+  This is an append-only JSON lines journal of the evaluations of a sweep.
+  Every evaluation is recorded when it starts and again when it finishes or
+  fails, each record is synced to disk before returning. Reopening a journal
+  loads the records, so evaluations that started without finishing can be run
+  again. A partial last line, e.g., from a killed process, is discarded.
+  Records may be added from several threads.
+  """
+
+  def __init__(self, filename):
+    """
+    Constructs a Journal object
+
+    Args:
+      filename (str) : the journal file, it is created if needed
+    """
+    self.started = OrderedDict()  # key->request of unfinished evaluations
+    self.finished = OrderedDict()  # key->result
+    self.failed = OrderedDict()  # key->error
+    if os.path.exists(filename):
+      with open(filename, 'rb+') as fd:
+        data = fd.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+          fd.truncate(complete)
+      for line in data[:complete].decode('utf-8').splitlines():
+        if line.strip():
+          self._load(json.loads(line))
+    self._lock = threading.Lock()
+    self._fd = open(filename, 'a')
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def _load(self, record):
+    key = record['key']
+    if record['event'] == 'start':
+      self.started[key] = record['request']
+      self.failed.pop(key, None)
+    elif record['event'] == 'finish':
+      self.started.pop(key, None)
+      self.finished[key] = record['result']
+    elif record['event'] == 'fail':
+      self.started.pop(key, None)
+      self.failed[key] = record['error']
+    else:
+      raise ValueError('unknown journal event: {}'.format(record['event']))
+
+  def _append(self, record):
+    with self._lock:
+      if record['event'] == 'start' and record['key'] in self.started:
+        return  # an evaluation started again, e.g., after a restart
+      self._load(record)
+      self._fd.write(json.dumps(record) + '\n')
+      self._fd.flush()
+      os.fsync(self._fd.fileno())
+
+  def start(self, key, request):
+    """
+    This records that an evaluation started, it isn't recorded again while it
+    hasn't finished or failed
+    """
+    self._append(OrderedDict([('event', 'start'), ('key', key),
+                              ('request', request)]))
+
+  def finish(self, key, result):
+    """
+    This records the result of an evaluation
+    """
+    self._append(OrderedDict([('event', 'finish'), ('key', key),
+                              ('result', result)]))
+
+  def fail(self, key, error):
+    """
+    This records that an evaluation failed
+    """
+    self._append(OrderedDict([('event', 'fail'), ('key', key),
+                              ('error', error)]))
+
+  def close(self):
+    self._fd.close()
@@ -0,0 +1,326 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from array import array
+from collections import OrderedDict
+import json
+import re
+import sqlite3
+
+# fixed columns of the results table and their types. min/max_required_m are
+#  the required cable lengths from the layout while min/max_cable_m are the
+#  lengths of the purchased cables, e.g., a 21m run bought as a 30m cable
+_COLUMNS = OrderedDict([
+  ('id', 'INTEGER PRIMARY KEY'),
+  ('config_hash', 'TEXT NOT NULL'),
+  ('fabric', 'TEXT NOT NULL'),
+  ('topology', 'TEXT'),
+  ('fabric_model', 'TEXT'),
+  ('layout', 'TEXT'),
+  ('nodes', 'INTEGER'),
+  ('router_count', 'INTEGER'),
+  ('router_cost_usd', 'REAL'),
+  ('router_power_w', 'REAL'),
+  ('cable_count', 'INTEGER'),
+  ('cable_cost_usd', 'REAL'),
+  ('cable_power_w', 'REAL'),
+  ('cable_length_m', 'REAL'),
+  ('total_cost_usd', 'REAL'),
+  ('relative_cost_usd_per_node', 'REAL'),
+  ('total_power_w', 'REAL'),
+  ('relative_power_w_per_node', 'REAL'),
+  ('min_cable_m', 'REAL'),
+  ('max_cable_m', 'REAL'),
+  ('min_required_m', 'REAL'),
+  ('max_required_m', 'REAL'),
+  ('routers_by_tech', 'TEXT'),
+  ('cables_by_tech', 'TEXT'),
+  ('topology_stats', 'TEXT'),
+  ('config', 'TEXT'),
+  ('cable_lengths', 'BLOB'),
+  ('cable_counts', 'BLOB'),
+  ('router_radices', 'BLOB'),
+  ('router_counts', 'BLOB'),
+  ('tray_rows', 'INTEGER'),
+  ('tray_row', 'BLOB'),
+  ('tray_col', 'BLOB')])
+
+# fixed columns that are indexed
+_INDEXES = [
+  ('topology', 'relative_cost_usd_per_node'),
+  ('fabric_model',),
+  ('nodes',),
+  ('total_cost_usd',),
+  ('relative_cost_usd_per_node',),
+  ('max_cable_m',),
+  ('max_required_m',)]
+
+# the option columns of each model kind
+_OPTION_PREFIXES = {'topology': 'topts_', 'fabric': 'fopts_',
+                    'layout': 'lopts_'}
+
+def _quote(name):
+  return '"{}"'.format(name.replace('"', '""'))
+
+def _value(text):
+  """
+  Converts an option string to an int or float when it is one
+  """
+  for kind in [int, float]:
+    try:
+      return kind(text)
+    except ValueError:
+      pass
+  return text
+
+class ResultStore(object):
+  """
+  This stores evaluation results in a SQLite database, one row per fabric model
+  of a run. Rows are inserted in batched transactions with the database in WAL
+  mode so readers aren't blocked. Model options are stored in their own
+  columns, e.g., 'topts_widths', which are added as new options are seen. Only
+  the fixed query columns are indexed, see index() for the others. Histograms
+  are stored as native byte order arrays, see histogram().
+  """
+
+  def __init__(self, filename, batch=256):
+    """
+    Constructs a ResultStore object
+
+    Args:
+      filename (str) : the SQLite database, it is created if needed
+      batch (int) : number of rows inserted per transaction
+    """
+    assert batch > 0, 'the batch must be at least one row'
+    self.batch = batch
+    self._pending = []
+    # concurrent writers, e.g., a sweep, wait for each other
+    self._db = sqlite3.connect(filename, timeout=60)
+    self._db.row_factory = sqlite3.Row
+    self._db.execute('PRAGMA journal_mode=WAL')
+    self._db.execute('PRAGMA synchronous=NORMAL')
+    with self._db:
+      self._db.execute('BEGIN IMMEDIATE')
+      self._db.execute('CREATE TABLE IF NOT EXISTS results ({})'.format(
+        ', '.join('{} {}'.format(name, kind)
+                  for name, kind in _COLUMNS.items()) +
+        ', UNIQUE (config_hash, fabric)'))
+      for columns in _INDEXES:
+        self._create_index(columns)
+    self._columns = set(self.columns())
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def _create_index(self, columns):
+    self._db.execute('CREATE INDEX IF NOT EXISTS {} ON results ({})'.format(
+      _quote('results_' + '_'.join(columns)),
+      ', '.join(_quote(column) for column in columns)))
+
+  def index(self, columns):
+    """
+    This indexes columns, e.g., option columns that are queried often
+    """
+    known = set(self.columns())
+    for column in columns:
+      if column not in known:
+        raise ValueError('unknown column: {}'.format(column))
+    with self._db:
+      self._create_index(tuple(columns))
+
+  def add_pipeline(self, pipe):
+    """
+    This adds a row for each fabric model of a pipeline that has been run
+    """
+    for record in self.records(pipe):
+      self.add(record)
+
+  @staticmethod
+  def records(pipe):
+    """
+    Returns the rows of add_pipeline() as a list of dicts for add(), it needs
+    no database so workers can make them for the process holding the store
+    """
+    config = pipe.config
+    config_hash = pipe.config_hash()
+    config_text = json.dumps(config)
+    try:
+      stats = pipe.topo_model.length_stats()
+    except NotImplementedError:
+      stats = []
+    counted = [(lmin, lmax) for _, count, lmin, lmax, _ in stats if count > 0]
+    min_required = min(lmin for lmin, _ in counted) if counted else None
+    max_required = max(lmax for _, lmax in counted) if counted else None
+    topology_stats = json.dumps([
+      OrderedDict([('class', name), ('count', count),
+                   ('min_m', lmin if count > 0 else None),
+                   ('max_m', lmax if count > 0 else None),
+                   ('sum_m', lsum)])
+      for name, count, lmin, lmax, lsum in stats])
+    row_cables, col_cables = pipe.layout_model.cable_trays()
+    tray_row = array('d', [value for row in row_cables for value in row])
+    tray_col = array('d', [value for col in col_cables for value in col])
+
+    records = []
+    for label, fabric_config, fabric_model in zip(
+        pipe.fabric_labels, config['fabrics'], pipe.fabric_models):
+      summary = fabric_model.numeric_summary(pipe.nodes)
+      histogram = fabric_model.cable_histogram()
+      routers = fabric_model.router_histogram()
+      record = OrderedDict()
+      record['config_hash'] = config_hash
+      record['fabric'] = label
+      record['topology'] = config['topology']
+      record['fabric_model'] = fabric_config['model']
+      record['layout'] = config['layout']
+      for name, value in summary.items():
+        if name in _COLUMNS:
+          if isinstance(value, dict):
+            value = json.dumps(value)
+          record[name] = value
+      record['min_cable_m'] = histogram[0][0] if histogram else None
+      record['max_cable_m'] = histogram[-1][0] if histogram else None
+      record['min_required_m'] = min_required
+      record['max_required_m'] = max_required
+      record['topology_stats'] = topology_stats
+      record['config'] = config_text
+      record['cable_lengths'] = array(
+        'd', [length for length, _ in histogram]).tobytes()
+      record['cable_counts'] = array(
+        'q', [count for _, count in histogram]).tobytes()
+      record['router_radices'] = array(
+        'q', [radix for radix, _ in routers]).tobytes()
+      record['router_counts'] = array(
+        'q', [count for _, count in routers]).tobytes()
+      record['tray_rows'] = len(row_cables)
+      record['tray_row'] = tray_row.tobytes()
+      record['tray_col'] = tray_col.tobytes()
+      for kind, options in [('topology', config['topology_options']),
+                            ('fabric', fabric_config['options']),
+                            ('layout', config['layout_options'])]:
+        for key, value in options.items():
+          column = _OPTION_PREFIXES[kind] + re.sub(r'\W', '_', key)
+          record[column] = _value(value)
+      records.append(record)
+    return records
+
+  def add(self, record):
+    """
+    This adds a row given as a dict of column->value, unknown columns are
+    added. Rows with the config_hash and fabric of an existing row
+    replace it.
+    """
+    for column in record:
+      if column not in self._columns:
+        self._add_column(column)
+    self._pending.append(record)
+    if len(self._pending) >= self.batch:
+      self.flush()
+
+  def _add_column(self, column):
+    """
+    This adds a column unless another writer already has
+    """
+    with self._db:
+      self._db.execute('BEGIN IMMEDIATE')
+      self._columns = set(row['name'] for row in
+                          self._db.execute('PRAGMA table_info(results)'))
+      if column not in self._columns:
+        self._db.execute('ALTER TABLE results ADD COLUMN {}'.format(
+          _quote(column)))
+        self._columns.add(column)
+
+  def flush(self):
+    """
+    This inserts the pending rows in one transaction
+    """
+    if not self._pending:
+      return
+    groups = OrderedDict()  # columns->rows
+    for record in self._pending:
+      groups.setdefault(tuple(record), []).append(tuple(record.values()))
+    with self._db:
+      for columns, rows in groups.items():
+        self._db.executemany(
+          'INSERT OR REPLACE INTO results ({}) VALUES ({})'.format(
+            ', '.join(_quote(column) for column in columns),
+            ', '.join(['?'] * len(columns))), rows)
+    self._pending.clear()
+
+  def query(self, where=None, parameters=(), columns=None, order=None,
+            limit=None):
+    """
+    Returns the rows matching an SQL condition as sqlite3.Row objects
+
+    Args:
+      where (str) : SQL condition, e.g., "topology = 'Hyperx' AND
+                    relative_cost_usd_per_node < ? AND max_required_m < ?"
+      parameters (tuple) : values of the '?' in the condition
+      columns (list) : columns to return (default is all)
+      order (str) : SQL ORDER BY clause
+      limit (int) : most rows to return
+    """
+    self.flush()
+    sql = 'SELECT {} FROM results'.format(
+      '*' if not columns else ', '.join(_quote(column) for column in columns))
+    if where:
+      sql += ' WHERE ' + where
+    if order:
+      sql += ' ORDER BY ' + order
+    if limit is not None:
+      sql += ' LIMIT {}'.format(int(limit))
+    return self._db.execute(sql, parameters).fetchall()
+
+  def columns(self):
+    """
+    Returns the names of all columns
+    """
+    return [row['name'] for row in
+            self._db.execute('PRAGMA table_info(results)')]
+
+  @staticmethod
+  def histogram(blob, integer=False):
+    """
+    Returns the list of values stored in a histogram or tray column
+    """
+    values = array('q' if integer else 'd')
+    values.frombytes(blob)
+    return values.tolist()
+
+  def close(self):
+    """
+    This inserts the pending rows and closes the database
+    """
+    self.flush()
+    self._db.close()
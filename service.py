@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import pipeline
+
+class Service(object):
+  """
+  This answers JSON evaluation requests. Models are evaluated in a pool of warm
+  worker processes, identical requests in flight share one evaluation, and
+  results are kept in a least recently used cache. Options naming files are
+  only accepted under a configured directory and each connection has a limited
+  number of requests evaluated at once.
+  """
+
+  # options that name files, kind->keys
+  path_options = {'topts': ['placement']}
+
+  def __init__(self, workers, cache_size, file_dir=None, connection_limit=1):
+    """
+    Constructs a Service object
+
+    Args:
+      workers (int) : number of worker processes
+      cache_size (int) : number of results kept in the cache
+      file_dir (str) : directory of the files requests may name, without it
+                       options naming files are rejected
+      connection_limit (int) : most requests of a connection answered at once
+    """
+    assert connection_limit > 0, 'the connection limit must be positive'
+    self._workers = workers
+    self._cache_size = cache_size
+    self._file_dir = None if file_dir is None else os.path.realpath(file_dir)
+    self._connection_limit = connection_limit
+    self._cache = collections.OrderedDict()  # config hash->result
+    self._inflight = {}  # config hash->future
+    self._executor = None
+    self.stats = collections.Counter()
+
+  def _pool(self):
+    return concurrent.futures.ProcessPoolExecutor(
+      self._workers, mp_context=multiprocessing.get_context('spawn'),
+      initializer=pipeline.warm)
+
+  def start(self):
+    """
+    This starts the worker processes and waits for them to be warm
+    """
+    self._executor = self._pool()
+    futures = [self._executor.submit(time.sleep, 0)
+               for _ in range(self._workers)]
+    concurrent.futures.wait(futures)
+
+  def stop(self):
+    self._executor.shutdown(cancel_futures=True)
+
+  def _resolve_paths(self, request):
+    """
+    This resolves the options of a request that name files under the file
+    directory, a ValueError is raised for files outside of it
+    """
+    for kind, keys in self.path_options.items():
+      options = request.get(kind)
+      if not isinstance(options, dict):
+        continue
+      for key in keys:
+        if key not in options:
+          continue
+        if self._file_dir is None:
+          raise ValueError('option "{}" names a file, which this service '
+                           'doesn\'t allow'.format(key))
+        path = os.path.realpath(os.path.join(self._file_dir,
+                                             str(options[key])))
+        if os.path.commonpath([self._file_dir, path]) != self._file_dir:
+          raise ValueError('option "{}" must name a file in the file '
+                           'directory'.format(key))
+        options[key] = path
+
+  async def evaluate(self, request):
+    """
+    Returns the response to an evaluation request
+    """
+    self.stats['requests'] += 1
+    try:
+      self._resolve_paths(request)
+      args = pipeline.normalize(request)
+    except (AttributeError, TypeError, ValueError) as ex:
+      self.stats['errors'] += 1
+      return {'status': 'error', 'error': str(ex)}
+    key = pipeline.Pipeline.hash_config(pipeline.Pipeline.make_config(*args))
+
+    # answer from the cache
+    result = self._cache.get(key)
+    if result is not None:
+      self._cache.move_to_end(key)
+      self.stats['hits'] += 1
+      return {'status': 'ok', 'source': 'cache', 'config_hash': key,
+              'result': result}
+
+    # share an evaluation in flight or start one
+    future = self._inflight.get(key)
+    if future is not None:
+      self.stats['shared'] += 1
+      source = 'shared'
+    else:
+      self.stats['misses'] += 1
+      source = 'computed'
+      executor = self._executor
+      future = asyncio.get_running_loop().run_in_executor(
+        executor, pipeline.evaluate, args)
+      self._inflight[key] = future
+      future.add_done_callback(lambda _: self._inflight.pop(key, None))
+    try:
+      result = await asyncio.shield(future)
+    except concurrent.futures.process.BrokenProcessPool:
+      # a worker died, e.g., out of memory, so the pool is replaced once
+      self.stats['errors'] += 1
+      if source == 'computed' and executor is self._executor:
+        executor.shutdown(wait=False)
+        self._executor = self._pool()
+      return {'status': 'error', 'error': 'a worker process died'}
+    except Exception as ex:
+      self.stats['errors'] += 1
+      return {'status': 'error', 'error': '{}: {}'.format(
+        type(ex).__name__, ex)}
+
+    # add to the cache
+    if source == 'computed':
+      self._cache[key] = result
+      while len(self._cache) > self._cache_size:
+        self._cache.popitem(last=False)
+    return {'status': 'ok', 'source': source, 'config_hash': key,
+            'result': result}
+
+  async def respond(self, line):
+    """
+    Returns the response line to a request line
+    """
+    start = time.perf_counter()
+    try:
+      request = json.loads(line)
+      if not isinstance(request, dict):
+        raise ValueError('requests must be objects')
+    except ValueError as ex:
+      self.stats['errors'] += 1
+      return json.dumps({'status': 'error', 'error': str(ex)}) + '\n'
+    op = request.get('op', 'evaluate')
+    if op == 'evaluate':
+      response = await self.evaluate(request)
+    elif op == 'stats':
+      response = {'status': 'ok', 'result': dict(
+        self.stats, cached=len(self._cache), inflight=len(self._inflight))}
+    elif op == 'ping':
+      response = {'status': 'ok'}
+    else:
+      response = {'status': 'error', 'error': 'unknown op: {}'.format(op)}
+    if 'id' in request:
+      response['id'] = request['id']
+    response['seconds'] = time.perf_counter() - start
+    return json.dumps(response) + '\n'
+
+  async def handle(self, reader, writer):
+    """
+    This serves one connection, requests are answered concurrently up to the
+    connection limit and each response carries the 'id' of its request
+    """
+    lock = asyncio.Lock()
+    limit = asyncio.Semaphore(self._connection_limit)
+    tasks = set()
+
+    async def answer(line):
+      try:
+        response = await self.respond(line)
+        async with lock:
+          writer.write(response.encode('utf-8'))
+          await writer.drain()
+      finally:
+        limit.release()
+
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+        if line.strip():
+          # further lines aren't read while the connection is at its limit
+          await limit.acquire()
+          task = asyncio.create_task(answer(line))
+          tasks.add(task)
+          task.add_done_callback(tasks.discard)
+      if tasks:
+        await asyncio.gather(*tasks)
+    except (ConnectionError, ValueError):
+      pass  # the client went away or sent a line beyond the limit
+    finally:
+      for task in tasks:
+        task.cancel()
+      writer.close()
+
+# longest request line in bytes
+LINE_LIMIT = 1 << 20
+
+async def serve(args):
+  connection_limit = args.connection_limit
+  if connection_limit is None:
+    connection_limit = max(1, args.workers // 2)
+  service = Service(args.workers, args.cache_size, args.file_dir,
+                    connection_limit)
+  service.start()
+  try:
+    if args.unix is not None:
+      server = await asyncio.start_unix_server(service.handle, args.unix,
+                                               limit=LINE_LIMIT)
+      address = args.unix
+    else:
+      server = await asyncio.start_server(service.handle, args.host, args.port,
+                                          limit=LINE_LIMIT)
+      address = '{}:{}'.format(*server.sockets[0].getsockname()[:2])
+    print('serving on {} with {} workers'.format(address, args.workers),
+          file=sys.stderr, flush=True)
+
+    # run until interrupted or terminated
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in [signal.SIGINT, signal.SIGTERM]:
+      loop.add_signal_handler(signum, stop.set)
+    async with server:
+      await stop.wait()
+  finally:
+    service.stop()
+    if args.unix is not None and os.path.exists(args.unix):
+      os.remove(args.unix)
+
+async def request(args):
+  if args.unix is not None:
+    reader, writer = await asyncio.open_unix_connection(args.unix,
+                                                        limit=LINE_LIMIT)
+  else:
+    reader, writer = await asyncio.open_connection(args.host, args.port,
+                                                   limit=LINE_LIMIT)
+
+  # send all requests then print the responses as they arrive
+  lines = [line for line in sys.stdin if line.strip()]
+  for line in lines:
+    writer.write(line.rstrip('\n').encode('utf-8') + b'\n')
+  await writer.drain()
+  for _ in lines:
+    print((await reader.readline()).decode('utf-8'), end='', flush=True)
+  writer.close()
+  await writer.wait_closed()
+
+def main(args):
+  if args.command == 'serve':
+    asyncio.run(serve(args))
+  else:
+    asyncio.run(request(args))
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description='fabcalc evaluation service')
+  sub = ap.add_subparsers(dest='command', required=True)
+  serve_ap = sub.add_parser('serve', help='run the service')
+  serve_ap.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of worker processes')
+  serve_ap.add_argument('--cache_size', type=int, default=4096,
+                        help='number of results kept in the cache')
+  serve_ap.add_argument('--file_dir', type=str,
+                        help=('directory of the files requests may name, e.g., '
+                              'placements, requests naming files are rejected '
+                              'without it'))
+  serve_ap.add_argument('--connection_limit', type=int,
+                        help=('most requests of one connection evaluated at '
+                              'once (default is half the workers)'))
+  request_ap = sub.add_parser(
+    'request', help='send JSON requests from stdin and print the responses')
+  for sub_ap in [serve_ap, request_ap]:
+    sub_ap.add_argument('--host', type=str, default='127.0.0.1',
+                        help='TCP host')
+    sub_ap.add_argument('--port', type=int, default=8237,
+                        help='TCP port, 0 picks a free port')
+    sub_ap.add_argument('--unix', type=str,
+                        help='Unix socket path used instead of TCP')
+  args = ap.parse_args()
+  if args.command == 'serve' and args.workers < 1:
+    ap.error('--workers must be at least 1')
+  if args.command == 'serve' and args.connection_limit is not None and \
+     args.connection_limit < 1:
+    ap.error('--connection_limit must be at least 1')
+  main(args)
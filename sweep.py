@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+import pipeline
+import results
+
+def expand(spec):
+  """
+  This is a generator that generates the evaluation requests of a sweep
+  specification. A specification is a pipeline.normalize() request where the
+  'topology', the 'layout', and any option may be a list of values to sweep
+  over. The 'fabric' models are all evaluated in each request.
+  """
+  def product(options):
+    options = options or {}
+    keys = list(options)
+    values = [value if isinstance(value, list) else [value]
+              for value in options.values()]
+    for combination in itertools.product(*values):
+      yield dict(zip(keys, combination))
+
+  def listed(value):
+    return value if isinstance(value, list) else [value]
+
+  fopts = spec.get('fopts', {})
+  if isinstance(fopts, list):
+    fopts_choices = [list(choice) for choice in itertools.product(
+      *[list(product(opts)) for opts in fopts])]
+  else:
+    fopts_choices = list(product(fopts))
+  for topology in listed(spec['topology']):
+    for layout in listed(spec.get('layout', 'Standard')):
+      for topts in product(spec.get('topts')):
+        for lopts in product(spec.get('lopts')):
+          for fopts in fopts_choices:
+            yield {'topology': topology, 'topts': topts,
+                   'fabric': spec['fabric'], 'fopts': fopts,
+                   'layout': layout, 'lopts': lopts}
+
+def load(filename):
+  """
+  This reads the specifications of a sweep
+
+  Returns:
+    dict of the configuration hash to the request of each point
+  """
+  with open(filename, 'r') as fd:
+    specs = json.load(fd)
+  if isinstance(specs, dict):
+    specs = [specs]
+  points = {}  # key->request
+  for spec in specs:
+    for request in expand(spec):
+      key = pipeline.Pipeline.hash_config(
+        pipeline.Pipeline.make_config(*pipeline.normalize(request)))
+      points.setdefault(key, request)
+  return points
+
+def pending(points, journal, retry_failed):
+  """
+  This returns the keys of the points that still need to run, evaluations that
+  were in flight are first as they may have checkpoints
+  """
+  keys = [key for key in journal.started if key in points]
+  keys += [key for key in points if key not in journal.started and
+           key not in journal.finished and
+           (retry_failed or key not in journal.failed)]
+  return keys
+
+class Recorder(object):
+  """
+  This records the finished points of a sweep in its journal and optionally in
+  a result store. The rows of the points are added in batches and the points
+  are journaled as finished once their rows are committed, so a resumed sweep
+  never skips a point that isn't in the store.
+  """
+
+  def __init__(self, journal, store=None):
+    self._journal = journal
+    self._store = store
+    self._stored = []  # (key, result) waiting for their rows to commit
+
+  def finish(self, key, result):
+    """
+    This records the result of evaluate(), its 'records' are removed
+    """
+    records = result.pop('records', [])
+    if self._store is None:
+      self._journal.finish(key, result)
+      return
+    for record in records:
+      self._store.add(record)
+    self._stored.append((key, result))
+    if len(self._stored) >= self._store.batch:
+      self.flush()
+
+  def fail(self, key, error):
+    self._journal.fail(key, error)
+
+  def flush(self):
+    """
+    This commits the pending rows and journals their points
+    """
+    if self._store is not None:
+      self._store.flush()
+    for key, result in self._stored:
+      self._journal.finish(key, result)
+    self._stored = []
+
+def main(args):
+  # read the specifications and find the points of the sweep
+  points = load(args.spec)
+
+  store = None if args.store is None else results.ResultStore(args.store)
+  try:
+    with results.Journal(args.journal) as journal:
+      recorder = Recorder(journal, store)
+      pending_keys = pending(points, journal, args.retry_failed)
+      if args.verbose:
+        print('{} points: {} finished, {} failed, {} to run'.format(
+          len(points), len([key for key in points if key in journal.finished]),
+          len([key for key in points if key in journal.failed]),
+          len(pending_keys)),
+          file=sys.stderr)
+      if args.checkpoint_dir is not None:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+
+      # run the evaluations
+      context = multiprocessing.get_context('spawn')
+      with concurrent.futures.ProcessPoolExecutor(
+          args.workers, mp_context=context,
+          initializer=pipeline.warm) as executor:
+        # points are submitted as workers become free, so a point is journaled
+        # as started when it is handed to a worker
+        futures = {}  # future->key
+        queued = iter(pending_keys)
+        def submit(count):
+          for key in itertools.islice(queued, count):
+            checkpoint = None
+            if args.checkpoint_dir is not None:
+              checkpoint = os.path.join(args.checkpoint_dir, key + '.ckpt')
+            journal.start(key, points[key])
+            future = executor.submit(
+              pipeline.evaluate, pipeline.normalize(points[key]), checkpoint,
+              args.shard_size, store is not None)
+            futures[future] = key
+        submit(args.workers)
+        try:
+          while futures:
+            done, _ = concurrent.futures.wait(
+              futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+              key = futures.pop(future)
+              try:
+                result = future.result()
+              except Exception as ex:
+                recorder.fail(key, '{}: {}'.format(type(ex).__name__, ex))
+                status = 'failed'
+              else:
+                recorder.finish(key, result)
+                status = 'finished'
+              if args.verbose:
+                print('{} {}'.format(key[:12], status), file=sys.stderr)
+            submit(len(done))
+        finally:
+          recorder.flush()
+
+      if args.verbose:
+        print('{} finished, {} failed'.format(
+          len([key for key in points if key in journal.finished]),
+          len([key for key in points if key in journal.failed])),
+          file=sys.stderr)
+  finally:
+    if store is not None:
+      store.close()
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(
+    description='runs a resumable sweep of fabcalc evaluations')
+  ap.add_argument('spec', type=str,
+                  help='JSON sweep specification, or a list of them')
+  ap.add_argument('journal', type=str,
+                  help=('append-only journal of the sweep, rerunning with it '
+                        'skips the finished points'))
+  ap.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                  help='number of worker processes')
+  ap.add_argument('--store', type=str,
+                  help='SQLite result store the results are also added to')
+  ap.add_argument('--checkpoint_dir', type=str,
+                  help='directory of per evaluation shard checkpoints')
+  ap.add_argument('--shard_size', type=int, default=1 << 20,
+                  help='number of cable tuples per checkpoint shard')
+  ap.add_argument('--retry_failed', action='store_true',
+                  help='run the points that failed before again')
+  ap.add_argument('-v', '--verbose', action='store_true',
+                  help='print progress to stderr')
+  args = ap.parse_args()
+  main(args)
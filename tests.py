@@ -19,7 +19,8 @@ def test(topology, fabric, layout):
           '--router_csv {0}/routers.csv '
           '--cable_csv {0}/cables.csv '
           '--tray_csv {0}/trays.csv '
-          '--topo_info {0}/topo.txt ')
+          '--topo_info {0}/topo.txt '
+          '--columnar {0}/columns ')
          .format(outdir, topology[1], fabric[1], layout[1],
                  topology[2], fabric[2], layout[2]))
   print(name)
@@ -48,6 +49,7 @@ def main():
   # fabrics
   kim_dally = ('kim-dally', 'KimDally', '')
   edr = ('edr', 'EDR', '')
+  kim_dally_edr = ('kim-dally_edr', 'KimDally,EDR', '')
 
   # layouts
   standard = ('standard', 'Standard', '')
@@ -70,5 +72,7 @@ def main():
   test(dfly_1k, edr, standard)
   test(ftree_1k, edr, standard)
 
+  test(hx2d_1k, kim_dally_edr, standard)
+
 if __name__ == '__main__':
   main()
@@ -29,6 +29,10 @@
  * POSSIBILITY OF SUCH DAMAGE.
 """
 
+import csv
+
+import utils
+
 class Topology(object):
   """
   This is an abstract class that represents a fabric technology
@@ -40,13 +44,67 @@ class Topology(object):
     """
     Tells the base class which option keys it uses
     """
-    return []
+    return ['placement']
 
   def __init__(self, **kwargs):
     """
     Constructs a Topology object
     """
-    pass
+    # optional router placement, router -> (chassis, rack)
+    self._placement = None
+    if 'placement' in kwargs:
+      self._placement = self.read_placement(kwargs['placement'])
+
+  @staticmethod
+  def read_placement(filename):
+    """
+    This reads a router placement CSV file of router, chassis, and rack columns
+
+    Returns:
+      list : (chassis, rack) of each router
+    """
+    locations = {}
+    with open(filename, 'r', newline='') as fd:
+      for row in csv.reader(fd):
+        if not row or not row[0].strip().isdigit():
+          continue  # header or blank line
+        router, chassis, rack = map(int, row)
+        assert router not in locations, 'duplicate router: {}'.format(router)
+        locations[router] = (chassis, rack)
+    assert sorted(locations) == list(range(len(locations))), \
+      'placement must give every router a location'
+    return [locations[router] for router in range(len(locations))]
+
+  @staticmethod
+  def write_placement(filename, placement):
+    """
+    This writes a router placement CSV file
+
+    Args:
+      filename (str) : the file to be written
+      placement (list) : (chassis, rack) of each router
+    """
+    with open(filename, 'w', newline='') as fd:
+      writer = csv.writer(fd)
+      writer.writerow(['Router', 'Chassis', 'Rack'])
+      for router, (chassis, rack) in enumerate(placement):
+        writer.writerow([router, chassis, rack])
+
+  def _check_placement(self, routers, chassis, racks):
+    """
+    This verifies the router placement fits the structure of the system
+    """
+    if self._placement is None:
+      return
+    assert len(self._placement) == routers, \
+      'placement has {} routers, expected {}'.format(len(self._placement),
+                                                    routers)
+    assert len(set(self._placement)) == routers, \
+      'placement puts multiple routers in one chassis'
+    for chassis_index, rack in self._placement:
+      assert 0 <= chassis_index < chassis and 0 <= rack < racks, \
+        'placement location ({}-{}) is outside of the system'.format(
+          chassis_index, rack)
 
   def structure(self):
     """
@@ -67,11 +125,52 @@ class Topology(object):
     """
     raise NotImplementedError('subclasses must override this')
 
-  def cables(self):
+  def locations(self):
+    """
+    This is a generator that generates (router, chassis, rack) tuples giving the
+    location of every router. This is only supported by topologies that support
+    the 'placement' option.
+    """
+    raise NotImplementedError('this topology doesn\'t support placement')
+
+  def cables(self, start=0):
     """
     This is a generator that generates (source, destination, count) tuples
     'source' and 'destination' are of type layout.Coordinate
     'count' is of type int
+    'start' is the index of the first tuple generated, the preceding tuples are
+    seeked over without being generated
+    """
+    raise NotImplementedError('subclasses must override this')
+
+  @staticmethod
+  def _pairs(width):
+    """
+    Returns the (source, destination) index pairs of a fully connected
+    dimension in the order the cables of the dimension are generated
+    """
+    return [(src, src + dist) for dist in range(1, width)
+            for src in range(width - dist)]
+
+  @staticmethod
+  def _seek(start, blocks, block_size):
+    """
+    This seeks a start index over a section of 'blocks' equally sized blocks of
+    tuples for cables(start)
+
+    Returns:
+      tuple (int, int, int) : first block, first tuple in the first block,
+                              start index in the following sections
+    """
+    if start < blocks * block_size:
+      first, offset = divmod(start, block_size)
+      return first, offset, 0
+    return blocks, 0, start - blocks * block_size
+
+  def expected_cables(self):
+    """
+    This returns the exact number of cables that cables() generates, i.e., the
+    sum of the 'count' of all generated tuples
     """
     raise NotImplementedError('subclasses must override this')
 
@@ -85,6 +184,43 @@ class Topology(object):
     """
     pass  # this is only used when desired by the topology module
 
+  def merge(self, other):
+    """
+    This adds the cable length statistics of another topology of the same
+    configuration, e.g., one that was given a different shard of the cables
+    """
+    raise NotImplementedError('this topology can\'t be merged')
+
+  def length_stats(self):
+    """
+    This returns the cable length statistics of each class of cables, the first
+    class is all cables
+
+    Returns:
+      list : (class, count, minimum, maximum, total length) tuples
+    """
+    raise NotImplementedError('subclasses must override this')
+
+  def columnar(self, directory):
+    """
+    This writes the cable length statistics as memory-mappable .npy columns
+    """
+    import numpy  # only needed for columnar output
+    stats = self.length_stats()
+    counts = numpy.array([count for _, count, _, _, _ in stats],
+                         dtype=numpy.int64)
+    used = counts > 0
+    utils.write_columns(directory, {
+      'topology_class': numpy.array([name for name, _, _, _, _ in stats],
+                                    dtype=numpy.str_),
+      'topology_count': counts,
+      'topology_min': numpy.where(used, numpy.array(
+        [lmin for _, _, lmin, _, _ in stats], dtype=numpy.float64), numpy.nan),
+      'topology_max': numpy.where(used, numpy.array(
+        [lmax for _, _, _, lmax, _ in stats], dtype=numpy.float64), numpy.nan),
+      'topology_sum': numpy.array([lsum for _, _, _, _, lsum in stats],
+                                  dtype=numpy.float64)})
+
   def info_file(self, filename):
     """
     This writes topology specific information to a file
@@ -107,6 +107,7 @@ class Dragonfly(topology.Topology):
     # determine total number of racks
     self._racks = math.ceil((self._global_width * self._local_width) /
                             self._chassis)
+    self._check_placement(self._routers, self._chassis, self._racks)
 
     # lengths
     self._len_fsm = -1
@@ -125,12 +126,37 @@ class Dragonfly(topology.Topology):
     radix = self._concentration + self._local_ports + self._global_ports
     yield radix, self._routers
 
+  def expected_cables(self):
+    local_cables = (self._global_width * self._local_weight *
+                    self._local_width * (self._local_width - 1) // 2)
+    global_cables = (self._global_weight *
+                     self._global_width * (self._global_width - 1) // 2)
+    return local_cables + global_cables
+
+  def locations(self):
+    for gbl in range(self._global_width):
+      for lcl in range(self._local_width):
+        chassis, rack = self._location(lcl, gbl)
+        yield self._router(lcl, gbl), chassis, rack
+
+  def _router(self, lcl, gbl):
+    return gbl * self._local_width + lcl
+
   def _location(self, lcl, gbl):
+    if self._placement is not None:
+      return self._placement[self._router(lcl, gbl)]
     chassis = lcl % self._chassis
     rack = gbl * self._racks_per_group + lcl // self._chassis
     return chassis, rack
 
+  # names of the _len_fsm states
+  _link_classes = ['all', 'local', 'global']
+
   def notify_length(self, length, count):
+    if utils.stats.enabled:
+      utils.stats.increment('topology.Dragonfly.cables.{}'.format(
+        self._link_classes[self._len_fsm]), count)
+
     # specific dimension
     if length > self._cable_lens[self._len_fsm][0]:
       self._cable_lens[self._len_fsm][0] = length
@@ -147,36 +173,49 @@ class Dragonfly(topology.Topology):
     self._cable_lens[0][2] += (length * count)
     self._cable_lens[0][3] += count
 
-  def cables(self):
+  def cables(self, start=0):
     # connect group
     self._len_fsm = 1
-    for group in range(self._global_width):
-      for lcl_dist in range(1, self._local_width):
-        for lcl_src in range(0, self._local_width - lcl_dist):
-          lcl_dst = lcl_src + lcl_dist
-          src_chassis, src_rack = self._location(lcl_src, group)
-          dst_chassis, dst_rack = self._location(lcl_dst, group)
-          source = layout.Coordinate(src_chassis, src_rack)
-          destination = layout.Coordinate(dst_chassis, dst_rack)
-          yield source, destination, self._local_weight
+    pairs = self._pairs(self._local_width)
+    first, offset, start = self._seek(start, self._global_width, len(pairs))
+    for group in range(first, self._global_width):
+      for lcl_src, lcl_dst in pairs[offset:]:
+        src_chassis, src_rack = self._location(lcl_src, group)
+        dst_chassis, dst_rack = self._location(lcl_dst, group)
+        source = layout.Coordinate(src_chassis, src_rack)
+        destination = layout.Coordinate(dst_chassis, dst_rack)
+        yield source, destination, self._local_weight
+      offset = 0
 
     # connect groups
     self._len_fsm = 2
-    for gbl_dist in range(1, self._global_width):
-      for src_grp in range(0, self._global_width - gbl_dist):
-        dst_grp = src_grp + gbl_dist
-        for weight in range(self._global_weight):
-          src_grp_port = ((dst_grp - 1) + ((self._global_width - 1) * weight))
-          assert src_grp_port < self._group_ports
-          src_lcl = src_grp_port // self._global_ports
-          dst_grp_port = (src_grp + ((self._global_width - 1) * weight))
-          assert dst_grp_port < self._group_ports
-          dst_lcl = dst_grp_port // self._global_ports
-          src_chassis, src_rack = self._location(src_lcl, src_grp)
-          dst_chassis, dst_rack = self._location(dst_lcl, dst_grp)
-          source = layout.Coordinate(src_chassis, src_rack)
-          destination = layout.Coordinate(dst_chassis, dst_rack)
-          yield source, destination, 1
+    pairs = self._pairs(self._global_width)
+    first, offset, start = self._seek(start, len(pairs), self._global_weight)
+    for src_grp, dst_grp in pairs[first:]:
+      for weight in range(offset, self._global_weight):
+        src_grp_port = ((dst_grp - 1) + ((self._global_width - 1) * weight))
+        assert src_grp_port < self._group_ports
+        src_lcl = src_grp_port // self._global_ports
+        dst_grp_port = (src_grp + ((self._global_width - 1) * weight))
+        assert dst_grp_port < self._group_ports
+        dst_lcl = dst_grp_port // self._global_ports
+        src_chassis, src_rack = self._location(src_lcl, src_grp)
+        dst_chassis, dst_rack = self._location(dst_lcl, dst_grp)
+        source = layout.Coordinate(src_chassis, src_rack)
+        destination = layout.Coordinate(dst_chassis, dst_rack)
+        yield source, destination, 1
+      offset = 0
+
+  def merge(self, other):
+    for ours, theirs in zip(self._cable_lens, other._cable_lens):
+      ours[0] = max(ours[0], theirs[0])
+      ours[1] = min(ours[1], theirs[1])
+      ours[2] += theirs[2]
+      ours[3] += theirs[3]
+
+  def length_stats(self):
+    return [(name, lens[3], lens[1], lens[0], lens[2])
+            for name, lens in zip(self._link_classes, self._cable_lens)]
 
   def info_file(self, filename):
     with open(filename, 'w') as fd:
@@ -54,6 +54,9 @@ class FatTree(topology.Topology):
     self._director_radix = None
     self._director_rack_inset = None
 
+    # optional
+    self._director_racks = None
+
     # parse kwargs
     for key in kwargs:
       if key == 'leaves':
@@ -70,6 +73,8 @@ class FatTree(topology.Topology):
         self._director_radix = int(kwargs[key])
       elif key == 'director_rack_inset':
         self._director_rack_inset = int(kwargs[key])
+      elif key == 'director_racks':
+        self._director_racks = utils.str_to_int_list(kwargs[key])
       elif key in super(FatTree, self).using_options():
         pass
       else:
@@ -82,10 +87,12 @@ class FatTree(topology.Topology):
             self._leaves_per_rack != None and
             self._directors_per_rack != None and
             self._director_radix != None and
-            self._director_rack_inset != None), \
+            (self._director_rack_inset != None or
+             self._director_racks != None)), \
             ('leaves, down_ports, up_ports, leaves_per_rack, '
              'directors_per_rack, director_radix, and director_rack_inset '
-             'must all be specified')
+             '(or director_racks) must all be specified')
+    assert self._placement is None, 'FatTree doesn\'t support placement'
 
     # compute number of routers and nodes
     total_up_links = self._leaves * self._up_ports
@@ -97,28 +104,34 @@ class FatTree(topology.Topology):
     leaf_racks = math.ceil(self._leaves / self._leaves_per_rack)
     director_racks = math.ceil(self._directors / self._directors_per_rack)
     self._total_racks = leaf_racks + director_racks
-    leaf_racks_per_set = self._director_rack_inset * 2
-    rack_sets = leaf_racks // leaf_racks_per_set
-    director_racks_per_set = math.ceil(director_racks / rack_sets)
-    self._director_locations = []
-    rack_index = self._director_rack_inset
-    director_rack_count = 0
-    done = False
-    while not done:
-      # add director locations in current rack
-      for d in range(self._directors_per_rack):
-        if len(self._director_locations) == director_racks:
-          done = True
-          break
-        else:
-          self._director_locations.append(rack_index)
-      # advance to next director rack
-      director_rack_count += 1
-      rack_index += 1
-      if director_rack_count == director_racks_per_set:
-        director_rack_count = 0
-        rack_index += leaf_racks_per_set
-    assert len(self._director_locations) == director_racks
+    if self._director_racks is None:
+      leaf_racks_per_set = self._director_rack_inset * 2
+      rack_sets = leaf_racks // leaf_racks_per_set
+      director_racks_per_set = math.ceil(director_racks / rack_sets)
+      self._director_racks = []
+      rack_index = self._director_rack_inset
+      director_rack_count = 0
+      while len(self._director_racks) < director_racks:
+        # add the current director rack
+        self._director_racks.append(rack_index)
+        # advance to next director rack
+        director_rack_count += 1
+        rack_index += 1
+        if director_rack_count == director_racks_per_set:
+          director_rack_count = 0
+          rack_index += leaf_racks_per_set
+    assert len(self._director_racks) == director_racks, \
+      'director_racks must list {} racks'.format(director_racks)
+    assert len(set(self._director_racks)) == director_racks, \
+      'director_racks must be unique'
+    for rack in self._director_racks:
+      assert 0 <= rack < self._total_racks, \
+        'director rack {} is outside of the system'.format(rack)
+
+    # the rack of each director
+    self._director_locations = [
+      self._director_racks[director // self._directors_per_rack]
+      for director in range(self._directors)]
 
     # max, min, lencnt, cblcnt
     self._cable_lens = [0, 99999999, 0, 0]
@@ -126,12 +139,23 @@ class FatTree(topology.Topology):
   def structure(self):
     return self._nodes, self._leaves_per_rack, self._total_racks
 
+  def director_racks(self):
+    """
+    Returns the rack of each group of 'directors_per_rack' directors
+    """
+    return list(self._director_racks)
+
   def routers(self):
     radix = self._down_ports + self._up_ports
     yield radix, self._leaves
     yield self._director_radix, self._directors
 
+  def expected_cables(self):
+    return self._leaves * self._up_ports
+
   def notify_length(self, length, count):
+    if utils.stats.enabled:
+      utils.stats.increment('topology.FatTree.cables.leaf-director', count)
     if length > self._cable_lens[0]:
       self._cable_lens[0] = length
     if length < self._cable_lens[1]:
@@ -139,20 +163,22 @@ class FatTree(topology.Topology):
     self._cable_lens[2] += (length * count)
     self._cable_lens[3] += count
 
-  def cables(self):
+  def cables(self, start=0):
     # connect leaves to directors
-    for leaf in range(self._leaves):
+    director_racks = sorted(self._director_racks)
+    first, offset, start = self._seek(start, self._leaves, self._up_ports)
+    for leaf in range(first, self._leaves):
       # determine the leaf's chassis within a rack
       leaf_chassis = leaf % self._leaves_per_rack
       # determine the leaf's rack
       leaf_rack = leaf // self._leaves_per_rack
-      for director_location in self._director_locations:
-        if leaf_rack >= director_location:
+      for director_rack in director_racks:
+        if leaf_rack >= director_rack:
           leaf_rack += 1
       # verify leaf rack isn't a director rack
-      assert leaf_rack not in self._director_locations
+      assert leaf_rack not in self._director_racks
       # connect this leaf to all directors for all uplinks
-      for uplink in range(self._up_ports):
+      for uplink in range(offset, self._up_ports):
         # get the directors rack
         director_index = uplink % self._directors
         director_rack = self._director_locations[director_index]
@@ -163,6 +189,7 @@ class FatTree(topology.Topology):
         source = layout.Coordinate(leaf_chassis, leaf_rack)
         destination = layout.Coordinate(director_chassis, director_rack)
         yield source, destination, 1
+      offset = 0
 
     # connect director ASICs to each other
     """
@@ -173,6 +200,16 @@ class FatTree(topology.Topology):
       destination_chassis = director_chassis + 1 if director_chassis == 0 else director_chassis
     """
 
+  def merge(self, other):
+    self._cable_lens[0] = max(self._cable_lens[0], other._cable_lens[0])
+    self._cable_lens[1] = min(self._cable_lens[1], other._cable_lens[1])
+    self._cable_lens[2] += other._cable_lens[2]
+    self._cable_lens[3] += other._cable_lens[3]
+
+  def length_stats(self):
+    return [('all', self._cable_lens[3], self._cable_lens[1],
+             self._cable_lens[0], self._cable_lens[2])]
+
   def info_file(self, filename):
     with open(filename, 'w') as fd:
       print('all: ave={:.02f} min={:.02f} max={:.02f}'.format(
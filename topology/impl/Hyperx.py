@@ -30,6 +30,7 @@
 """
 
 import functools
+import itertools
 import math
 import operator
 
@@ -67,7 +68,7 @@ class Hyperx(topology.Topology):
       elif key == 'chassis':
         assert self._chassis == None, 'duplicate chassis'
         self._chassis = int(kwargs[key])
-      elif key in super(HyperxD1Rack, self).using_options():
+      elif key in super(Hyperx, self).using_options():
         pass
       else:
         assert False, 'unknown option key: {}'.format(key)
@@ -106,6 +107,7 @@ class Hyperx(topology.Topology):
       self._widths.append(1)
       self._weights.append(0)
     assert len(self._widths) == 3
+    self._check_placement(self._routers, self._chassis, self._racks)
 
     # lengths
     self._len_fsm = -1
@@ -126,13 +128,38 @@ class Hyperx(topology.Topology):
       radix += ((width - 1) * weight)
     yield radix, self._routers
 
+  def expected_cables(self):
+    cables = 0
+    for width, weight in zip(self._widths, self._weights):
+      cables += self._routers * (width - 1) * weight // 2
+    return cables
+
+  def locations(self):
+    for d3 in range(self._widths[2]):
+      for d2 in range(self._widths[1]):
+        for d1 in range(self._widths[0]):
+          chassis, rack = self._location(d1, d2, d3)
+          yield self._router(d1, d2, d3), chassis, rack
+
+  def _router(self, d1, d2, d3):
+    return (d3 * self._widths[1] + d2) * self._widths[0] + d1
+
   def _location(self, d1, d2, d3):
+    if self._placement is not None:
+      return self._placement[self._router(d1, d2, d3)]
     chassis = d1 % self._chassis
     rack = (((self._widths[1] * d3 + d2) * self._racks_per_d1) +
             (d1 // self._chassis))
     return chassis, rack
 
+  # names of the _len_fsm states
+  _link_classes = ['all', 'dim1', 'dim2', 'dim3']
+
   def notify_length(self, length, count):
+    if utils.stats.enabled:
+      utils.stats.increment('topology.Hyperx.cables.{}'.format(
+        self._link_classes[self._len_fsm]), count)
+
     # specific dimension
     if length > self._cable_lens[self._len_fsm][0]:
       self._cable_lens[self._len_fsm][0] = length
@@ -149,47 +176,64 @@ class Hyperx(topology.Topology):
     self._cable_lens[0][2] += (length * count)
     self._cable_lens[0][3] += count
 
-  def cables(self):
+  def cables(self, start=0):
     # connect dimension 1
     self._len_fsm = 1
-    for d3 in range(self._widths[2]):
-      for d2 in range(self._widths[1]):
-        for d1_dist in range(1, self._widths[0]):
-          for d1_src in range(0, self._widths[0] - d1_dist):
-            d1_dst = d1_src + d1_dist
-            src_chassis, src_rack = self._location(d1_src, d2, d3)
-            dst_chassis, dst_rack = self._location(d1_dst, d2, d3)
-            source = layout.Coordinate(src_chassis, src_rack)
-            destination = layout.Coordinate(dst_chassis, dst_rack)
-            yield source, destination, self._weights[0]
+    pairs = self._pairs(self._widths[0])
+    first, offset, start = self._seek(
+      start, self._widths[2] * self._widths[1], len(pairs))
+    for d3, d2 in itertools.islice(itertools.product(
+        range(self._widths[2]), range(self._widths[1])), first, None):
+      for d1_src, d1_dst in pairs[offset:]:
+        src_chassis, src_rack = self._location(d1_src, d2, d3)
+        dst_chassis, dst_rack = self._location(d1_dst, d2, d3)
+        source = layout.Coordinate(src_chassis, src_rack)
+        destination = layout.Coordinate(dst_chassis, dst_rack)
+        yield source, destination, self._weights[0]
+      offset = 0
 
     # connect dimension 2
     self._len_fsm = 2
     if self._weights[1]:
-      for d3 in range(self._widths[2]):
-        for d1 in range(self._widths[0]):
-          for d2_dist in range(1, self._widths[1]):
-            for d2_src in range(0, self._widths[1] - d2_dist):
-              d2_dst = d2_src + d2_dist
-              src_chassis, src_rack = self._location(d1, d2_src, d3)
-              dst_chassis, dst_rack = self._location(d1, d2_dst, d3)
-              source = layout.Coordinate(src_chassis, src_rack)
-              destination = layout.Coordinate(dst_chassis, dst_rack)
-              yield source, destination, self._weights[1]
+      pairs = self._pairs(self._widths[1])
+      first, offset, start = self._seek(
+        start, self._widths[2] * self._widths[0], len(pairs))
+      for d3, d1 in itertools.islice(itertools.product(
+          range(self._widths[2]), range(self._widths[0])), first, None):
+        for d2_src, d2_dst in pairs[offset:]:
+          src_chassis, src_rack = self._location(d1, d2_src, d3)
+          dst_chassis, dst_rack = self._location(d1, d2_dst, d3)
+          source = layout.Coordinate(src_chassis, src_rack)
+          destination = layout.Coordinate(dst_chassis, dst_rack)
+          yield source, destination, self._weights[1]
+        offset = 0
 
     # connect dimension 3
     self._len_fsm = 3
     if self._weights[2]:
-      for d2 in range(self._widths[1]):
-        for d1 in range(self._widths[0]):
-          for d3_dist in range(1, self._widths[2]):
-            for d3_src in range(0, self._widths[2] - d3_dist):
-              d3_dst = d3_src + d3_dist
-              src_chassis, src_rack = self._location(d1, d2, d3_src)
-              dst_chassis, dst_rack = self._location(d1, d2, d3_dst)
-              source = layout.Coordinate(src_chassis, src_rack)
-              destination = layout.Coordinate(dst_chassis, dst_rack)
-              yield source, destination, self._weights[2]
+      pairs = self._pairs(self._widths[2])
+      first, offset, start = self._seek(
+        start, self._widths[1] * self._widths[0], len(pairs))
+      for d2, d1 in itertools.islice(itertools.product(
+          range(self._widths[1]), range(self._widths[0])), first, None):
+        for d3_src, d3_dst in pairs[offset:]:
+          src_chassis, src_rack = self._location(d1, d2, d3_src)
+          dst_chassis, dst_rack = self._location(d1, d2, d3_dst)
+          source = layout.Coordinate(src_chassis, src_rack)
+          destination = layout.Coordinate(dst_chassis, dst_rack)
+          yield source, destination, self._weights[2]
+        offset = 0
+
+  def merge(self, other):
+    for ours, theirs in zip(self._cable_lens, other._cable_lens):
+      ours[0] = max(ours[0], theirs[0])
+      ours[1] = min(ours[1], theirs[1])
+      ours[2] += theirs[2]
+      ours[3] += theirs[3]
+
+  def length_stats(self):
+    return [(name, lens[3], lens[1], lens[0], lens[2])
+            for name, lens in zip(self._link_classes, self._cable_lens)]
 
   def info_file(self, filename):
     with open(filename, 'w') as fd:
@@ -101,12 +101,15 @@ class Hyperx2DStripe(topology.Topology):
 
     # determine total number of racks
     self._racks = math.ceil((self._widths[0] * self._widths[1]) / self._chassis)
+    self._check_placement(self._routers, self._chassis, self._racks)
 
     # lengths
     self._lenmax = 0
     self._lenmin = 9999999
     self._lensum = 0
     self._cblcnt = 0
+    self._dim = 0  # dimension being generated
+    self._dim_lens = []  # cblcnt, min, max, lensum of each finished dimension
 
   def structure(self):
     return self._nodes, self._chassis, self._racks
@@ -117,7 +120,24 @@ class Hyperx2DStripe(topology.Topology):
       radix += ((width - 1) * weight)
     yield radix, self._routers
 
+  def expected_cables(self):
+    cables = 0
+    for width, weight in zip(self._widths, self._weights):
+      cables += self._routers * (width - 1) * weight // 2
+    return cables
+
+  def locations(self):
+    for d2 in range(self._widths[1]):
+      for d1 in range(self._widths[0]):
+        chassis, rack = self._location(d1, d2)
+        yield self._router(d1, d2), chassis, rack
+
+  def _router(self, d1, d2):
+    return d2 * self._widths[0] + d1
+
   def _location(self, d1, d2):
+    if self._placement is not None:
+      return self._placement[self._router(d1, d2)]
     if not self._rack_stripe:
       chassis_id = (self._widths[0] * d2 + d1)
       rack = chassis_id // self._chassis
@@ -129,7 +149,10 @@ class Hyperx2DStripe(topology.Topology):
     assert chassis < self._chassis
     return chassis, rack
 
-  def length(self, length, count):
+  def notify_length(self, length, count):
+    if utils.stats.enabled:
+      utils.stats.increment(
+        'topology.Hyperx2DStripe.cables.dim{}'.format(self._dim), count)
     if length > self._lenmax:
       self._lenmax = length
     if length < self._lenmin:
@@ -137,39 +160,85 @@ class Hyperx2DStripe(topology.Topology):
     self._lensum += (length * count)
     self._cblcnt += count
 
-  def cables(self):
+  def cables(self, start=0):
     # connect dimension 1
+    self._dim = 1
     if self._weights[0]:
-      for d2 in range(self._widths[1]):
-        for d1_dist in range(1, self._widths[0]):
-          for d1_src in range(0, self._widths[0] - d1_dist):
-            d1_dst = d1_src + d1_dist
-            src_chassis, src_rack = self._location(d1_src, d2)
-            dst_chassis, dst_rack = self._location(d1_dst, d2)
-            source = layout.Coordinate(src_chassis, src_rack)
-            destination = layout.Coordinate(dst_chassis, dst_rack)
-            yield source, destination, self._weights[0]
+      pairs = self._pairs(self._widths[0])
+      first, offset, start = self._seek(start, self._widths[1], len(pairs))
+      for d2 in range(first, self._widths[1]):
+        for d1_src, d1_dst in pairs[offset:]:
+          src_chassis, src_rack = self._location(d1_src, d2)
+          dst_chassis, dst_rack = self._location(d1_dst, d2)
+          source = layout.Coordinate(src_chassis, src_rack)
+          destination = layout.Coordinate(dst_chassis, dst_rack)
+          yield source, destination, self._weights[0]
+        offset = 0
     print('dim1: ave={:.02f} min={:.02f} max={:.02f}'.format(
-      self._lensum / self._cblcnt, self._lenmin, self._lenmax))
+      self._lensum / max(1, self._cblcnt), self._lenmin, self._lenmax))
+    self._dim_lens.append(
+      (self._cblcnt, self._lenmin, self._lenmax, self._lensum))
     self._lenmax = 0
     self._lenmin = 9999999
     self._lensum = 0
     self._cblcnt = 0
 
     # connect dimension 2
+    self._dim = 2
     if self._weights[1]:
-      for d1 in range(self._widths[0]):
-        for d2_dist in range(1, self._widths[1]):
-          for d2_src in range(0, self._widths[1] - d2_dist):
-            d2_dst = d2_src + d2_dist
-            src_chassis, src_rack = self._location(d1, d2_src)
-            dst_chassis, dst_rack = self._location(d1, d2_dst)
-            source = layout.Coordinate(src_chassis, src_rack)
-            destination = layout.Coordinate(dst_chassis, dst_rack)
-            yield source, destination, self._weights[1]
+      pairs = self._pairs(self._widths[1])
+      first, offset, start = self._seek(start, self._widths[0], len(pairs))
+      for d1 in range(first, self._widths[0]):
+        for d2_src, d2_dst in pairs[offset:]:
+          src_chassis, src_rack = self._location(d1, d2_src)
+          dst_chassis, dst_rack = self._location(d1, d2_dst)
+          source = layout.Coordinate(src_chassis, src_rack)
+          destination = layout.Coordinate(dst_chassis, dst_rack)
+          yield source, destination, self._weights[1]
+        offset = 0
     print('dim2: ave={:.02f} min={:.02f} max={:.02f}'.format(
-      self._lensum / self._cblcnt, self._lenmin, self._lenmax))
+      self._lensum / max(1, self._cblcnt), self._lenmin, self._lenmax))
+    self._dim_lens.append(
+      (self._cblcnt, self._lenmin, self._lenmax, self._lensum))
     self._lenmax = 0
     self._lenmin = 9999999
     self._lensum = 0
     self._cblcnt = 0
+
+  def _dim_stats(self):
+    """
+    Returns dim->[cblcnt, min, max, lensum] of the finished dimensions and the
+    dimension being generated
+    """
+    stats = {dim: list(lens) for dim, lens in enumerate(self._dim_lens, 1)}
+    if self._dim > len(self._dim_lens):
+      stats[self._dim] = [self._cblcnt, self._lenmin, self._lenmax,
+                          self._lensum]
+    return stats
+
+  def merge(self, other):
+    stats = self._dim_stats()
+    for dim, theirs in other._dim_stats().items():
+      ours = stats.setdefault(dim, [0, 9999999, 0, 0])
+      ours[0] += theirs[0]
+      ours[1] = min(ours[1], theirs[1])
+      ours[2] = max(ours[2], theirs[2])
+      ours[3] += theirs[3]
+    finished = max(len(self._dim_lens), len(other._dim_lens))
+    self._dim = max(self._dim, other._dim)
+    self._dim_lens = [tuple(stats.get(dim, [0, 9999999, 0, 0]))
+                      for dim in range(1, finished + 1)]
+    current = [0, 9999999, 0, 0]
+    if self._dim > finished:
+      current = stats.get(self._dim, current)
+    self._cblcnt, self._lenmin, self._lenmax, self._lensum = current
+
+  def length_stats(self):
+    stats = [('dim{}'.format(dim), *lens)
+             for dim, lens in enumerate(self._dim_lens, 1)]
+    used = [stat for stat in stats if stat[1] > 0]
+    return [('all',
+             sum(stat[1] for stat in stats),
+             min((stat[2] for stat in used), default=9999999),
+             max((stat[3] for stat in used), default=0),
+             sum(stat[4] for stat in stats))] + stats
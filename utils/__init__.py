@@ -31,3 +31,23 @@
 
 from .meters import *
 from .strto import *
+from .timings import *
+from .progress import *
+from .metrics import *
+from .columns import *
+
+import importlib
+
+# these need heavy modules so they are imported when first used
+_deferred = {
+  'ParetoFront': '.pareto',
+  'MemoryProfile': '.memory',
+  'Profiler': '.profiler'}
+
+def __getattr__(name):
+  if name in _deferred:
+    value = getattr(importlib.import_module(_deferred[name], __name__), name)
+    globals()[name] = value
+    return value
+  raise AttributeError('module {!r} has no attribute {!r}'.format(
+    __name__, name))
@@ -0,0 +1,63 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import os
+
+def write_columns(directory, columns):
+  """
+  This writes each named column as a .npy file in the directory, creating it
+  if needed. The files can be memory-mapped with read_columns().
+
+  Args:
+    directory (str) : the directory to be written
+    columns (dict) : column name -> numpy array
+  """
+  import numpy  # only needed for columnar output
+  os.makedirs(directory, exist_ok=True)
+  for name, values in columns.items():
+    numpy.save(os.path.join(directory, name + '.npy'),
+               numpy.ascontiguousarray(values))
+
+def read_columns(directory, mmap=True):
+  """
+  This reads all .npy columns of a directory written by write_columns()
+
+  Returns:
+    dict : column name -> numpy array, read-only memory-mapped if 'mmap'
+  """
+  import numpy  # only needed for columnar output
+  columns = {}
+  for filename in sorted(os.listdir(directory)):
+    name, ext = os.path.splitext(filename)
+    if ext == '.npy':
+      columns[name] = numpy.load(os.path.join(directory, filename),
+                                 mmap_mode='r' if mmap else None)
+  return columns
@@ -0,0 +1,150 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import contextlib
+import json
+import os
+import tracemalloc
+
+# the root directory of the packages
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class MemoryProfile(object):
+  """
+  This traces memory allocations with tracemalloc and reports the peak and
+  retained bytes of named stages along with the top allocation sites. Retained
+  bytes are also broken down by package (topology, layout, fabric, ...) which
+  separates the allocations of stages that interleave, such as cable
+  generation, layout, and fabric accumulation.
+  """
+
+  def __init__(self, top=10):
+    """
+    Constructs a MemoryProfile object and starts tracing
+
+    Args:
+      top (int) : the number of allocation sites reported per stage
+    """
+    self._top = top
+    self._stages = OrderedDict()
+    if not tracemalloc.is_tracing():
+      tracemalloc.start()
+
+  @staticmethod
+  def _package(filename):
+    """
+    Returns the package of a source file, or 'other' outside of this repository
+    """
+    path = os.path.relpath(os.path.abspath(filename), _ROOT)
+    if path.startswith('..'):
+      return 'other'
+    parts = path.split(os.sep)
+    return parts[0] if len(parts) > 1 else 'main'
+
+  @contextlib.contextmanager
+  def stage(self, name):
+    """
+    This traces the body of a with statement as a stage
+    """
+    # the snapshot is taken before the counters so its memory isn't counted
+    before = tracemalloc.take_snapshot()
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+      yield
+    finally:
+      current, peak = tracemalloc.get_traced_memory()
+      after = tracemalloc.take_snapshot()
+      self._record(name, start, current, peak, before, after)
+
+  def _record(self, name, start, current, peak, before, after):
+    """
+    This records the information of a finished stage
+    """
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),
+              tracemalloc.Filter(False, __file__))
+    before = before.filter_traces(ignore)
+    after = after.filter_traces(ignore)
+
+    # retained bytes by package
+    packages = OrderedDict()
+    for stat in after.compare_to(before, 'filename'):
+      package = self._package(stat.traceback[0].filename)
+      packages[package] = packages.get(package, 0) + stat.size_diff
+
+    # top allocation sites
+    sites = []
+    for stat in after.compare_to(before, 'lineno')[:self._top]:
+      if stat.size_diff <= 0:
+        break
+      frame = stat.traceback[0]
+      site = OrderedDict()
+      site['file'] = os.path.relpath(frame.filename, _ROOT)
+      site['line'] = frame.lineno
+      site['retained bytes'] = stat.size_diff
+      site['retained blocks'] = stat.count_diff
+      sites.append(site)
+
+    # stages with the same name get numbered
+    key = name
+    number = 1
+    while key in self._stages:
+      number += 1
+      key = '{} #{}'.format(name, number)
+
+    stage = OrderedDict()
+    stage['start bytes'] = start
+    stage['peak bytes'] = peak
+    stage['peak increase bytes'] = peak - start
+    stage['retained bytes'] = current - start
+    stage['retained bytes by package'] = OrderedDict(
+      sorted([item for item in packages.items() if item[1] != 0],
+             key=lambda item: -item[1]))
+    stage['top allocation sites'] = sites
+    self._stages[key] = stage
+
+  def report(self):
+    """
+    Returns a dict of the stage information
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    data = OrderedDict()
+    data['current bytes'] = current
+    data['stages'] = self._stages
+    return data
+
+  def write(self, filename):
+    """
+    Writes the report as a JSON file
+    """
+    with open(filename, 'w') as fd:
+      print(json.dumps(self.report(), indent=2), file=fd)
@@ -0,0 +1,82 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import json
+
+class Metrics(object):
+  """
+  This is a registry of named counters that fabcalc modules increment on their
+  hot paths. Counting is disabled by default and callers check 'enabled'
+  before incrementing so a disabled registry costs one attribute check.
+  """
+
+  def __init__(self):
+    self.enabled = False
+    self._counters = {}
+
+  def enable(self, enabled=True):
+    """
+    This enables or disables counting
+    """
+    self.enabled = enabled
+
+  def increment(self, name, amount=1):
+    """
+    This adds to a counter
+    """
+    self._counters[name] = self._counters.get(name, 0) + amount
+
+  def reset(self):
+    """
+    This clears all counters
+    """
+    self._counters = {}
+
+  def snapshot(self):
+    """
+    Returns a dict of all counters sorted by name
+    """
+    return OrderedDict(sorted(self._counters.items()))
+
+  def dump(self, filename):
+    """
+    Writes all counters as a JSON file, '-' is stdout
+    """
+    report = json.dumps(self.snapshot(), indent=2)
+    if filename == '-':
+      print(report)
+    else:
+      with open(filename, 'w') as fd:
+        print(report, file=fd)
+
+# the registry used by all fabcalc modules
+stats = Metrics()
@@ -0,0 +1,122 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import numpy
+
+from .metrics import stats
+
+class ParetoFront(object):
+  """
+  This incrementally computes the Pareto frontier (skyline) of a stream of
+  points. Points are buffered into batches and each batch is sorted by the sum
+  of its objectives (sort-filter-skyline) so a point can only be dominated by
+  points that came before it in the batch. Dominance checks against the current
+  frontier are vectorized.
+  """
+
+  def __init__(self, maximize, batch_size=4096):
+    """
+    Constructs a ParetoFront object
+
+    Args:
+      maximize (list) : one bool per objective, True to maximize the objective
+                        and False to minimize it
+      batch_size (int) : the number of points buffered before merging
+    """
+    assert len(maximize) > 0, 'at least one objective must be given'
+    self._signs = numpy.array([-1.0 if m else 1.0 for m in maximize])
+    self._batch_size = batch_size
+    self._keys = numpy.empty((0, len(maximize)))
+    self._records = []
+    self._pending_keys = []
+    self._pending_records = []
+    self.count = 0
+
+  def add(self, objectives, record=None):
+    """
+    This adds a point to the frontier computation
+
+    Args:
+      objectives (list) : the objective values of the point
+      record (any) : data kept with the point if it is on the frontier
+    """
+    assert len(objectives) == len(self._signs), 'wrong number of objectives'
+    self._pending_keys.append(objectives)
+    self._pending_records.append(record)
+    self.count += 1
+    if len(self._pending_keys) >= self._batch_size:
+      self._merge()
+
+  def front(self):
+    """
+    This returns the current frontier as a list of (objectives, record) tuples
+    sorted by the objectives
+    """
+    self._merge()
+    order = numpy.lexsort(self._keys.T[::-1])
+    return [(list(self._keys[idx] * self._signs), self._records[idx])
+            for idx in order]
+
+  def _merge(self):
+    """
+    This merges the pending points into the frontier
+    """
+    if not self._pending_keys:
+      return
+    if stats.enabled:
+      stats.increment('utils.ParetoFront.batches')
+    batch = numpy.array(self._pending_keys, dtype=numpy.float64) * self._signs
+    records = self._pending_records
+    self._pending_keys = []
+    self._pending_records = []
+
+    # any monotone score works for sort-filter-skyline, if a dominates b then
+    #  sum(a) < sum(b)
+    keys = self._keys
+    kept = self._records
+    for idx in numpy.argsort(batch.sum(axis=1), kind='stable'):
+      point = batch[idx]
+      if len(kept):
+        # skip points dominated by the frontier
+        if numpy.any(numpy.all(keys <= point, axis=1) &
+                     numpy.any(keys < point, axis=1)):
+          continue
+        # remove frontier points dominated by this point
+        dominated = (numpy.all(keys >= point, axis=1) &
+                     numpy.any(keys > point, axis=1))
+        if numpy.any(dominated):
+          keep = numpy.flatnonzero(~dominated)
+          keys = keys[keep]
+          kept = [kept[k] for k in keep]
+      keys = numpy.vstack((keys, point))
+      kept.append(records[idx])
+    self._keys = keys
+    self._records = kept
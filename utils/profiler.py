@@ -0,0 +1,145 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import cProfile
+import os
+import pstats
+import sys
+
+# the root directory of the packages
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Profiler(object):
+  """
+  This profiles named phases of a run with cProfile. All phases are written
+  together as one pstats file and a condensed report groups the time of each
+  phase by fabcalc module (topology/impl/*, layout/impl/*, fabric/impl/*, ...).
+  """
+
+  def __init__(self):
+    self._phases = OrderedDict()  # name->cProfile.Profile
+    self._active = None
+
+  def phase(self, name):
+    """
+    This stops the active phase, if any, and starts profiling a new phase
+    """
+    self.stop()
+    profile = self._phases.get(name)
+    if profile is None:
+      profile = cProfile.Profile()
+      self._phases[name] = profile
+    self._active = profile
+    profile.enable()
+
+  def stop(self):
+    """
+    This stops the active phase
+    """
+    if self._active is not None:
+      self._active.disable()
+      self._active = None
+
+  def _stats(self):
+    """
+    Returns a pstats.Stats of all phases
+    """
+    stats = None
+    for profile in self._phases.values():
+      if stats is None:
+        stats = pstats.Stats(profile)
+      else:
+        stats.add(profile)
+    return stats
+
+  def write(self, filename):
+    """
+    Writes the stats of all phases as a pstats file
+    """
+    self.stop()
+    stats = self._stats()
+    if stats is not None:
+      stats.dump_stats(filename)
+
+  @staticmethod
+  def _group(filename):
+    """
+    Returns the module group of a source file
+    """
+    if filename.startswith('<') or filename == '~':
+      return 'builtins'
+    path = os.path.relpath(os.path.abspath(filename), _ROOT)
+    if path.startswith('..'):
+      return 'other'
+    directory = os.path.dirname(path)
+    if not directory:
+      return path
+    if os.path.basename(directory) == 'impl':
+      return '{}/*'.format(directory.replace(os.sep, '/'))
+    return directory.replace(os.sep, '/')
+
+  def report(self, fd=sys.stderr, top=3):
+    """
+    Prints the condensed report of the self time of each phase by module group
+
+    Args:
+      fd (file) : where to print the report
+      top (int) : number of functions shown per module group
+    """
+    self.stop()
+    for name, profile in self._phases.items():
+      stats = pstats.Stats(profile).stats
+
+      # sum the self time of each module group
+      groups = {}
+      total = 0.0
+      for (filename, line, function), (_, calls, tottime, _, _) in \
+          stats.items():
+        if filename == __file__:
+          continue  # the profiler itself
+        group = groups.setdefault(self._group(filename), [0.0, 0, []])
+        group[0] += tottime
+        group[1] += calls
+        group[2].append((tottime, calls, filename, line, function))
+        total += tottime
+
+      print('{} : {:.03f}s'.format(name, total), file=fd)
+      for group, (tottime, calls, functions) in sorted(
+          groups.items(), key=lambda item: -item[1][0]):
+        print('  {:<20} {:9.03f}s {:6.01f}% {:>12,} calls'.format(
+          group, tottime, 100 * tottime / total if total > 0 else 0, calls),
+          file=fd)
+        for ftime, fcalls, filename, line, function in sorted(
+            functions, reverse=True)[:top]:
+          print('    {:9.03f}s {:>12,} {}:{}({})'.format(
+            ftime, fcalls, os.path.basename(filename), line, function),
+            file=fd)
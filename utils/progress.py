@@ -0,0 +1,104 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import datetime
+import sys
+import time
+
+class Progress(object):
+  """
+  This reports the progress of a long enumeration to a stream. Callers update
+  it once per chunk of work and it only prints when 'interval' seconds have
+  passed, so the cost is independent of the number of items.
+  """
+
+  def __init__(self, label='cables', interval=1.0, fd=sys.stderr):
+    """
+    Constructs a Progress object
+
+    Args:
+      label (str) : the name of the items being counted
+      interval (float) : minimum seconds between reports
+      fd (file) : where reports are printed
+    """
+    self._label = label
+    self._interval = interval
+    self._fd = fd
+    self._end = '\r' if fd.isatty() else '\n'
+    self.total = None
+    self._start = None
+    self._last = None
+
+  def start(self, total):
+    """
+    This starts the clock
+
+    Args:
+      total (int) : the expected number of items
+    """
+    self.total = total
+    self._start = time.perf_counter()
+    self._last = self._start
+
+  def update(self, done):
+    """
+    This prints a report if the interval has passed
+
+    Args:
+      done (int) : the number of items processed so far
+    """
+    now = time.perf_counter()
+    if now - self._last >= self._interval:
+      self._last = now
+      self._print(done, now)
+
+  def finish(self, done):
+    """
+    This prints the final report
+    """
+    self._print(done, time.perf_counter())
+    if self._end == '\r':
+      print(file=self._fd)
+
+  def _print(self, done, now):
+    elapsed = now - self._start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    if self.total:
+      if rate > 0 and done < self.total:
+        eta = datetime.timedelta(seconds=round((self.total - done) / rate))
+      else:
+        eta = datetime.timedelta(0)
+      print('{}: {:,}/{:,} ({:.01f}%) {:,.0f}/s ETA {}'.format(
+        self._label, done, self.total, 100 * done / self.total, rate, eta),
+        end=self._end, file=self._fd, flush=True)
+    else:
+      print('{}: {:,} {:,.0f}/s'.format(self._label, done, rate),
+            end=self._end, file=self._fd, flush=True)
@@ -0,0 +1,107 @@
+"""
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are met:
+ *
+ * - Redistributions of source code must retain the above copyright notice, this
+ * list of conditions and the following disclaimer.
+ *
+ * - Redistributions in binary form must reproduce the above copyright notice,
+ * this list of conditions and the following disclaimer in the documentation
+ * and/or other materials provided with the distribution.
+ *
+ * - Neither the name of prim nor the names of its contributors may be used to
+ * endorse or promote products derived from this software without specific prior
+ * written permission.
+ *
+ * See the NOTICE file distributed with this work for additional information
+ * regarding copyright ownership.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+ * AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ * ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+ * LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+ * CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+ * SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+ * INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+ * CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ * ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+ * POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from collections import OrderedDict
+import contextlib
+import json
+import sys
+import threading
+import time
+
+class Timings(object):
+  """
+  This accumulates the wall clock time, call count, and cable count of named
+  stages and reports them as JSON. Stages are reported in the order they were
+  first seen. Stages may be added from several threads.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._stages = OrderedDict()  # name->[seconds, calls, cables]
+    self._start = time.perf_counter()
+
+  def add(self, name, seconds, calls=1, cables=0):
+    """
+    This adds time, calls, and cables to a stage
+    """
+    with self._lock:
+      stage = self._stages.get(name)
+      if stage is None:
+        stage = [0.0, 0, 0]
+        self._stages[name] = stage
+      stage[0] += seconds
+      stage[1] += calls
+      stage[2] += cables
+
+  @contextlib.contextmanager
+  def stage(self, name, calls=1, cables=0):
+    """
+    This times the body of a with statement as a stage
+    """
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.add(name, time.perf_counter() - start, calls, cables)
+
+  def report(self, pending=()):
+    """
+    Returns a dict of the stage information, the stages named in 'pending'
+    haven't finished so their values are incomplete
+    """
+    with self._lock:
+      items = [(name, list(values)) for name, values in self._stages.items()]
+    stages = OrderedDict()
+    for name, (seconds, calls, cables) in items:
+      stage = OrderedDict()
+      stage['seconds'] = seconds
+      stage['calls'] = calls
+      if cables > 0:
+        stage['cables'] = cables
+        stage['cables/sec'] = cables / seconds if seconds > 0 else None
+      stages[name] = stage
+    for name in pending:
+      stages.setdefault(name, OrderedDict())['pending'] = True
+    data = OrderedDict()
+    data['total seconds'] = time.perf_counter() - self._start
+    data['stages'] = stages
+    return data
+
+  def write(self, filename, pending=()):
+    """
+    Writes the report as a JSON file, '-' is stdout
+    """
+    report = json.dumps(self.report(pending), indent=2)
+    if filename == '-':
+      print(report)
+    else:
+      with open(filename, 'w') as fd:
+        print(report, file=fd)